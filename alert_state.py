@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import time
+
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".alert_state", "alerts.sqlite3")
+RETRY_WINDOW = 30 * 60  # undelivered alerts older than this are no longer retried
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    instrument TEXT NOT NULL,
+    timeframe INTEGER NOT NULL,
+    ema_period INTEGER NOT NULL,
+    last_ts INTEGER NOT NULL,
+    ema REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (instrument, timeframe, ema_period)
+);
+CREATE TABLE IF NOT EXISTS rule_state (
+    instrument TEXT NOT NULL,
+    timeframe INTEGER NOT NULL,
+    rule TEXT NOT NULL,
+    active INTEGER NOT NULL,
+    PRIMARY KEY (instrument, timeframe, rule)
+);
+CREATE TABLE IF NOT EXISTS alerts (
+    instrument TEXT NOT NULL,
+    timeframe INTEGER NOT NULL,
+    rule TEXT NOT NULL,
+    candle_ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, ema REAL,
+    created_at REAL NOT NULL,
+    delivered_at REAL,
+    PRIMARY KEY (instrument, timeframe, rule, candle_ts)
+);
+"""
+
+
+class AlertStateStore:
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        """
+        Embedded (SQLite) state for stateless alert runs (cron, serverless)
+
+        Per instrument and timeframe it keeps the last evaluated candle and
+        the EMA carried up to it, so a run only folds candles it has not seen.
+        Per rule it keeps whether the condition was already active, so a
+        signal is sent once when it starts rather than on every run while it
+        holds. Every alert is recorded before sending and marked delivered
+        afterwards; failed deliveries are retried by the next run.
+
+        Args:
+            path: SQLite file (created with its directory if missing)
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=10)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- CURSORS ---
+    def get_cursor(self, instrument, timeframe, ema_period):
+        """(last evaluated candle ts, EMA after it), or None on the first run"""
+        row = self.conn.execute(
+            "SELECT last_ts, ema FROM cursors WHERE instrument = ? AND timeframe = ? AND ema_period = ?",
+            (instrument, timeframe, ema_period)
+        ).fetchone()
+        return (row['last_ts'], row['ema']) if row else None
+
+    def _set_cursor(self, instrument, timeframe, ema_period, last_ts, ema):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cursors VALUES (?, ?, ?, ?, ?, ?)",
+            (instrument, timeframe, ema_period, last_ts, ema, time.time())
+        )
+
+    def _rule_active(self, instrument, timeframe, rule):
+        row = self.conn.execute(
+            "SELECT active FROM rule_state WHERE instrument = ? AND timeframe = ? AND rule = ?",
+            (instrument, timeframe, rule)
+        ).fetchone()
+        return bool(row['active']) if row else False
+
+    # --- EVALUATION ---
+    def evaluate(self, instrument, bars, rules, ema_period=5, interval_minutes=5, now=None, edge_only=True):
+        """
+        Evaluate rules on the completed bars this store has not seen yet
+
+        The EMA (seeded with the first close, like pandas ewm(adjust=False))
+        continues from the stored value when the bars overlap the last
+        evaluated candle, and is rebuilt from all bars otherwise.
+
+        Args:
+            instrument: Instrument key
+            bars: (ts, open, high, low, close) rows, oldest first; ts is the
+                  bar start in epoch seconds. The still-forming bar is skipped.
+            rules: {name: predicate(bar dict, ema) -> bool}
+            ema_period: EMA period
+            interval_minutes: Bar length
+            now: Current epoch seconds (default: time.time())
+            edge_only: Signal only when a rule turns true, not on every bar it holds
+
+        Returns:
+            dict: 'new_bars' (count), 'latest' (last completed bar dict with
+                  'ema', or None), 'signals' (alerts to deliver, including
+                  undelivered ones from earlier runs; pass each to mark_delivered)
+        """
+        now = time.time() if now is None else now
+        interval = interval_minutes * 60
+        completed = [bar for bar in bars if bar[0] + interval <= now]
+        alpha = 2 / (ema_period + 1)
+
+        signals = self.undelivered(instrument, interval_minutes, now)
+        latest = None
+        new_bars = 0
+        with self.conn:
+            cursor = self.get_cursor(instrument, interval_minutes, ema_period)
+            if cursor is not None and completed and completed[0][0] <= cursor[0]:
+                last_ts, ema = cursor
+            else:
+                # First run, or a gap since the last run: rebuild from everything we have
+                last_ts, ema = -1, None
+            # Bars before this only warm up the EMA and rule state; history and
+            # long-past candles never trigger alerts
+            alert_from = max(
+                cursor[0] + 1 if cursor is not None else (completed[-1][0] if completed else 0),
+                now - RETRY_WINDOW - interval
+            )
+            active = {rule: self._rule_active(instrument, interval_minutes, rule) for rule in rules}
+
+            for ts, open_, high, low, close in (bar[:5] for bar in completed):
+                if ts <= last_ts:
+                    continue
+                ema = close if ema is None else ema + alpha * (close - ema)
+                latest = {'ts': ts, 'open': open_, 'high': high, 'low': low, 'close': close, 'ema': ema}
+                new_bars += 1
+                for rule, predicate in rules.items():
+                    condition = bool(predicate(latest, ema))
+                    if condition and ts >= alert_from and not (edge_only and active[rule]):
+                        if self._record_alert(instrument, interval_minutes, rule, latest, now):
+                            signals.append(dict(latest, rule=rule, instrument=instrument, timeframe=interval_minutes))
+                    active[rule] = condition
+                last_ts = ts
+
+            if new_bars:
+                self._set_cursor(instrument, interval_minutes, ema_period, last_ts, ema)
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO rule_state VALUES (?, ?, ?, ?)",
+                    [(instrument, interval_minutes, rule, int(value)) for rule, value in active.items()]
+                )
+
+        if latest is None and completed:
+            cursor = self.get_cursor(instrument, interval_minutes, ema_period)
+            ts, open_, high, low, close = completed[-1][:5]
+            latest = {'ts': ts, 'open': open_, 'high': high, 'low': low, 'close': close,
+                      'ema': cursor[1] if cursor else None}
+        return {'new_bars': new_bars, 'latest': latest, 'signals': signals}
+
+    # --- ALERTS ---
+    def _record_alert(self, instrument, timeframe, rule, bar, now):
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO alerts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+            (instrument, timeframe, rule, bar['ts'], bar['open'], bar['high'], bar['low'],
+             bar['close'], bar['ema'], now)
+        )
+        return cursor.rowcount == 1
+
+    def undelivered(self, instrument, timeframe, now=None, retry_window=RETRY_WINDOW):
+        """Recorded alerts whose delivery has not been confirmed yet (recent ones only)"""
+        now = time.time() if now is None else now
+        rows = self.conn.execute(
+            "SELECT * FROM alerts WHERE instrument = ? AND timeframe = ? AND delivered_at IS NULL "
+            "AND created_at >= ? ORDER BY candle_ts",
+            (instrument, timeframe, now - retry_window)
+        ).fetchall()
+        return [
+            {'ts': row['candle_ts'], 'open': row['open'], 'high': row['high'], 'low': row['low'],
+             'close': row['close'], 'ema': row['ema'], 'rule': row['rule'],
+             'instrument': instrument, 'timeframe': timeframe, 'retry': True}
+            for row in rows
+        ]
+
+    def last_delivered(self, instrument, timeframe, rule):
+        """Candle start (epoch seconds) of the last alert delivered for a rule, or None"""
+        row = self.conn.execute(
+            "SELECT MAX(candle_ts) AS ts FROM alerts WHERE instrument = ? AND timeframe = ? AND rule = ? "
+            "AND delivered_at IS NOT NULL",
+            (instrument, timeframe, rule)
+        ).fetchone()
+        return row['ts']
+
+    def mark_delivered(self, signal, now=None):
+        """Confirm a signal from evaluate() was sent so it is never sent again"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE alerts SET delivered_at = ? WHERE instrument = ? AND timeframe = ? AND rule = ? AND candle_ts = ?",
+                (time.time() if now is None else now, signal['instrument'], signal['timeframe'],
+                 signal['rule'], signal['ts'])
+            )
+
+    def prune(self, keep_days=30):
+        """Delete alert records older than keep_days"""
+        with self.conn:
+            self.conn.execute("DELETE FROM alerts WHERE created_at < ?", (time.time() - keep_days * 86400,))
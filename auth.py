@@ -4,6 +4,15 @@ import requests
 from urllib.parse import urlparse, parse_qs
 import os
 
+TOKEN_FILE = "upstox_refresh.json"
+
+def write_token_file(path, token_data):
+    """Write the token file atomically so concurrent readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(token_data, f, indent=2)
+    os.replace(tmp_path, path)
+
 class UpstoxAuth:
     def __init__(self, config_path="config.json"):
         """Initialize with config file containing API credentials"""
@@ -13,7 +22,7 @@ class UpstoxAuth:
         self.client_id = config['upstox']['client_id']
         self.client_secret = config['upstox']['client_secret']
         self.redirect_uri = config['upstox']['redirect_uri']
-        self.refresh_token_file = "upstox_refresh.json"
+        self.refresh_token_file = TOKEN_FILE
     
     def get_login_url(self):
         """Generate login URL for Upstox authorization"""
@@ -104,8 +113,7 @@ class UpstoxAuth:
             # Some Upstox configurations might not provide refresh tokens
             # In this case, we'll need to re-authenticate when the token expires
         
-        with open(self.refresh_token_file, 'w') as f:
-            json.dump(refresh_data, f, indent=2)
+        write_token_file(self.refresh_token_file, refresh_data)
         
         print(f"✅ Token data saved to {self.refresh_token_file}")
     
@@ -159,8 +167,7 @@ class UpstoxAuth:
             else:
                 updated_data['refresh_token'] = refresh_token  # Keep the old one
             
-            with open(self.refresh_token_file, 'w') as f:
-                json.dump(updated_data, f, indent=2)
+            write_token_file(self.refresh_token_file, updated_data)
             
             print("✅ Access token refreshed successfully")
             return new_token_data['access_token']
@@ -169,18 +176,26 @@ class UpstoxAuth:
             raise Exception(f"Failed to refresh access token: {str(e)}")
 
 def get_access_token():
-    """Get valid access token (refresh if needed)"""
-    auth = UpstoxAuth()
-    try:
-        return auth.refresh_access_token()
-    except FileNotFoundError:
+    """
+    Get valid access token
+
+    Served from the process-wide TokenManager: the token's expiry is checked
+    locally and the refresh endpoint is only called when it is about to expire.
+    """
+    from token_manager import get_token_manager
+
+    manager = get_token_manager()
+    access_token = manager.get_token()
+    if access_token:
+        return access_token
+
+    if not os.path.exists(manager.token_file):
         print("❌ Token file not found. Please run initial authentication first.")
-        return None
-    except Exception as e:
-        print(f"❌ Error getting access token: {str(e)}")
+    else:
+        print("❌ Error getting access token: no valid token and refresh failed")
         print("💡 If refresh token is not available, you may need to re-authenticate.")
         print("   Run: python auth.py")
-        return None
+    return None
 
 def main():
     """Initial authentication flow"""
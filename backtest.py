@@ -0,0 +1,214 @@
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from candle_cache import IST, COLUMNS
+from indicators import ema_array
+from resampler import IST_OFFSET_SECONDS, SESSION_START_MINUTE, resample_columns
+from rules import RuleSet
+
+SESSION_END_MINUTE = 15 * 60 + 30  # 15:30 IST
+
+# Rule expressions (see rules.py) with {ema} standing for the --ema period,
+# evaluated on completed candles against the EMA that already includes the
+# candle's own close (as the live paths do)
+RULES = {
+    # ENTIRE candle above EMA (the old real_time_nifty_monitor check)
+    'entire_above': 'low > ema({ema}) and high > ema({ema}) and open > ema({ema}) and close > ema({ema})',
+    # rules.DEFAULT_RULES
+    'bullish': 'low > ema({ema})',
+    'bearish': 'high < ema({ema})',
+}
+BEARISH_RULES = {'bearish'}
+
+
+# --- LOADING ---
+def load_candles_csv(path):
+    """
+    Load 1-minute candles from a CSV with datetime/timestamp, open, high, low, close[, volume, oi]
+
+    Returns:
+        dict: Columnar arrays as used by candle_cache ('ts' in epoch seconds)
+    """
+    df = pd.read_csv(path)
+    time_column = 'datetime' if 'datetime' in df.columns else 'timestamp'
+    times = pd.to_datetime(df[time_column])
+    if times.dt.tz is None:
+        times = times.dt.tz_localize('Asia/Kolkata')
+    ts = (times.dt.tz_convert('UTC') - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+
+    columns = {'ts': ts.to_numpy(dtype=np.int64)}
+    for name in COLUMNS[1:]:
+        dtype = np.int64 if name in ('volume', 'oi') else np.float64
+        columns[name] = df[name].to_numpy(dtype=dtype) if name in df.columns else np.zeros(len(df), dtype=dtype)
+    order = np.argsort(columns['ts'], kind='stable')
+    return {name: values[order] for name, values in columns.items()}
+
+
+def load_candles_cached(instrument_key, from_day, to_day):
+    """Load 1-minute candles for closed days through the local candle cache"""
+    from auth import get_access_token
+    from candle_cache import CandleCache
+    from upstox_http import UpstoxHTTPClient
+
+    cache = CandleCache(UpstoxHTTPClient(get_access_token()))
+    return cache.get_range(instrument_key, "1minute", from_day, to_day)
+
+
+def synthetic_candles(n_days, start_day=date(2024, 1, 1), start_price=21000.0, seed=7):
+    """
+    Random-walk 1-minute candles for n_days weekdays, 09:15-15:29 IST
+
+    Returns:
+        dict: Columnar arrays as used by candle_cache
+    """
+    rng = np.random.default_rng(seed)
+    days = []
+    day = start_day
+    while len(days) < n_days:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+
+    minutes = SESSION_END_MINUTE - SESSION_START_MINUTE
+    day_starts = np.array([
+        int(datetime(d.year, d.month, d.day, 9, 15, tzinfo=IST).timestamp()) for d in days
+    ], dtype=np.int64)
+    ts = (day_starts[:, None] + 60 * np.arange(minutes, dtype=np.int64)[None, :]).ravel()
+
+    n = len(ts)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.0004, n)))
+    open_ = np.r_[start_price, close[:-1]]
+    wick = np.abs(rng.normal(0, 0.0002, (2, n))) * close
+    return {
+        'ts': ts,
+        'open': open_,
+        'high': np.maximum(open_, close) + wick[0],
+        'low': np.minimum(open_, close) - wick[1],
+        'close': close,
+        'volume': rng.integers(1_000, 50_000, n).astype(np.int64),
+        'oi': np.zeros(n, dtype=np.int64)
+    }
+
+
+# --- BACKTEST ---
+def forward_returns(close, day, horizon):
+    """close[i + horizon] / close[i] - 1, NaN where the horizon leaves the session"""
+    out = np.full(len(close), np.nan)
+    if horizon < len(close):
+        same_day = day[horizon:] == day[:-horizon]
+        ret = close[horizon:] / close[:-horizon] - 1
+        out[:-horizon] = np.where(same_day, ret, np.nan)
+    return out
+
+
+def run_backtest(columns_1min, interval_minutes=5, ema_period=5, horizons=(1, 3, 6, 12),
+                 rules=tuple(RULES), edges_only=False):
+    """
+    Evaluate the alert rules over a full candle history
+
+    Args:
+        columns_1min: Sorted 1-minute columns (see candle_cache)
+        interval_minutes: Bar interval the rules run on
+        ema_period: EMA period (SMA-seeded, like the live monitor)
+        horizons: Forward-return horizons, in bars
+        rules: Rule names from RULES, or {name: expression} for other rules
+        edges_only: Only count the first bar of each consecutive signal run
+                    (what a de-duplicated alert would send)
+
+    Returns:
+        dict: 'bars' (number of bars), 'events' (DataFrame, one row per
+              signal) and 'summary' (DataFrame, hit rate / mean forward
+              return per rule and horizon)
+    """
+    if not isinstance(rules, dict):
+        rules = {name: RULES[name].format(ema=ema_period) for name in rules}
+    ruleset = RuleSet(rules)
+
+    bars = resample_columns(columns_1min, interval_minutes)
+    ema = ema_array(bars['close'], ema_period)
+    signals = ruleset.evaluate(bars, indicators={ruleset.key(f'ema({ema_period})'): ema})
+    day = (bars['ts'] + IST_OFFSET_SECONDS) // 86400
+    returns = {h: forward_returns(bars['close'], day, h) for h in horizons}
+
+    events = []
+    summary = []
+    for rule in rules:
+        signal = signals[rule]
+        if edges_only:
+            signal = signal & ~np.r_[False, signal[:-1]]
+        idx = np.flatnonzero(signal)
+        direction = -1.0 if rule in BEARISH_RULES else 1.0
+
+        frame = {
+            'rule': rule,
+            'ts': bars['ts'][idx],
+            'open': bars['open'][idx],
+            'high': bars['high'][idx],
+            'low': bars['low'][idx],
+            'close': bars['close'][idx],
+            'ema': ema[idx]
+        }
+        row = {'rule': rule, 'signals': len(idx), 'signal_rate': len(idx) / max(len(ema), 1)}
+        for h in horizons:
+            ret = returns[h][idx]
+            frame[f'ret_{h}'] = ret
+            valid = ret[~np.isnan(ret)]
+            row[f'hit_rate_{h}'] = float(np.mean(direction * valid > 0)) if len(valid) else np.nan
+            row[f'mean_ret_{h}'] = float(np.mean(valid)) if len(valid) else np.nan
+        events.append(pd.DataFrame(frame))
+        summary.append(row)
+
+    events = pd.concat(events, ignore_index=True) if events else pd.DataFrame()
+    if len(events):
+        events.insert(1, 'datetime', pd.to_datetime(events['ts'], unit='s', utc=True).dt.tz_convert('Asia/Kolkata'))
+    return {'bars': len(bars['ts']), 'events': events, 'summary': pd.DataFrame(summary)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the EMA alert rules on historical candles")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', help="CSV of 1-minute candles")
+    source.add_argument('--instrument', help="Instrument key, loaded through the candle cache")
+    source.add_argument('--synthetic', type=int, metavar='DAYS', help="Random-walk data for DAYS trading days")
+    parser.add_argument('--from', dest='from_day', type=date.fromisoformat, help="First day (with --instrument)")
+    parser.add_argument('--to', dest='to_day', type=date.fromisoformat, help="Last day (with --instrument)")
+    parser.add_argument('--interval', type=int, default=5, help="Bar interval in minutes (default 5)")
+    parser.add_argument('--ema', type=int, default=5, help="EMA period (default 5)")
+    parser.add_argument('--edges-only', action='store_true', help="Count only the first bar of each signal run")
+    parser.add_argument('--rule', action='append', metavar='NAME=EXPR',
+                        help="Backtest this rule instead of the built-in ones, e.g. "
+                             "'trend=low > ema(5) and close > ema(21)' (repeatable)")
+    parser.add_argument('--events', help="Write signal events to this CSV")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.csv:
+        columns = load_candles_csv(args.csv)
+    elif args.instrument:
+        to_day = args.to_day or date.today() - timedelta(days=1)
+        from_day = args.from_day or to_day - timedelta(days=365)
+        columns = load_candles_cached(args.instrument, from_day, to_day)
+    else:
+        columns = synthetic_candles(args.synthetic)
+    loaded = time.perf_counter()
+
+    rules = dict(rule.split('=', 1) for rule in args.rule) if args.rule else tuple(RULES)
+    result = run_backtest(columns, args.interval, args.ema, rules=rules, edges_only=args.edges_only)
+    finished = time.perf_counter()
+
+    print(f"📊 {len(columns['ts'])} 1-minute candles → {result['bars']} {args.interval}-minute bars")
+    print(f"⏱️  Load {loaded - started:.2f}s | Backtest {finished - loaded:.3f}s")
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(result['summary'].to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+    if args.events:
+        result['events'].to_csv(args.events, index=False)
+        print(f"✅ {len(result['events'])} events written to {args.events}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from backtest import synthetic_candles
+from candle_cache import columns_to_dataframe
+from indicators import EMABank, IndicatorSuite, ema_array
+from resampler import StreamingResampler, resample_columns, resample_multi
+from rules import DEFAULT_RULES, RuleSet
+
+SCALES = {
+    'quick': {'symbols': (1, 100), 'days': (1, 20)},
+    'full': {'symbols': (1, 100, 1000), 'days': (1, 250, 1250)},
+}
+TICKS_PER_SYMBOL = 4500  # one session at one tick every 5 seconds
+BATCH = 100  # ops per latency sample for per-call benchmarks
+MIN_REPEAT_SECONDS = 0.2  # short cases are run several times per repeat to last at least this long
+RECHECKS = 2  # a case that looks slower than its baseline is measured again up to this many times
+BENCH_RULES = dict(DEFAULT_RULES, trend='low > ema(5) and close > ema(21)', cross='cross_above(close, ema(9))')
+
+CASES = {}
+
+
+def case(name, dimension):
+    """Register a benchmark; dimension is 'symbols' or 'days'"""
+    def register(func):
+        CASES[name] = (dimension, func)
+        return func
+    return register
+
+
+# --- SYNTHETIC DATA ---
+def synthetic_ticks(n_symbols, n_ticks, seed=11, start_ms=1704080700000, step_ms=5000):
+    """
+    Random-walk ticks for n_symbols, interleaved by time
+
+    Returns:
+        tuple: (symbol index, price, timestamp ms) arrays of length n_symbols * n_ticks
+    """
+    rng = np.random.default_rng(seed)
+    prices = 1000 * np.exp(np.cumsum(rng.normal(0, 0.0005, (n_ticks, n_symbols)), axis=0))
+    stamps = start_ms + step_ms * np.arange(n_ticks, dtype=np.int64)
+    symbols = np.tile(np.arange(n_symbols), n_ticks)
+    return symbols, prices.ravel(), np.repeat(stamps, n_symbols)
+
+
+def _timed_loop(n, body):
+    """Run body(i) for i in range(n), sampling latency every BATCH calls"""
+    samples = []
+    perf = time.perf_counter_ns
+    for start in range(0, n, BATCH):
+        stop = min(start + BATCH, n)
+        t0 = perf()
+        for i in range(start, stop):
+            body(i)
+        samples.append((perf() - t0) / (stop - start))
+    return samples
+
+
+def _timed_call(func):
+    t0 = time.perf_counter_ns()
+    func()
+    return [time.perf_counter_ns() - t0]
+
+
+def _calibration_seconds():
+    """
+    Time of a fixed pure-Python and NumPy workload (best of 3)
+
+    Measured around every repeat: throughput times this figure stays
+    comparable when the machine as a whole runs faster or slower than when
+    the baseline was saved (CPU frequency, shared or throttled hosts).
+    """
+    data = np.arange(200_000, dtype=np.float64)
+    best = float('inf')
+    for _ in range(3):
+        t0 = time.perf_counter()
+        total = 0
+        for i in range(100_000):
+            total += i * i
+        float(np.dot(data, data))
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# --- CASES ---
+@case('ema_calculator.add_price', 'symbols')
+def bench_ema_add_price(n_symbols):
+    from main import EMACalculator
+
+    _, prices, _ = synthetic_ticks(n_symbols, 75)
+    prices = prices.tolist()
+    setup = lambda: [EMACalculator(5) for _ in range(n_symbols)]
+
+    def run(calculators):
+        return _timed_loop(len(prices), lambda i: calculators[i % n_symbols].add_price(prices[i]))
+    return len(prices), setup, run
+
+
+@case('ema_bank.update', 'symbols')
+def bench_ema_bank_update(n_symbols):
+    _, prices, _ = synthetic_ticks(n_symbols, 75)
+    prices = prices.tolist()
+    setup = lambda: [EMABank() for _ in range(n_symbols)]
+
+    def run(banks):
+        return _timed_loop(len(prices), lambda i: banks[i % n_symbols].update(prices[i]))
+    return len(prices), setup, run
+
+
+@case('candle_generator.add_tick', 'symbols')
+def bench_add_tick(n_symbols):
+    from main import RealTimeCandleGenerator
+
+    symbols, prices, stamps = synthetic_ticks(n_symbols, TICKS_PER_SYMBOL)
+    symbols, prices, stamps = symbols.tolist(), prices.tolist(), stamps.tolist()
+    setup = lambda: [RealTimeCandleGenerator(5) for _ in range(n_symbols)]
+
+    def run(generators):
+        return _timed_loop(len(prices), lambda i: generators[symbols[i]].add_tick(prices[i], stamps[i]))
+    return len(prices), setup, run
+
+
+@case('state_table.update', 'symbols')
+def bench_state_table(n_symbols):
+    from multi_monitor import InstrumentStateTable
+
+    _, prices, stamps = synthetic_ticks(n_symbols, TICKS_PER_SYMBOL // 10)
+    prices = prices.reshape(-1, n_symbols)
+    stamps = stamps[::n_symbols]
+    setup = lambda: InstrumentStateTable([f"SYM{i}" for i in range(n_symbols)])
+
+    def run(table):
+        return _timed_loop(len(stamps), lambda i: table.update(prices[i], stamps[i]))
+    # One op is one update cycle across all symbols
+    return len(stamps), setup, run
+
+
+@case('alert_eval.scalar', 'symbols')
+def bench_alert_scalar(n_symbols):
+    candles, ema = _completed_candles(n_symbols)
+    rows = [
+        {'open': o, 'high': h, 'low': l, 'close': c}
+        for o, h, l, c in zip(candles['open'], candles['high'], candles['low'], candles['close'])
+    ]
+    emas = ema.tolist()
+
+    def check(i):
+        candle = rows[i]
+        e = emas[i]
+        return candle['low'] > e and candle['high'] > e and candle['open'] > e and candle['close'] > e
+
+    return len(rows), lambda: None, lambda _: _timed_loop(len(rows), check)
+
+
+@case('alert_eval.vectorized', 'symbols')
+def bench_alert_vectorized(n_symbols):
+    candles, ema = _completed_candles(n_symbols)
+    rules = RuleSet(DEFAULT_RULES)
+    indicators = {rules.key('ema(5)'): ema}
+    return n_symbols, lambda: None, lambda _: _timed_call(lambda: rules.evaluate(candles, indicators))
+
+
+@case('rules.evaluate', 'days')
+def bench_rules_evaluate(n_days):
+    bars = resample_columns(synthetic_candles(n_days), 5)
+    rules = RuleSet(BENCH_RULES)
+    return len(bars['ts']), lambda: None, lambda _: _timed_call(lambda: rules.evaluate(bars))
+
+
+@case('rules.stream', 'symbols')
+def bench_rules_stream(n_symbols):
+    _, prices, _ = synthetic_ticks(n_symbols, 75)
+    prices = prices.reshape(-1, n_symbols)
+    rules = RuleSet(BENCH_RULES)
+
+    def run(stream):
+        return _timed_loop(len(prices), lambda i: stream.update({
+            'open': prices[i - 1], 'high': prices[i] + 1, 'low': prices[i] - 1, 'close': prices[i]
+        }))
+    # One op is one candle close evaluated for all symbols
+    return len(prices), lambda: rules.stream(n_symbols), run
+
+
+def _completed_candles(n_symbols):
+    rng = np.random.default_rng(3)
+    close = 1000 + rng.normal(0, 5, n_symbols)
+    open_ = close + rng.normal(0, 2, n_symbols)
+    candles = {
+        'open': open_,
+        'high': np.maximum(open_, close) + 1,
+        'low': np.minimum(open_, close) - 1,
+        'close': close
+    }
+    return candles, close + rng.normal(0, 3, n_symbols)
+
+
+@case('convert_to_5min_candles', 'days')
+def bench_convert_to_5min(n_days):
+    from main import convert_to_5min_candles
+
+    df = _minute_frame(n_days)
+    return len(df), lambda: None, lambda _: _timed_call(lambda: convert_to_5min_candles(df))
+
+
+@case('upstox_client.resample_to_5min', 'days')
+def bench_upstox_resample(n_days):
+    client = _bare_upstox_client()
+    df = _minute_frame(n_days)
+    return len(df), lambda: None, lambda _: _timed_call(lambda: client.resample_to_5min(df))
+
+
+@case('upstox_client.calculate_ema', 'days')
+def bench_upstox_ema(n_days):
+    client = _bare_upstox_client()
+    close = synthetic_candles(n_days)['close']
+    return len(close), lambda: None, lambda _: _timed_call(lambda: client.calculate_ema(close, 5))
+
+
+@case('resampler.resample_columns', 'days')
+def bench_resample_columns(n_days):
+    columns = synthetic_candles(n_days)
+    return len(columns['ts']), lambda: None, lambda _: _timed_call(lambda: resample_columns(columns, 5))
+
+
+@case('resampler.resample_multi', 'days')
+def bench_resample_multi(n_days):
+    columns = synthetic_candles(n_days)
+    return len(columns['ts']), lambda: None, lambda _: _timed_call(lambda: resample_multi(columns))
+
+
+@case('resampler.stream', 'days')
+def bench_resample_stream(n_days):
+    columns = synthetic_candles(n_days)
+    rows = list(zip(columns['ts'].tolist(), columns['open'].tolist(), columns['high'].tolist(),
+                    columns['low'].tolist(), columns['close'].tolist(), columns['volume'].tolist()))
+
+    def run(resampler):
+        return _timed_loop(len(rows), lambda i: resampler.add_candle(*rows[i]))
+    # One op is one 1-minute candle folded into all five timeframes
+    return len(rows), StreamingResampler, run
+
+
+@case('indicators.ema_array', 'days')
+def bench_ema_array(n_days):
+    close = synthetic_candles(n_days)['close']
+    return len(close), lambda: None, lambda _: _timed_call(lambda: ema_array(close, 5))
+
+
+@case('indicators.suite_batch', 'days')
+def bench_suite_batch(n_days):
+    bars = resample_columns(synthetic_candles(n_days), 5)
+    suite = IndicatorSuite()
+    return len(bars['ts']), lambda: None, lambda _: _timed_call(lambda: suite.batch(bars))
+
+
+@case('indicators.suite_update', 'symbols')
+def bench_suite_update(n_symbols):
+    _, prices, stamps = synthetic_ticks(n_symbols, 75, step_ms=300_000)
+    prices = prices.reshape(-1, n_symbols)
+    ts = stamps[::n_symbols] // 1000
+
+    def run(suite):
+        return _timed_loop(len(prices), lambda i: suite.update({
+            'ts': ts[i], 'high': prices[i] + 1, 'low': prices[i] - 1, 'close': prices[i], 'volume': 1000.0
+        }))
+    # One op is one candle close folded into every indicator for all symbols
+    return len(prices), lambda: IndicatorSuite(n_symbols), run
+
+
+def _minute_frame(n_days):
+    df = columns_to_dataframe(synthetic_candles(n_days))
+    return df.drop(columns=['timestamp'])
+
+
+def _bare_upstox_client():
+    # The resample/EMA methods need no credentials; skip __init__ (which authenticates)
+    from upstox_client import UpstoxClient
+    return UpstoxClient.__new__(UpstoxClient)
+
+
+# --- RUNNER ---
+def run_case(name, size, repeats):
+    """Run one benchmark and return its metrics"""
+    _, func = CASES[name]
+    n_ops, setup, run = func(size)
+
+    # Warm-up run (imports, allocator, caches) is not measured; its time sets
+    # how many runs each repeat needs to last MIN_REPEAT_SECONDS
+    state = setup()
+    t0 = time.perf_counter()
+    run(state)
+    rounds = max(1, int(np.ceil(MIN_REPEAT_SECONDS / max(time.perf_counter() - t0, 1e-9))))
+
+    samples = []
+    throughputs = []
+    relative = []
+    for _ in range(repeats):
+        elapsed = 0.0
+        gc.collect()
+        before = _calibration_seconds()
+        for _ in range(rounds):
+            state = setup()
+            t0 = time.perf_counter()
+            samples.extend(run(state))
+            elapsed += time.perf_counter() - t0
+        throughput = n_ops * rounds / elapsed
+        throughputs.append(throughput)
+        relative.append(throughput * (before + _calibration_seconds()) / 2)
+
+    # Peak memory is measured on a separate run; tracemalloc slows execution
+    state = setup()
+    gc.collect()
+    tracemalloc.start()
+    run(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples = np.asarray(samples)
+    return {
+        'ops': n_ops,
+        'rounds': rounds,
+        'throughput': float(np.median(throughputs)),
+        # Ops per calibration workload; what compare() checks
+        'relative': float(np.median(relative)),
+        'p50_us': float(np.percentile(samples, 50)) / 1000,
+        'p95_us': float(np.percentile(samples, 95)) / 1000,
+        'p99_us': float(np.percentile(samples, 99)) / 1000,
+        'peak_mb': peak / 1e6
+    }
+
+
+def _split_key(key):
+    """'name[dimension=size]' -> (name, size)"""
+    name, rest = key.split('[', 1)
+    return name, int(rest.rstrip(']').split('=')[1])
+
+
+def run_suite(scale='quick', only=None, repeats=5):
+    results = {}
+    for name, (dimension, _) in CASES.items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        for size in SCALES[scale][dimension]:
+            key = f"{name}[{dimension}={size}]"
+            result = run_case(name, size, repeats)
+            results[key] = result
+            print(f"{key:<52} {result['throughput']:>14,.0f} ops/s  "
+                  f"p50 {result['p50_us']:>10.2f}µs  p99 {result['p99_us']:>10.2f}µs  "
+                  f"peak {result['peak_mb']:>8.2f}MB")
+    return results
+
+
+def compare(results, baseline, tolerance, rerun=None):
+    """
+    Return a list of regression messages against a saved baseline
+
+    Throughput is compared as the median over repeats of the calibrated
+    ('relative') figure, so a slower or busier machine does not read as a
+    regression; baselines saved before it existed fall back to raw ops/s.
+    A case that still looks slower is measured again with rerun(key), up to
+    RECHECKS times, and only reported if every measurement is slower.
+    """
+    regressions = []
+    for key, base in baseline['results'].items():
+        current = results.get(key)
+        if current is None:
+            continue
+        stat = 'relative' if 'relative' in base else 'throughput'
+        for _ in range(RECHECKS if rerun is not None else 0):
+            if current[stat] >= base[stat] * (1 - tolerance):
+                break
+            print(f"🔁 {key} looks slower; measuring again")
+            retry = rerun(key)
+            if retry[stat] > current[stat]:
+                current = results[key] = retry
+        if current[stat] < base[stat] * (1 - tolerance):
+            change = current[stat] / base[stat] - 1
+            regressions.append(f"{key}: throughput {current['throughput']:,.0f} ops/s "
+                               f"(baseline {base['throughput']:,.0f} ops/s), {change:+.0%} calibrated")
+        if current['peak_mb'] > base['peak_mb'] * (1 + tolerance) + 0.1:
+            regressions.append(f"{key}: peak memory {current['peak_mb']:.2f}MB "
+                               f"> baseline {base['peak_mb']:.2f}MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the tick, candle, EMA, resample and alert hot paths on "
+                    "seeded synthetic data (no network access needed)",
+        epilog="Latency percentiles are per call for per-tick/per-price cases and per "
+               "batch call for array cases; throughput is rows processed per second, the median "
+               "of the repeats. --compare checks throughput relative to a fixed calibration "
+               "workload timed around each repeat."
+    )
+    parser.add_argument('--scale', choices=sorted(SCALES), default='quick')
+    parser.add_argument('--only', nargs='*', help="Run cases whose name contains any of these")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--save', help="Write results to this JSON file as a baseline")
+    parser.add_argument('--compare', help="Compare against a baseline JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed relative slowdown / memory growth (default 0.25)")
+    args = parser.parse_args()
+
+    print(f"🧪 Benchmarks ({args.scale}) | Python {platform.python_version()} | "
+          f"NumPy {np.__version__} | pandas {pd.__version__}")
+    results = run_suite(args.scale, args.only, args.repeats)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'scale': args.scale, 'python': platform.python_version(), 'results': results}, f, indent=2)
+        print(f"✅ Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rerun = lambda key: run_case(*_split_key(key), args.repeats)
+        regressions = compare(results, baseline, args.tolerance, rerun)
+        if regressions:
+            print(f"\n❌ {len(regressions)} REGRESSION(S) against {args.compare}:")
+            for message in regressions:
+                print(f"   ❌ {message}")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import io
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from logger import get_logger
+from trading_calendar import get_calendar
+
+log = get_logger("candle_cache")
+
+IST = timezone(timedelta(hours=5, minutes=30))
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".candle_cache")
+
+COLUMNS = ('ts', 'open', 'high', 'low', 'close', 'volume', 'oi')
+_DTYPES = {'ts': np.int64, 'volume': np.int64, 'oi': np.int64}
+
+INTERVAL_SECONDS = {
+    '1minute': 60,
+    '30minute': 30 * 60,
+    'day': 24 * 60 * 60
+}
+
+
+def empty_columns():
+    return {name: np.empty(0, dtype=_DTYPES.get(name, np.float64)) for name in COLUMNS}
+
+
+def candles_to_columns(candles):
+    """
+    Convert raw API candles to sorted columnar arrays
+
+    Args:
+        candles: List of [timestamp, open, high, low, close, volume, (oi)] rows
+                 with ISO timestamps, as returned by the historical candle API
+
+    Returns:
+        dict: column name -> NumPy array; 'ts' is epoch seconds
+    """
+    if not candles:
+        return empty_columns()
+
+    n = len(candles)
+    ts = np.fromiter((datetime.fromisoformat(row[0]).timestamp() for row in candles), dtype=np.float64, count=n)
+    values = np.array([row[1:7] if len(row) >= 7 else list(row[1:6]) + [0] for row in candles], dtype=np.float64)
+    order = np.argsort(ts, kind='stable')
+
+    columns = {'ts': ts[order].astype(np.int64)}
+    for i, name in enumerate(COLUMNS[1:]):
+        columns[name] = values[order, i].astype(_DTYPES.get(name, np.float64))
+    return columns
+
+
+def concat_columns(parts):
+    parts = [part for part in parts if len(part['ts'])]
+    if not parts:
+        return empty_columns()
+    return {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+
+
+def columns_to_dataframe(columns):
+    """DataFrame in the shape returned by UpstoxClient.get_historical_data"""
+    import pandas as pd
+
+    df = pd.DataFrame({name: columns[name] for name in COLUMNS[1:]})
+    df['datetime'] = pd.to_datetime(columns['ts'], unit='s', utc=True).tz_convert('Asia/Kolkata')
+    df.insert(0, 'timestamp', df['datetime'])
+    return df
+
+
+def split_by_day(columns):
+    """Split columns into {date (IST): columns}"""
+    if not len(columns['ts']):
+        return {}
+    day_numbers = (columns['ts'] + 19800) // 86400
+    boundaries = np.flatnonzero(np.diff(day_numbers)) + 1
+    days = {}
+    for lo, hi in zip(np.r_[0, boundaries], np.r_[boundaries, len(day_numbers)]):
+        day = datetime.fromtimestamp(int(columns['ts'][lo]), IST).date()
+        days[day] = {name: columns[name][lo:hi] for name in COLUMNS}
+    return days
+
+
+class CandleCache:
+    def __init__(self, http, cache_dir=DEFAULT_CACHE_DIR, calendar=None):
+        """
+        Read-through on-disk candle cache keyed by instrument, interval and date
+
+        Closed trading days are fetched once and stored permanently as one
+        compact columnar .npz file per day. The current day is stored
+        separately and only re-requested once a new candle can have closed.
+        Weekends and exchange holidays are never requested.
+
+        Args:
+            http: UpstoxHTTPClient used for cache misses
+            cache_dir: Cache directory
+            calendar: TradingCalendar (default: trading_calendar.get_calendar())
+        """
+        self.http = http
+        self.cache_dir = cache_dir
+        self.calendar = calendar or get_calendar()
+        self.requests_made = 0
+
+    def _path(self, instrument_key, interval, day, current=False):
+        safe_key = instrument_key.replace('|', '_').replace(' ', '_').replace('/', '_')
+        suffix = '.current.npz' if current else '.npz'
+        return os.path.join(self.cache_dir, safe_key, interval, day.isoformat() + suffix)
+
+    @staticmethod
+    def _load(path):
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return {name: data[name] for name in COLUMNS}
+
+    @staticmethod
+    def _save(path, columns):
+        # Write to a temporary file and rename so readers never see a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez(buffer, **columns)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+
+    def load_day(self, instrument_key, interval, day):
+        """Cached candles for a closed day, or None if not cached"""
+        return self._load(self._path(instrument_key, interval, day))
+
+    def _fetch_history(self, instrument_key, interval, from_day, to_day):
+        path = self.http.historical_candles_path(instrument_key, interval, to_day.isoformat(), from_day.isoformat())
+        self.requests_made += 1
+        data = self.http.get_json(path)
+        return candles_to_columns(data['data']['candles'])
+
+    def _fetch_intraday(self, instrument_key, interval):
+        self.requests_made += 1
+        data = self.http.get_json(self.http.intraday_candles_path(instrument_key, interval))
+        return candles_to_columns(data['data']['candles'])
+
+    def get_range(self, instrument_key, interval, from_day, to_day, chunk_days=28):
+        """
+        Candles for the closed days from_day..to_day (inclusive), oldest first
+
+        Missing days are fetched in contiguous runs of at most chunk_days per
+        request and stored permanently; a trading day that comes back empty
+        is requested again next time.
+        """
+        days = [from_day + timedelta(days=offset) for offset in range((to_day - from_day).days + 1)]
+        trading = set(self.calendar.trading_days(from_day, to_day))
+        parts = {day: self.load_day(instrument_key, interval, day) if day in trading else empty_columns()
+                 for day in days}
+        missing = [day for day in days if parts[day] is None]
+
+        # Group missing days into runs of consecutive trading days, split to chunk_days
+        runs = []
+        for day in missing:
+            if runs and self.calendar.next_trading_day(runs[-1][-1]) == day and len(runs[-1]) < chunk_days:
+                runs[-1].append(day)
+            else:
+                runs.append([day])
+
+        for run in runs:
+            fetched = split_by_day(self._fetch_history(instrument_key, interval, run[0], run[-1]))
+            for day in run:
+                if day in fetched:
+                    parts[day] = fetched[day]
+                    self._save(self._path(instrument_key, interval, day), parts[day])
+                else:
+                    # A trading day without candles is an API hiccup far more
+                    # often than an unlisted closure: serve it empty, never cache it
+                    log.warning("⚠️ No %s candles for %s on %s; not cached", interval, instrument_key, day)
+                    parts[day] = empty_columns()
+
+        return concat_columns([parts[day] for day in days])
+
+    def get_columns(self, instrument_key, interval="1minute", days_back=3, now=None):
+        """
+        Candles from days_back days ago up to now, served from the cache where possible
+
+        Args:
+            instrument_key: Instrument identifier (e.g. "NSE_INDEX|Nifty 50")
+            interval: Candle interval (1minute, 30minute, day)
+            days_back: Number of closed days to include before today
+            now: Current time (default: now, IST)
+
+        Returns:
+            dict: column name -> NumPy array, oldest first
+        """
+        now = now or datetime.now(IST)
+        today = now.astimezone(IST).date()
+        history = self.get_range(instrument_key, interval, today - timedelta(days=days_back), today - timedelta(days=1))
+        current = self._refresh_today(instrument_key, interval, today, now)
+        return concat_columns([history, current])
+
+    def _refresh_today(self, instrument_key, interval, today, now):
+        path = self._path(instrument_key, interval, today, current=True)
+        cached = self._load(path)
+        interval_seconds = INTERVAL_SECONDS.get(interval, 60)
+
+        sessions = self.calendar.sessions(today)
+        if not sessions or now < sessions[0][0]:
+            # Closed day, or the session has not opened yet: nothing to fetch
+            return cached if cached is not None else empty_columns()
+        if cached is not None and len(cached['ts']) and cached['ts'][-1] + interval_seconds >= sessions[-1][1].timestamp():
+            # The cached candles already reach the session close
+            return cached
+
+        # Nothing new can exist until the candle after the last cached one has closed
+        if cached is not None and len(cached['ts']):
+            if now.timestamp() < cached['ts'][-1] + 2 * interval_seconds:
+                return cached
+        elif cached is not None and now.timestamp() - os.path.getmtime(path) < interval_seconds:
+            return cached
+
+        try:
+            fetched = split_by_day(self._fetch_intraday(instrument_key, interval)).get(today, empty_columns())
+        except Exception as e:
+            if cached is not None:
+                log.warning("⚠️ Intraday refresh failed, using cached candles: %s", e)
+                return cached
+            raise
+
+        if cached is not None and len(cached['ts']) and len(fetched['ts']):
+            # Keep cached rows the refresh no longer covers, take everything newer from the API
+            older = cached['ts'] < fetched['ts'][0]
+            fetched = concat_columns([{name: cached[name][older] for name in COLUMNS}, fetched])
+        self._save(path, fetched)
+        return fetched
+
+    def get_dataframe(self, instrument_key, interval="1minute", days_back=3, now=None):
+        """Like get_columns, returned as a DataFrame (timestamp, OHLC, volume, oi, datetime)"""
+        columns = self.get_columns(instrument_key, interval, days_back, now)
+        if not len(columns['ts']):
+            raise Exception("No candle data received")
+        return columns_to_dataframe(columns)
+
+    def prune(self, keep_days=30):
+        """Delete cached days older than keep_days"""
+        cutoff = time.time() - keep_days * 86400
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
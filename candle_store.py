@@ -0,0 +1,139 @@
+import math
+from datetime import datetime
+
+import numpy as np
+
+from trading_calendar import IST
+
+SESSION_MINUTES = 375  # NSE cash session, 09:15 - 15:30 IST
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close')
+
+
+def day_capacity(interval_minutes):
+    """Number of candles in one full trading session for an interval"""
+    return math.ceil(SESSION_MINUTES / interval_minutes)
+
+
+class CandleRingBuffer:
+    FIELDS = ('start', 'open', 'high', 'low', 'close', 'volume', 'tick_count')
+
+    def __init__(self, capacity, n_slots=1):
+        """
+        Fixed-size columnar store for completed candles
+
+        Each column is a preallocated (n_slots, 2 * capacity) NumPy array and
+        every candle is written twice, capacity apart, so the last N candles
+        of a slot are always one contiguous slice. last() therefore returns
+        views instead of copies, and memory never grows after construction.
+
+        Args:
+            capacity: Candles kept per slot (older candles are overwritten)
+            n_slots: Number of instruments sharing the store
+        """
+        self.capacity = capacity
+        self.n_slots = n_slots
+        shape = (n_slots, 2 * capacity)
+        self.start = np.zeros(shape, dtype=np.int64)  # candle start, epoch seconds
+        self.open = np.zeros(shape)
+        self.high = np.zeros(shape)
+        self.low = np.zeros(shape)
+        self.close = np.zeros(shape)
+        self.volume = np.zeros(shape)
+        self.tick_count = np.zeros(shape, dtype=np.int32)
+        self.appended = np.zeros(n_slots, dtype=np.int64)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, field).nbytes for field in self.FIELDS) + self.appended.nbytes
+
+    def size(self, slot=0):
+        """Number of candles currently held for slot"""
+        return int(min(self.appended[slot], self.capacity))
+
+    def append(self, start, open_, high, low, close, volume=0.0, tick_count=0, slot=0):
+        """Store one completed candle"""
+        capacity = self.capacity
+        i = int(self.appended[slot] % capacity)
+        j = i + capacity
+        row = self.start[slot]
+        row[i] = row[j] = start
+        row = self.open[slot]
+        row[i] = row[j] = open_
+        row = self.high[slot]
+        row[i] = row[j] = high
+        row = self.low[slot]
+        row[i] = row[j] = low
+        row = self.close[slot]
+        row[i] = row[j] = close
+        row = self.volume[slot]
+        row[i] = row[j] = volume
+        row = self.tick_count[slot]
+        row[i] = row[j] = tick_count
+        self.appended[slot] += 1
+
+    def _window(self, n, slot):
+        size = self.size(slot)
+        n = size if n is None else min(n, size)
+        end = int((self.appended[slot] - 1) % self.capacity) + self.capacity + 1 if size else self.capacity
+        return end - n, end
+
+    def last(self, n=None, slot=0, fields=FIELDS):
+        """
+        Zero-copy views of the last n completed candles, oldest first
+
+        Returns:
+            dict: field -> 1-D array view (do not hold on to it across appends
+                  if the values must stay fixed; copy it instead)
+        """
+        lo, hi = self._window(n, slot)
+        return {field: getattr(self, field)[slot, lo:hi] for field in fields}
+
+    def column(self, field, n=None, slot=0):
+        """Zero-copy view of one column for the last n candles"""
+        lo, hi = self._window(n, slot)
+        return getattr(self, field)[slot, lo:hi]
+
+    def candle(self, index=-1, slot=0, interval_minutes=None):
+        """One stored candle as a dict (index counts from the oldest, negative from the newest)"""
+        size = self.size(slot)
+        if not -size <= index < size:
+            raise IndexError("candle index out of range")
+        lo, _ = self._window(None, slot)
+        pos = lo + (index % size)
+        start = int(self.start[slot, pos])
+        candle = {
+            'start': start,
+            'start_time': datetime.fromtimestamp(start, IST),
+            'open': float(self.open[slot, pos]),
+            'high': float(self.high[slot, pos]),
+            'low': float(self.low[slot, pos]),
+            'close': float(self.close[slot, pos]),
+            'volume': float(self.volume[slot, pos]),
+            'tick_count': int(self.tick_count[slot, pos])
+        }
+        if interval_minutes is not None:
+            candle['end_time'] = datetime.fromtimestamp(start + interval_minutes * 60, IST)
+        return candle
+
+
+class MultiTimeframeStore:
+    def __init__(self, n_slots=1, intervals=(1, 5)):
+        """
+        One CandleRingBuffer per interval, each sized for a full trading day
+
+        Args:
+            n_slots: Number of instruments
+            intervals: Candle intervals in minutes
+        """
+        self.buffers = {
+            interval: CandleRingBuffer(day_capacity(interval), n_slots)
+            for interval in intervals
+        }
+
+    def __getitem__(self, interval):
+        return self.buffers[interval]
+
+    @property
+    def nbytes(self):
+        return sum(buffer.nbytes for buffer in self.buffers.values())
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import pickle
+import tempfile
+import time
+
+from logger import get_logger
+
+log = get_logger("checkpoint")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_PATH = os.environ.get('CHECKPOINT_PATH', os.path.join(ROOT, ".alert_state", "monitor.checkpoint"))
+CHECKPOINT_SECONDS = float(os.environ.get('CHECKPOINT_SECONDS', '60'))  # 0 disables checkpointing
+CHECKPOINT_MAX_AGE = float(os.environ.get('CHECKPOINT_MAX_AGE', str(4 * 24 * 3600)))  # older ones cold-start
+VERSION = 1
+
+
+# --- FILE ---
+def write_checkpoint(data, path=CHECKPOINT_PATH):
+    """
+    Atomically replace the checkpoint file with data (bytes)
+
+    The bytes go to a temporary file in the same directory, which is
+    fsync'ed and renamed over the old checkpoint: a crash leaves either the
+    previous checkpoint or the new one, never a torn file.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.checkpoint-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_checkpoint(path=CHECKPOINT_PATH, max_age=CHECKPOINT_MAX_AGE, now=None):
+    """
+    The state saved by a Checkpointer, or None if there is no usable checkpoint
+
+    Args:
+        path: Checkpoint file
+        max_age: Checkpoints older than this many seconds are ignored
+        now: Current Unix time (default: now)
+
+    Returns:
+        dict: The captured state plus 'version' and 'taken' (Unix time), or None
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except Exception as e:
+        log.warning("⚠️  Unreadable checkpoint %s: %s", path, e)
+        return None
+    if not isinstance(state, dict) or state.get('version') != VERSION:
+        log.warning("⚠️  Checkpoint %s has an unsupported version; ignored", path)
+        return None
+    age = (time.time() if now is None else now) - state['taken']
+    if age > max_age:
+        log.info("🕰️  Checkpoint is %.1f hours old; ignored", age / 3600)
+        return None
+    return state
+
+
+# --- PERIODIC SNAPSHOTS ---
+class Checkpointer:
+    def __init__(self, capture, path=CHECKPOINT_PATH, every=CHECKPOINT_SECONDS):
+        """
+        Snapshot live monitor state to a file periodically and on request
+
+        capture() is called on the event loop while the pipeline is settled
+        (nothing in flight between stages) and pickled right away, so the
+        snapshot is consistent across stages; only the file write runs on
+        a worker thread.
+
+        Args:
+            capture: Function () -> picklable dict of state
+            path: Checkpoint file
+            every: Seconds between snapshots
+        """
+        self.capture = capture
+        self.path = path
+        self.every = every
+        self.saved = 0
+        self.size = 0
+        self.last_ms = 0.0
+        self._requested = None  # asyncio.Event, created on the running loop
+
+    def request(self):
+        """Take a snapshot as soon as possible (e.g. right after an alert was queued)"""
+        if self._requested is not None:
+            self._requested.set()
+
+    def snapshot(self):
+        """Capture and pickle the state now"""
+        state = dict(self.capture(), version=VERSION, taken=time.time())
+        return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    async def save(self, pipeline=None):
+        """
+        Write a snapshot, first waiting for the pipeline to settle
+
+        Returns:
+            bool: False if the pipeline stayed busy or the write failed
+        """
+        if pipeline is not None and not await pipeline.settle():
+            log.warning("⚠️  Pipeline busy; checkpoint skipped")
+            return False
+        started = time.perf_counter()
+        data = self.snapshot()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, write_checkpoint, data, self.path)
+        except Exception as e:
+            log.error("❌ Checkpoint write failed: %s", e)
+            return False
+        self.saved += 1
+        self.size = len(data)
+        self.last_ms = (time.perf_counter() - started) * 1000
+        log.debug("💾 Checkpoint saved", bytes=self.size, ms=round(self.last_ms, 2))
+        return True
+
+    async def run(self, pipeline):
+        """Save every `every` seconds, or sooner when requested, until cancelled"""
+        self._requested = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._requested.wait(), self.every)
+            except asyncio.TimeoutError:
+                pass
+            self._requested.clear()
+            await self.save(pipeline)
@@ -0,0 +1,723 @@
+import math
+from array import array
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from resampler import IST_OFFSET_SECONDS
+
+DEFAULT_EMA_PERIODS = (5, 9, 21, 50, 200)
+SMA_PERIOD = 20
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+BOLLINGER_PERIOD = 20
+BOLLINGER_WIDTH = 2.0  # band distance in standard deviations
+SUPERTREND_PERIOD = 10
+SUPERTREND_MULTIPLIER = 3.0  # band distance in ATRs
+
+
+def ema_fold(value, closes, alpha):
+    """
+    Advance an EMA from value over closes in one vectorized step
+
+    Unrolls ema_k = alpha * x_k + (1 - alpha) * ema_(k-1) into
+    (1 - alpha)^m * value + alpha * sum((1 - alpha)^(m - k) * x_k).
+    """
+    m = len(closes)
+    if m == 0:
+        return value
+    decay = 1 - alpha
+    weights = decay ** np.arange(m - 1, -1, -1, dtype=np.float64)
+    return float(decay ** m * value + alpha * np.dot(weights, closes))
+
+
+def ema_array(values, period, seed='sma', block=128, alpha=None):
+    """
+    EMA of a whole array without a per-element Python loop
+
+    The recursion is unrolled in blocks: within a block of m values,
+    ema_k = decay^k * (ema_0 + alpha * cumsum(x_j * decay^-j)), so each block
+    is a few NumPy operations. block bounds decay^-j to keep it finite.
+
+    Args:
+        values: 1-D array of prices
+        period: EMA period
+        seed: 'sma' to start from the SMA of the first `period` values (like
+              EMACalculator; earlier outputs are NaN), or 'first' to start
+              from the first value (like pandas ewm(adjust=False))
+        block: Block length for the unrolled recursion
+        alpha: Smoothing factor (default 2 / (period + 1); 1 / period gives
+               Wilder's smoothing, as used by RSI and ATR)
+
+    Returns:
+        np.ndarray: EMA per input value
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    out = np.full(n, np.nan)
+    if period <= 1:
+        out[:] = x
+        return out
+
+    alpha = 2 / (period + 1) if alpha is None else alpha
+    decay = 1 - alpha
+    if seed == 'sma':
+        if n < period:
+            return out
+        value = x[:period].sum() / period
+        out[period - 1] = value
+        pos = period
+    else:
+        if n == 0:
+            return out
+        value = out[0] = x[0]
+        pos = 1
+
+    steps = np.arange(1, block + 1, dtype=np.float64)
+    powers = decay ** steps
+    inverse = decay ** -steps
+    while pos < n:
+        chunk = x[pos:pos + block]
+        m = len(chunk)
+        segment = powers[:m] * (value + alpha * np.cumsum(chunk * inverse[:m]))
+        out[pos:pos + m] = segment
+        value = segment[-1]
+        pos += m
+    return out
+
+
+# --- BATCH INDICATORS ---
+def sma_array(values, period=SMA_PERIOD):
+    """Simple moving average of the last `period` values (NaN until there are `period`)"""
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) >= period:
+        out[period - 1:] = sliding_window_view(x, period).mean(axis=1)
+    return out
+
+
+def bollinger_array(values, period=BOLLINGER_PERIOD, width=BOLLINGER_WIDTH):
+    """
+    Bollinger bands: SMA +/- width population standard deviations of the last `period` values
+
+    Returns:
+        tuple: (middle, upper, lower) arrays, NaN until there are `period` values
+    """
+    x = np.asarray(values, dtype=np.float64)
+    middle = np.full(len(x), np.nan)
+    deviation = np.full(len(x), np.nan)
+    if len(x) >= period:
+        windows = sliding_window_view(x, period)
+        middle[period - 1:] = windows.mean(axis=1)
+        deviation[period - 1:] = windows.std(axis=1)
+    return middle, middle + width * deviation, middle - width * deviation
+
+
+def _rsi(gain, loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + gain / loss)
+    # No losses: 100, or 50 if the price did not move at all
+    return np.where(loss == 0, np.where(gain == 0, 50.0, 100.0), rsi)
+
+
+def rsi_array(close, period=RSI_PERIOD):
+    """
+    Wilder's RSI (0-100), NaN for the first `period` closes
+
+    The average gain and loss start as the mean of the first `period`
+    changes and then use Wilder's smoothing (alpha = 1 / period).
+    """
+    x = np.asarray(close, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) > period:
+        change = np.diff(x)
+        gain = ema_array(np.maximum(change, 0.0), period, alpha=1 / period)
+        loss = ema_array(np.maximum(-change, 0.0), period, alpha=1 / period)
+        out[1:] = _rsi(gain, loss)
+    return out
+
+
+def true_range(high, low, close):
+    """max(high - low, |high - previous close|, |low - previous close|); high - low for the first bar"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    previous = np.r_[np.nan, np.asarray(close, dtype=np.float64)[:-1]]
+    return np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+
+
+def atr_array(high, low, close, period=ATR_PERIOD):
+    """Wilder's average true range, NaN for the first period - 1 bars"""
+    return ema_array(true_range(high, low, close), period, alpha=1 / period)
+
+
+def vwap_array(ts, high, low, close, volume, utc_offset=IST_OFFSET_SECONDS):
+    """
+    Session VWAP of the typical price (high + low + close) / 3
+
+    Args:
+        ts: Bar start in epoch seconds; the VWAP restarts on every local date
+        utc_offset: Exchange UTC offset in seconds
+
+    Returns:
+        np.ndarray: VWAP per bar, NaN while the session has no volume (indices)
+    """
+    session = (np.asarray(ts).astype(np.int64) + utc_offset) // 86400
+    volume = np.asarray(volume, dtype=np.float64)
+    typical = (np.asarray(high, dtype=np.float64) + low + close) / 3
+    n = len(session)
+    if n == 0:
+        return np.full(0, np.nan)
+
+    cum_pv = np.cumsum(typical * volume)
+    cum_volume = np.cumsum(volume)
+    starts = np.flatnonzero(np.r_[True, session[1:] != session[:-1]])
+    lengths = np.diff(np.r_[starts, n])
+    cum_pv -= np.repeat(np.r_[0.0, cum_pv[starts[1:] - 1]], lengths)
+    cum_volume -= np.repeat(np.r_[0.0, cum_volume[starts[1:] - 1]], lengths)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(cum_volume > 0, cum_pv / cum_volume, np.nan)
+
+
+def supertrend_array(high, low, close, period=SUPERTREND_PERIOD, multiplier=SUPERTREND_MULTIPLIER):
+    """
+    SuperTrend line and direction
+
+    The bands are (high + low) / 2 +/- multiplier * ATR. While price stays
+    inside them the lower band only rises and the upper band only falls.
+    The line follows the lower band in an uptrend (direction 1) and the upper
+    band in a downtrend (-1), and flips when the close crosses it. The ATR is
+    vectorized; the band recursion is a loop over plain floats.
+
+    Returns:
+        tuple: (line, direction) arrays; NaN / 0 until the ATR is ready
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    atr = atr_array(high, low, close, period)
+    middle = (high + low) / 2
+    upper_basic = (middle + multiplier * atr).tolist()
+    lower_basic = (middle - multiplier * atr).tolist()
+    closes = close.tolist()
+
+    n = len(closes)
+    line = np.full(n, np.nan)
+    direction = np.zeros(n)
+    upper = lower = previous = math.nan
+    trend = 0
+    for i in range(n):
+        basic_upper, basic_lower, price = upper_basic[i], lower_basic[i], closes[i]
+        if basic_upper != basic_upper:
+            previous = price
+            continue
+        if trend == 0:
+            upper, lower, trend = basic_upper, basic_lower, 1
+        else:
+            if basic_upper < upper or previous > upper:
+                upper = basic_upper
+            if basic_lower > lower or previous < lower:
+                lower = basic_lower
+            if trend == 1 and price < lower:
+                trend = -1
+            elif trend == -1 and price > upper:
+                trend = 1
+        line[i] = lower if trend == 1 else upper
+        direction[i] = trend
+        previous = price
+    return line, direction
+
+
+# --- EMA BANK ---
+class EMABank:
+    __slots__ = ('periods', 'count', '_index', '_alphas', '_decays', '_values', '_sums')
+
+    def __init__(self, periods=DEFAULT_EMA_PERIODS):
+        """
+        Incremental EMAs for several periods with constant memory
+
+        Only the current EMA and, until a period is seeded, the running sum of
+        its first prices are kept. Each EMA starts from the SMA of its first
+        `period` prices, like EMACalculator.
+
+        Args:
+            periods: EMA periods to track (default 5/9/21/50/200)
+        """
+        self.periods = tuple(periods)
+        self.count = 0
+        self._index = {period: i for i, period in enumerate(self.periods)}
+        self._alphas = tuple(2 / (period + 1) for period in self.periods)
+        self._decays = tuple(1 - alpha for alpha in self._alphas)
+        self._values = array('d', [math.nan] * len(self.periods))
+        self._sums = array('d', [0.0] * len(self.periods))
+
+    def update(self, price):
+        """
+        Add one price to every EMA
+
+        Returns:
+            array: Current EMA per period, in `periods` order (NaN until ready).
+                   This is the bank's own buffer; copy it to keep a snapshot.
+        """
+        self.count += 1
+        count = self.count
+        values = self._values
+        sums = self._sums
+        for i, period in enumerate(self.periods):
+            if count > period:
+                values[i] = (price * self._alphas[i]) + (values[i] * self._decays[i])
+            elif count == period:
+                values[i] = (sums[i] + price) / period
+            else:
+                sums[i] += price
+        return values
+
+    def seed(self, closes):
+        """
+        Bulk-add historical closes (e.g. a DataFrame column's .to_numpy())
+
+        Equivalent to calling update() for every close, but each period is
+        advanced with a single vectorized step.
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        n = len(closes)
+        if n == 0:
+            return self._values
+
+        count = self.count
+        for i, period in enumerate(self.periods):
+            if count >= period:
+                self._values[i] = ema_fold(self._values[i], closes, self._alphas[i])
+            elif count + n >= period:
+                need = period - count
+                sma = (self._sums[i] + float(closes[:need].sum())) / period
+                self._values[i] = ema_fold(sma, closes[need:], self._alphas[i])
+            else:
+                self._sums[i] += float(closes.sum())
+        self.count = count + n
+        return self._values
+
+    def get(self, period):
+        """Current EMA for period, or None if not enough prices yet"""
+        value = self._values[self._index[period]]
+        return None if math.isnan(value) else value
+
+    def is_ready(self, period=None):
+        """True once period (default: the longest period) has a value"""
+        if period is None:
+            period = max(self.periods)
+        return self.count >= period
+
+    def as_dict(self):
+        """{period: ema or None}"""
+        return {period: self.get(period) for period in self.periods}
+
+
+# --- VECTOR EMA ---
+class VectorEMA:
+    __slots__ = ('period', 'seed', 'alpha', 'value', 'count', 'total')
+
+    def __init__(self, n, period, seed='sma', alpha=None):
+        """
+        One EMA per instrument slot, advanced for any subset of slots at once
+
+        Args:
+            n: Number of slots
+            period: EMA period
+            seed: 'sma' or 'first', as in ema_array
+            alpha: Smoothing factor, as in ema_array
+        """
+        self.period = period
+        self.seed = seed
+        self.alpha = 2 / (period + 1) if alpha is None else alpha
+        self.value = np.full(n, np.nan)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.total = np.zeros(n)
+
+    def update(self, values, index=None):
+        """
+        Add one value per slot
+
+        Args:
+            values: Values aligned with index (or a scalar)
+            index: Slots to advance (default: all)
+
+        Returns:
+            np.ndarray: EMA at those slots after the update (NaN until seeded)
+        """
+        idx = slice(None) if index is None else np.asarray(index)
+        count = self.count[idx] + 1
+        x = np.asarray(values, dtype=np.float64)
+        if x.shape != count.shape:
+            x = np.broadcast_to(x, count.shape)
+        self.count[idx] = count
+        previous = self.value[idx]
+        rolled = previous + self.alpha * (x - previous)
+        if self.seed == 'sma' and count.min(initial=self.period + 1) > self.period:
+            value = rolled
+        elif self.seed == 'sma':
+            total = self.total[idx] + np.where(count <= self.period, x, 0.0)
+            self.total[idx] = total
+            value = np.where(count == self.period, total / self.period,
+                             np.where(count > self.period, rolled, np.nan))
+        else:
+            value = np.where(count == 1, x, rolled)
+        self.value[idx] = value
+        return value
+
+
+class VectorRollingWindow:
+    __slots__ = ('period', 'buffer', 'count', 'anchor', 'total', 'total_sq')
+
+    def __init__(self, n, period):
+        """
+        The last `period` values per slot with a running sum and sum of squares
+
+        Values are stored relative to a per-slot anchor that is moved to the
+        window mean every time the window wraps, when the sums are also
+        recomputed from the window. That keeps the sum of squares precise at
+        index-level prices and stops rounding from accumulating, at an
+        amortized O(1) cost per update.
+
+        Args:
+            n: Number of slots
+            period: Window length
+        """
+        self.period = period
+        self.buffer = np.zeros((n, period))
+        self.count = np.zeros(n, dtype=np.int64)
+        self.anchor = np.zeros(n)
+        self.total = np.zeros(n)
+        self.total_sq = np.zeros(n)
+
+    def push(self, values, index=None):
+        """
+        Add one value per slot
+
+        Returns:
+            tuple: (mean, variance) arrays at those slots, NaN until the window is full
+        """
+        period = self.period
+        idx = np.arange(len(self.count)) if index is None else np.asarray(index)
+        count = self.count[idx]
+        x = np.broadcast_to(np.asarray(values, dtype=np.float64), count.shape)
+
+        first = count == 0
+        if first.any():
+            self.anchor[idx[first]] = x[first]
+        anchor = self.anchor[idx]
+        d = x - anchor
+        pos = count % period
+        old = np.where(count >= period, self.buffer[idx, pos], 0.0)
+        self.buffer[idx, pos] = d
+        total = self.total[idx] + d - old
+        total_sq = self.total_sq[idx] + d * d - old * old
+        count = count + 1
+
+        wrapped = np.flatnonzero(count % period == 0)
+        if wrapped.size:
+            rows = idx[wrapped]
+            window = self.buffer[rows]
+            shift = window.mean(axis=1)
+            window -= shift[:, None]
+            self.buffer[rows] = window
+            anchor[wrapped] += shift
+            self.anchor[rows] = anchor[wrapped]
+            total[wrapped] = window.sum(axis=1)
+            total_sq[wrapped] = (window * window).sum(axis=1)
+
+        self.count[idx] = count
+        self.total[idx] = total
+        self.total_sq[idx] = total_sq
+        full = count >= period
+        mean_d = total / period
+        mean = np.where(full, anchor + mean_d, np.nan)
+        variance = np.where(full, np.maximum(total_sq / period - mean_d * mean_d, 0.0), np.nan)
+        return mean, variance
+
+
+class VectorSMA(VectorRollingWindow):
+    __slots__ = ()
+
+    def __init__(self, n, period=SMA_PERIOD):
+        """Streaming sma_array for n slots"""
+        super().__init__(n, period)
+
+    def update(self, values, index=None):
+        """Add one value per slot; returns the SMA at those slots"""
+        return self.push(values, index)[0]
+
+
+class VectorBollinger(VectorRollingWindow):
+    __slots__ = ('width',)
+
+    def __init__(self, n, period=BOLLINGER_PERIOD, width=BOLLINGER_WIDTH):
+        """Streaming bollinger_array for n slots"""
+        super().__init__(n, period)
+        self.width = width
+
+    def update(self, values, index=None):
+        """Add one value per slot; returns (middle, upper, lower) at those slots"""
+        middle, variance = self.push(values, index)
+        band = self.width * np.sqrt(variance)
+        return middle, middle + band, middle - band
+
+
+class VectorRSI:
+    __slots__ = ('last_close', 'gain', 'loss')
+
+    def __init__(self, n, period=RSI_PERIOD):
+        """Streaming rsi_array for n slots"""
+        self.last_close = np.full(n, np.nan)
+        self.gain = VectorEMA(n, period, alpha=1 / period)
+        self.loss = VectorEMA(n, period, alpha=1 / period)
+
+    def update(self, close, index=None):
+        """Add one close per slot; returns the RSI at those slots"""
+        idx = np.arange(len(self.last_close)) if index is None else np.asarray(index)
+        close = np.broadcast_to(np.asarray(close, dtype=np.float64), idx.shape)
+        change = close - self.last_close[idx]
+        self.last_close[idx] = close
+
+        out = np.full(idx.shape, np.nan)
+        moved = ~np.isnan(change)
+        if moved.any():
+            slots = idx[moved]
+            gain = self.gain.update(np.maximum(change[moved], 0.0), slots)
+            loss = self.loss.update(np.maximum(-change[moved], 0.0), slots)
+            out[moved] = _rsi(gain, loss)
+        return out
+
+
+class VectorATR:
+    __slots__ = ('last_close', 'average')
+
+    def __init__(self, n, period=ATR_PERIOD):
+        """Streaming atr_array for n slots"""
+        self.last_close = np.full(n, np.nan)
+        self.average = VectorEMA(n, period, alpha=1 / period)
+
+    def update(self, high, low, close, index=None):
+        """Add one bar per slot; returns the ATR at those slots"""
+        idx = slice(None) if index is None else np.asarray(index)
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        previous = self.last_close[idx]
+        tr = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+        self.last_close[idx] = close
+        return self.average.update(tr, index)
+
+
+class VectorVWAP:
+    __slots__ = ('utc_offset', 'session', 'cum_pv', 'cum_volume')
+
+    def __init__(self, n, utc_offset=IST_OFFSET_SECONDS):
+        """Streaming vwap_array for n slots"""
+        self.utc_offset = utc_offset
+        self.session = np.full(n, -1, dtype=np.int64)
+        self.cum_pv = np.zeros(n)
+        self.cum_volume = np.zeros(n)
+
+    def update(self, ts, high, low, close, volume, index=None):
+        """Add one bar per slot (ts = bar start, epoch seconds); returns the VWAP at those slots"""
+        idx = slice(None) if index is None else np.asarray(index)
+        session = (np.asarray(ts).astype(np.int64) + self.utc_offset) // 86400
+        volume = np.asarray(volume, dtype=np.float64)
+        new = session != self.session[idx]
+        cum_pv = np.where(new, 0.0, self.cum_pv[idx]) + (np.asarray(high, dtype=np.float64) + low + close) / 3 * volume
+        cum_volume = np.where(new, 0.0, self.cum_volume[idx]) + volume
+        self.session[idx] = session
+        self.cum_pv[idx] = cum_pv
+        self.cum_volume[idx] = cum_volume
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(cum_volume > 0, cum_pv / cum_volume, np.nan)
+
+
+class VectorSuperTrend:
+    __slots__ = ('multiplier', 'atr', 'upper', 'lower', 'trend', 'last_close')
+
+    def __init__(self, n, period=SUPERTREND_PERIOD, multiplier=SUPERTREND_MULTIPLIER):
+        """Streaming supertrend_array for n slots"""
+        self.multiplier = multiplier
+        self.atr = VectorATR(n, period)
+        self.upper = np.full(n, np.nan)
+        self.lower = np.full(n, np.nan)
+        self.trend = np.zeros(n)
+        self.last_close = np.full(n, np.nan)
+
+    def update(self, high, low, close, index=None):
+        """Add one bar per slot; returns (line, direction) at those slots"""
+        idx = slice(None) if index is None else np.asarray(index)
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        atr = self.atr.update(high, low, close, index)
+        middle = (high + low) / 2
+        basic_upper = middle + self.multiplier * atr
+        basic_lower = middle - self.multiplier * atr
+
+        upper = self.upper[idx]
+        lower = self.lower[idx]
+        trend = self.trend[idx]
+        previous = self.last_close[idx]
+        ready = ~np.isnan(atr)
+        start = ready & (trend == 0)
+        going = ready & (trend != 0)
+
+        upper = np.where(start | (going & ((basic_upper < upper) | (previous > upper))), basic_upper, upper)
+        lower = np.where(start | (going & ((basic_lower > lower) | (previous < lower))), basic_lower, lower)
+        trend = np.where(start, 1.0, trend)
+        trend = np.where(going & (trend == 1) & (close < lower), -1.0,
+                         np.where(going & (trend == -1) & (close > upper), 1.0, trend))
+
+        self.upper[idx] = upper
+        self.lower[idx] = lower
+        self.trend[idx] = trend
+        self.last_close[idx] = close
+        line = np.where(trend == 1, lower, np.where(trend == -1, upper, np.nan))
+        return line, trend
+
+
+# --- INDICATOR SUITE ---
+class IndicatorSuite:
+    def __init__(self, n=1, ema_periods=(5,), sma_period=SMA_PERIOD, rsi_period=RSI_PERIOD,
+                 atr_period=ATR_PERIOD, bollinger_period=BOLLINGER_PERIOD, bollinger_width=BOLLINGER_WIDTH,
+                 supertrend_period=SUPERTREND_PERIOD, supertrend_multiplier=SUPERTREND_MULTIPLIER,
+                 utc_offset=IST_OFFSET_SECONDS):
+        """
+        EMA, SMA, RSI, ATR, VWAP, Bollinger bands and SuperTrend for n instruments
+
+        update() advances every indicator by one completed candle per slot
+        with O(1) work; batch() computes the same values over a whole history
+        with array operations. Both return {name: array} with the names
+        ema_<period>, sma, rsi, atr, vwap, bb_mid, bb_upper, bb_lower,
+        supertrend and supertrend_dir.
+
+        Args:
+            n: Number of instrument slots
+            ema_periods: EMA periods (SMA-seeded, like EMACalculator)
+            utc_offset: Exchange UTC offset in seconds (VWAP restarts every local day)
+        """
+        self.n = n
+        self.ema_periods = tuple(ema_periods)
+        self.sma_period = sma_period
+        self.rsi_period = rsi_period
+        self.atr_period = atr_period
+        self.bollinger_period = bollinger_period
+        self.bollinger_width = bollinger_width
+        self.supertrend_period = supertrend_period
+        self.supertrend_multiplier = supertrend_multiplier
+        self.utc_offset = utc_offset
+
+        self._ema = {period: VectorEMA(n, period) for period in self.ema_periods}
+        self._sma = VectorSMA(n, sma_period)
+        self._rsi = VectorRSI(n, rsi_period)
+        self._atr = VectorATR(n, atr_period)
+        self._vwap = VectorVWAP(n, utc_offset)
+        self._bollinger = VectorBollinger(n, bollinger_period, bollinger_width)
+        self._supertrend = VectorSuperTrend(n, supertrend_period, supertrend_multiplier)
+
+    @staticmethod
+    def _inputs(columns):
+        volume = columns['volume'] if 'volume' in columns else 0.0
+        return columns['ts'], columns['high'], columns['low'], columns['close'], volume
+
+    def update(self, columns, index=None):
+        """
+        Add one completed candle per slot
+
+        Args:
+            columns: 'ts' (bar start, epoch seconds), 'high', 'low', 'close'
+                     and optionally 'volume', aligned with index (or scalars)
+            index: Slots these candles belong to (default: all n)
+
+        Returns:
+            dict: name -> array aligned with index
+        """
+        ts, high, low, close, volume = self._inputs(columns)
+        values = {f'ema_{period}': ema.update(close, index) for period, ema in self._ema.items()}
+        values['sma'] = self._sma.update(close, index)
+        values['rsi'] = self._rsi.update(close, index)
+        values['atr'] = self._atr.update(high, low, close, index)
+        values['vwap'] = self._vwap.update(ts, high, low, close, volume, index)
+        values['bb_mid'], values['bb_upper'], values['bb_lower'] = self._bollinger.update(close, index)
+        values['supertrend'], values['supertrend_dir'] = self._supertrend.update(high, low, close, index)
+        return values
+
+    def update_candle(self, candle, slot=0):
+        """
+        Add a completed candle dict (as from CandleRingBuffer.candle) for one slot
+
+        Returns:
+            dict: name -> float, or None while an indicator is warming up
+        """
+        values = self.update({'ts': candle['start'], 'high': candle['high'], 'low': candle['low'],
+                              'close': candle['close'], 'volume': candle.get('volume', 0.0)}, [slot])
+        return {name: None if math.isnan(value[0]) else float(value[0]) for name, value in values.items()}
+
+    def warm_up(self, columns, slot=0):
+        """Feed a history (1-D columns, oldest first) through update() for one slot"""
+        ts, high, low, close, volume = self._inputs(columns)
+        volume = np.broadcast_to(volume, np.shape(close))
+        index = [slot]
+        for row in zip(np.asarray(ts).tolist(), np.asarray(high).tolist(), np.asarray(low).tolist(),
+                       np.asarray(close).tolist(), volume.tolist()):
+            self.update(dict(zip(('ts', 'high', 'low', 'close', 'volume'), row)), index)
+
+    def batch(self, columns):
+        """Every indicator over a history (1-D columns, oldest first), as update() would produce"""
+        ts, high, low, close, volume = self._inputs(columns)
+        volume = np.broadcast_to(volume, np.shape(close))
+        values = {f'ema_{period}': ema_array(close, period) for period in self.ema_periods}
+        values['sma'] = sma_array(close, self.sma_period)
+        values['rsi'] = rsi_array(close, self.rsi_period)
+        values['atr'] = atr_array(high, low, close, self.atr_period)
+        values['vwap'] = vwap_array(ts, high, low, close, volume, self.utc_offset)
+        values['bb_mid'], values['bb_upper'], values['bb_lower'] = bollinger_array(
+            close, self.bollinger_period, self.bollinger_width)
+        values['supertrend'], values['supertrend_dir'] = supertrend_array(
+            high, low, close, self.supertrend_period, self.supertrend_multiplier)
+        return values
+
+
+# --- SELF-CHECK ---
+def check_streaming(columns, n_slots=3, rtol=1e-9):
+    """
+    Compare IndicatorSuite.update() against batch() on the same history
+
+    The history is fed to n_slots slots interleaved (slot j sees it shifted
+    by j bars) so per-slot state isolation is checked as well.
+
+    Returns:
+        dict: name -> largest relative difference
+    """
+    suite = IndicatorSuite(n_slots, ema_periods=(5, 21))
+    names = ('ts', 'high', 'low', 'close', 'volume')
+    history = {name: np.asarray(columns[name]) for name in names}
+    expected = [suite.batch({name: values[j:] for name, values in history.items()}) for j in range(n_slots)]
+
+    errors = {name: 0.0 for name in expected[0]}
+    for t in range(len(history['ts'])):
+        slots = [j for j in range(n_slots) if t >= j]
+        row = {name: np.array([history[name][t] for _ in slots]) for name in names}
+        values = suite.update(row, slots)
+        for name, got in values.items():
+            for k, j in enumerate(slots):
+                want = expected[j][name][t - j]
+                if np.isnan(want) != np.isnan(got[k]):
+                    errors[name] = math.inf
+                elif not np.isnan(want):
+                    errors[name] = max(errors[name], abs(want - got[k]) / max(abs(want), 1.0))
+    return errors
+
+
+if __name__ == "__main__":
+    import sys
+
+    from backtest import synthetic_candles
+    from resampler import resample_columns
+
+    bars = resample_columns(synthetic_candles(5), 5)
+    errors = check_streaming(bars)
+    for name, error in errors.items():
+        print(f"{'✅' if error <= 1e-9 else '❌'} {name:15s} streaming vs batch: max relative error {error:.1e}")
+    sys.exit(0 if all(error <= 1e-9 for error in errors.values()) else 1)
@@ -0,0 +1,401 @@
+import csv
+import gzip
+import io
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from datetime import date, datetime, timedelta, timezone
+
+from logger import get_logger
+
+log = get_logger("instruments")
+
+IST = timezone(timedelta(hours=5, minutes=30))
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INDEX_DIR = os.path.join(ROOT, ".instrument_cache")
+
+# Broker-published master (all segments); INSTRUMENT_MASTER overrides it with
+# another URL or a local .json/.json.gz/.csv/.csv.gz file
+INSTRUMENT_MASTER_URL = "https://assets.upstox.com/market-quote/instruments/exchange/complete.json.gz"
+# Bundled fixture (indices and a few equities) used when the master cannot be downloaded
+LOCAL_MASTER = os.path.join(ROOT, "instrument_master.json")
+
+FIELDS = ('instrument_key', 'segment', 'instrument_type', 'trading_symbol', 'name', 'isin',
+          'underlying_symbol', 'expiry', 'strike_price', 'lot_size', 'tick_size', 'exchange_token')
+TABLES = ('instrument_key', 'trading_symbol', 'name', 'isin', 'contract')
+
+# File layout (little-endian): header, one (offset, slots) entry per table,
+# row directory (blob offset, length), row blob, then the hash tables.
+# Each hash table slot is (crc32 of the normalized key, row + 1); 0 = empty.
+_MAGIC = b'UPIX'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHI8sQQ')
+_TABLE = struct.Struct('<QI')
+_ROW = struct.Struct('<II')
+_SLOT = struct.Struct('<II')
+_SEPARATOR = '\x1f'
+
+_INTEGER_FIELDS = ('lot_size',)
+_FLOAT_FIELDS = ('strike_price', 'tick_size')
+
+
+# --- KEYS ---
+def _normalize(text):
+    """Case- and whitespace-insensitive lookup form ('Nifty 50' == 'NIFTY50')"""
+    return ''.join(str(text).upper().split())
+
+
+def _expiry(value):
+    """Expiry as YYYY-MM-DD from a date, an ISO string or epoch milliseconds"""
+    if value in (None, '', 0, '0'):
+        return ''
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        return datetime.fromtimestamp(int(value) / 1000, IST).date().isoformat()
+    return str(value)[:10]
+
+
+def _strike(value):
+    return f"{float(value or 0):g}"
+
+
+def _contract_key(underlying, expiry, strike, option_type):
+    return f"{_normalize(underlying)}|{_expiry(expiry)}|{_strike(strike)}|{_normalize(option_type)}"
+
+
+def _table_key(table, row):
+    """Normalized key of row in table, or None if the row is not in that table"""
+    if table == 'contract':
+        if not row['expiry']:
+            return None
+        return _contract_key(row['underlying_symbol'] or row['name'], row['expiry'], row['strike_price'],
+                             row['instrument_type'])
+    if table == 'name' and row['expiry']:
+        # Every contract carries its underlying's name; those are found through 'contract'
+        return None
+    value = row[table]
+    return _normalize(value) if value else None
+
+
+# --- MASTER FILE ---
+def _record(raw):
+    """One master entry (JSON or legacy CSV columns) as strings keyed by FIELDS"""
+    if 'tradingsymbol' in raw:
+        # Legacy CSV: exchange is the segment, option_type says CE/PE
+        option_type = raw.get('option_type') or ''
+        instrument_type = raw.get('instrument_type') or ''
+        if option_type in ('CE', 'PE'):
+            instrument_type = option_type
+        elif instrument_type.startswith('FUT'):
+            instrument_type = 'FUT'
+        raw = dict(raw, segment=raw.get('exchange'), trading_symbol=raw['tradingsymbol'],
+                   instrument_type=instrument_type, strike_price=raw.get('strike'),
+                   underlying_symbol=raw.get('name') if raw.get('expiry') else '')
+    row = {field: '' if raw.get(field) is None else str(raw[field]) for field in FIELDS}
+    row['expiry'] = _expiry(raw.get('expiry'))
+    if row['expiry']:
+        row['strike_price'] = _strike(raw.get('strike_price'))
+    return row
+
+
+def load_instrument_master(source):
+    """
+    Read an instrument master file
+
+    Args:
+        source: URL or path of the broker's master, as JSON (list of
+                instruments) or the legacy CSV, optionally gzipped
+
+    Returns:
+        list: One dict of strings per instrument, keyed by FIELDS
+    """
+    if source.startswith(('http://', 'https://')):
+        from upstox_http import get_shared_session
+
+        response = get_shared_session().get(source, timeout=60)
+        response.raise_for_status()
+        data = response.content
+    else:
+        with open(source, 'rb') as f:
+            data = f.read()
+
+    name = source.split('?', 1)[0]
+    if name.endswith('.gz'):
+        data = gzip.decompress(data)
+        name = name[:-3]
+    if name.endswith('.csv'):
+        raw_rows = csv.DictReader(io.StringIO(data.decode('utf-8')))
+    else:
+        raw_rows = json.loads(data)
+    return [_record(raw) for raw in raw_rows]
+
+
+# --- INDEX ---
+class InstrumentIndex:
+    def __init__(self, path):
+        """
+        Memory-mapped instrument master with O(1) lookups
+
+        Opening maps the file and reads the header only; rows are decoded
+        when a lookup touches them, so a process pays for the instruments it
+        resolves rather than for the whole master. Build files with build().
+
+        Args:
+            path: Index file written by InstrumentIndex.build
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_tables, self.n_rows, built, self._rows_at, self._blob_at = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION or n_tables != len(TABLES):
+            self.close()
+            raise Exception(f"Not an instrument index (or an old format): {path}")
+        self.built = built.decode()
+        self._tables = {
+            table: _TABLE.unpack_from(self._map, _HEADER.size + i * _TABLE.size)
+            for i, table in enumerate(TABLES)
+        }
+
+    @classmethod
+    def build(cls, records, path, built=None):
+        """
+        Write an index file for records (from load_instrument_master) and open it
+
+        The file is written next to path and renamed into place, so readers
+        never see a partial index.
+        """
+        built = (built or datetime.now(IST).date()).strftime('%Y%m%d').encode()
+        rows = [_SEPARATOR.join(record[field] for field in FIELDS).encode('utf-8') for record in records]
+
+        tables = []
+        for table in TABLES:
+            keys = [(zlib.crc32(key.encode('utf-8')), i + 1)
+                    for i, key in enumerate(_table_key(table, record) for record in records) if key]
+            slots = 8
+            while slots < 2 * len(keys):
+                slots *= 2
+            buffer = bytearray(slots * _SLOT.size)
+            mask = slots - 1
+            for key_hash, row in keys:
+                # Linear probing; rows sharing a key (e.g. one symbol on two exchanges) sit in one run
+                slot = key_hash & mask
+                while _SLOT.unpack_from(buffer, slot * _SLOT.size)[1]:
+                    slot = (slot + 1) & mask
+                _SLOT.pack_into(buffer, slot * _SLOT.size, key_hash, row)
+            tables.append((slots, buffer))
+
+        rows_at = _HEADER.size + len(TABLES) * _TABLE.size
+        blob_at = rows_at + len(rows) * _ROW.size
+        directory = bytearray()
+        offset = 0
+        for row in rows:
+            directory += _ROW.pack(offset, len(row))
+            offset += len(row)
+        table_at = blob_at + offset
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, len(TABLES), len(rows), built, rows_at, blob_at))
+            for slots, buffer in tables:
+                f.write(_TABLE.pack(table_at, slots))
+                table_at += len(buffer)
+            f.write(directory)
+            for row in rows:
+                f.write(row)
+            for _, buffer in tables:
+                f.write(buffer)
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.n_rows
+
+    def row(self, i):
+        """Instrument at row i as a dict (strike, lot and tick size converted to numbers)"""
+        offset, length = _ROW.unpack_from(self._map, self._rows_at + i * _ROW.size)
+        start = self._blob_at + offset
+        row = dict(zip(FIELDS, self._map[start:start + length].decode('utf-8').split(_SEPARATOR)))
+        for field in _INTEGER_FIELDS:
+            row[field] = int(float(row[field])) if row[field] else None
+        for field in _FLOAT_FIELDS:
+            row[field] = float(row[field]) if row[field] else None
+        return row
+
+    def _find(self, table, key, segment=None):
+        """All rows whose normalized key in table equals key (optionally in one segment)"""
+        table_at, slots = self._tables[table]
+        key_hash = zlib.crc32(key.encode('utf-8'))
+        mask = slots - 1
+        slot = key_hash & mask
+        matches = []
+        while True:
+            slot_hash, row = _SLOT.unpack_from(self._map, table_at + slot * _SLOT.size)
+            if not row:
+                return matches
+            if slot_hash == key_hash:
+                record = self.row(row - 1)
+                if _table_key(table, record) == key and (segment is None or record['segment'] == segment):
+                    matches.append(record)
+            slot = (slot + 1) & mask
+
+    # --- LOOKUPS ---
+    def get(self, instrument_key):
+        """Instrument for an instrument key ('NSE_INDEX|Nifty 50'), or None"""
+        matches = self._find('instrument_key', _normalize(instrument_key))
+        return matches[0] if matches else None
+
+    def by_symbol(self, trading_symbol, segment=None):
+        """Instruments with this trading symbol (one per exchange/segment)"""
+        return self._find('trading_symbol', _normalize(trading_symbol), segment)
+
+    def by_name(self, name, segment=None):
+        """Instruments with this name ('Nifty 50', 'RELIANCE INDUSTRIES LTD')"""
+        return self._find('name', _normalize(name), segment)
+
+    def by_isin(self, isin, segment=None):
+        """Instruments with this ISIN"""
+        return self._find('isin', _normalize(isin), segment)
+
+    def contract(self, underlying, expiry, strike=None, option_type='FUT', segment=None):
+        """
+        Derivative contract by underlying, expiry and strike
+
+        Args:
+            underlying: Underlying symbol ('NIFTY', 'RELIANCE')
+            expiry: Expiry date (date or 'YYYY-MM-DD')
+            strike: Strike price (None for futures)
+            option_type: 'CE', 'PE' or 'FUT'
+            segment: Restrict to one segment ('NSE_FO')
+
+        Returns:
+            dict or None
+        """
+        matches = self._find('contract', _contract_key(underlying, expiry, strike, option_type), segment)
+        return matches[0] if matches else None
+
+    def resolve(self, query, segment=None):
+        """
+        Instrument key for an instrument key, trading symbol, name or ISIN
+
+        Raises:
+            Exception: If nothing in the index matches
+        """
+        key = _normalize(query)
+        for table in TABLES[:-1]:
+            matches = self._find(table, key, segment)
+            if matches:
+                return matches[0]['instrument_key']
+        where = f" in {segment}" if segment else ""
+        raise Exception(f"Instrument '{query}' not found{where} in the instrument master ({self.path})")
+
+
+# --- DAILY CACHE ---
+_indexes = {}
+_lock = threading.Lock()
+
+
+def _index_path(cache_dir, source, day):
+    tag = f"{zlib.crc32(source.encode('utf-8')):08x}"
+    return os.path.join(cache_dir, f"instruments-{tag}-{day.strftime('%Y%m%d')}.idx")
+
+
+def _cached_paths(cache_dir, source):
+    prefix = os.path.basename(_index_path(cache_dir, source, date.min))[:-len('00010101.idx')]
+    if not os.path.isdir(cache_dir):
+        return []
+    return sorted(os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+                  if name.startswith(prefix) and name.endswith('.idx'))
+
+
+def open_instrument_index(source=None, cache_dir=DEFAULT_INDEX_DIR, today=None):
+    """
+    Today's index for source, building it from the master file if needed
+
+    The index is rebuilt once per (IST) day; older index files for the same
+    source are deleted. If the master cannot be read, the newest older index
+    is used, and failing that the bundled LOCAL_MASTER fixture.
+
+    Args:
+        source: Master URL or path (default: $INSTRUMENT_MASTER or INSTRUMENT_MASTER_URL)
+        cache_dir: Directory for the index files
+        today: IST date (default: today)
+
+    Returns:
+        InstrumentIndex
+    """
+    source = source or os.environ.get('INSTRUMENT_MASTER') or INSTRUMENT_MASTER_URL
+    today = today or datetime.now(IST).date()
+    path = _index_path(cache_dir, source, today)
+    if os.path.exists(path):
+        return InstrumentIndex(path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    older = _cached_paths(cache_dir, source)
+    try:
+        records = load_instrument_master(source)
+    except Exception as e:
+        if older:
+            log.warning("⚠️ Could not refresh instrument master (%s); using %s", e, os.path.basename(older[-1]))
+            return InstrumentIndex(older[-1])
+        if source == LOCAL_MASTER:
+            raise
+        log.warning("⚠️ Could not load instrument master (%s); using the bundled %s", e, os.path.basename(LOCAL_MASTER))
+        return open_instrument_index(LOCAL_MASTER, cache_dir, today)
+
+    index = InstrumentIndex.build(records, path, today)
+    for old_path in older:
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+    log.info("📇 Instrument index built: %d instruments from %s", len(index), source)
+    return index
+
+
+def get_instrument_index(source=None, cache_dir=DEFAULT_INDEX_DIR):
+    """Process-wide index for source, reopened when the (IST) day changes"""
+    today = datetime.now(IST).date()
+    key = (source, cache_dir)
+    with _lock:
+        index, day = _indexes.get(key, (None, None))
+        if index is None or day != today:
+            previous = index
+            index = open_instrument_index(source, cache_dir, today)
+            _indexes[key] = (index, today)
+            # Yesterday's file is deleted by now; release its descriptor and mapping
+            if previous is not None:
+                previous.close()
+        return index
+
+
+def resolve_instrument(query, segment=None, source=None, cache_dir=DEFAULT_INDEX_DIR):
+    """Instrument key for a symbol, name, ISIN or key, from the local index (no API call)"""
+    return get_instrument_index(source, cache_dir).resolve(query, segment)
+
+
+if __name__ == "__main__":
+    import sys
+
+    index = get_instrument_index()
+    print(f"📇 {len(index)} instruments ({index.path})")
+    for query in sys.argv[1:] or ["Nifty 50"]:
+        try:
+            print(f"✅ {query} -> {index.resolve(query)}")
+        except Exception as e:
+            print(f"❌ {e}")
@@ -0,0 +1,181 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+ROOT_LOGGER = "alert"
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')  # DEBUG shows request URLs and payload dumps
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')  # "text" or "json" (one object per line)
+QUEUE_SIZE = 10000  # records waiting for the writer thread; more are dropped, never waited for
+
+
+# --- FORMATTING ---
+class StructuredFormatter(logging.Formatter):
+    def __init__(self, fmt='text'):
+        """
+        Render records as "HH:MM:SS.mmm LEVEL logger message key=value ..." or as JSON lines
+
+        Fields passed to the logger calls (log.info("...", price=1.5)) are
+        appended as key=value pairs, or become keys of the JSON object.
+        """
+        super().__init__()
+        self.json = fmt == 'json'
+
+    def format(self, record):
+        message = record.getMessage()
+        fields = getattr(record, 'fields', None) or {}
+        if self.json:
+            entry = {'ts': round(record.created, 3), 'level': record.levelname, 'logger': record.name, 'msg': message}
+            entry.update(fields)
+            if record.exc_info:
+                entry['exc'] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str, ensure_ascii=False)
+
+        clock = time.strftime('%H:%M:%S', time.localtime(record.created))
+        line = f"{clock}.{int(record.msecs):03d} {record.levelname:<5} {record.name[len(ROOT_LOGGER) + 1:]} {message}"
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+# --- QUEUED OUTPUT ---
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hand records to the writer thread without formatting them
+
+    Unlike QueueHandler, the message is not rendered on the caller's thread:
+    %-args are formatted by the writer, so a record that is filtered or
+    dropped never costs the string formatting. When max_pending records are
+    waiting the record is dropped (counted in .dropped) instead of blocking
+    the caller.
+    """
+
+    def __init__(self, log_queue, max_pending=QUEUE_SIZE):
+        super().__init__(log_queue)
+        self.max_pending = max_pending
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if self.queue.qsize() >= self.max_pending:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+class StructuredLogger:
+    __slots__ = ('logger', '_sampled')
+
+    def __init__(self, logger):
+        """
+        Leveled logger with structured fields and sampling
+
+        Messages use %-style arguments, formatted only if the record is
+        written. Keyword arguments become structured fields. sample=seconds
+        writes a message at most once per window (per message template); the
+        next record written carries suppressed=<count skipped>.
+        """
+        self.logger = logger
+        self._sampled = {}  # message template -> [window start, suppressed count]
+
+    def _log(self, level, msg, args, sample, exc_info, fields):
+        if _handler is None:
+            setup_logging()
+        if not self.logger.isEnabledFor(level):
+            return
+        if sample:
+            now = time.monotonic()
+            window = self._sampled.get(msg)
+            if window is not None and now - window[0] < sample:
+                window[1] += 1
+                return
+            if window is not None and window[1]:
+                fields['suppressed'] = window[1]
+            self._sampled[msg] = [now, 0]
+        if exc_info is True:
+            exc_info = sys.exc_info()
+        # Straight onto the writer's queue: no caller lookup, no handler lock
+        _handler.enqueue(self.logger.makeRecord(self.logger.name, level, '', 0, msg, args, exc_info,
+                                                extra={'fields': fields}))
+
+    def debug(self, msg, *args, sample=None, **fields):
+        self._log(logging.DEBUG, msg, args, sample, None, fields)
+
+    def info(self, msg, *args, sample=None, **fields):
+        self._log(logging.INFO, msg, args, sample, None, fields)
+
+    def warning(self, msg, *args, sample=None, **fields):
+        self._log(logging.WARNING, msg, args, sample, None, fields)
+
+    def error(self, msg, *args, sample=None, exc_info=None, **fields):
+        self._log(logging.ERROR, msg, args, sample, exc_info, fields)
+
+    def exception(self, msg, *args, **fields):
+        self._log(logging.ERROR, msg, args, None, True, fields)
+
+    def is_debug(self):
+        if _handler is None:
+            setup_logging()
+        return self.logger.isEnabledFor(logging.DEBUG)
+
+
+# --- SETUP ---
+_handler = None
+_listener = None
+
+
+def setup_logging(level=None, fmt=None, stream=None):
+    """
+    Send the "alert.*" loggers through a bounded queue to a writer thread
+
+    Calling it again replaces the level, format and stream.
+
+    Args:
+        level: Level name or number (default: $LOG_LEVEL or INFO)
+        fmt: "text" or "json" (default: $LOG_FORMAT or text)
+        stream: Where the writer thread writes (default: sys.stdout)
+    """
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(StructuredFormatter(fmt or LOG_FORMAT))
+    log_queue = queue.SimpleQueue()
+    _handler = NonBlockingQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers[:] = [_handler]
+    root.setLevel(level or LOG_LEVEL.upper())
+    root.propagate = False
+
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def get_logger(name):
+    """StructuredLogger for a module; logging is set up by the first record (see setup_logging)"""
+    return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"))
+
+
+def dropped_records():
+    """Records dropped because the writer thread fell behind"""
+    return _handler.dropped if _handler is not None else 0
@@ -0,0 +1,479 @@
+import asyncio
+import json
+import struct
+import time
+import uuid
+
+import websockets
+
+from logger import get_logger
+from upstox_http import UpstoxHTTPClient, get_shared_executor
+
+log = get_logger("market_feed")
+
+FEED_AUTHORIZE_URL = "https://api.upstox.com/v2/feed/market-data-feed/authorize"
+
+# FeedResponse.type values from Upstox MarketDataFeed.proto
+FEED_TYPE_INITIAL = 0
+FEED_TYPE_LIVE = 1
+FEED_TYPE_MARKET_INFO = 2
+
+_unpack_double = struct.Struct('<d').unpack_from
+_pack_double = struct.Struct('<d').pack
+
+
+# --- PROTOBUF WIRE DECODING ---
+# The market data feed sends protobuf encoded FeedResponse frames. Only the
+# last traded price fields are needed for candles, so the frames are walked
+# directly at the wire level instead of pulling in generated protobuf classes:
+#
+#   FeedResponse { Type type = 1; map<string, Feed> feeds = 2; int64 currentTs = 3; }
+#   Feed         { LTPC ltpc = 1; FullFeed ff = 2; ... }
+#   FullFeed     { MarketFullFeed marketFF = 1; IndexFullFeed indexFF = 2; }
+#   *FullFeed    { LTPC ltpc = 1; ... }
+#   LTPC         { double ltp = 1; int64 ltt = 2; int64 ltq = 3; double cp = 4; }
+
+def _read_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _skip_field(buf, pos, wire_type):
+    if wire_type == 0:
+        while buf[pos] >= 0x80:
+            pos += 1
+        return pos + 1
+    if wire_type == 1:
+        return pos + 8
+    if wire_type == 2:
+        length, pos = _read_varint(buf, pos)
+        return pos + length
+    if wire_type == 5:
+        return pos + 4
+    raise ValueError(f"Unsupported protobuf wire type: {wire_type}")
+
+
+def _decode_ltpc(buf, pos, end):
+    """Decode an LTPC message into (ltp, ltt, ltq)"""
+    ltp = 0.0
+    ltt = 0
+    ltq = 0
+    while pos < end:
+        key = buf[pos]
+        pos += 1
+        if key == 0x09:  # field 1, fixed64 double
+            ltp = _unpack_double(buf, pos)[0]
+            pos += 8
+        elif key == 0x10:  # field 2, varint
+            ltt, pos = _read_varint(buf, pos)
+        elif key == 0x18:  # field 3, varint
+            ltq, pos = _read_varint(buf, pos)
+        else:
+            if key >= 0x80:
+                key, pos = _read_varint(buf, pos - 1)
+            pos = _skip_field(buf, pos, key & 0x07)
+    return ltp, ltt, ltq
+
+
+def _find_ltpc(buf, pos, end, depth):
+    """Locate the LTPC message inside a Feed / FullFeed / *FullFeed message"""
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        field = key >> 3
+        wire_type = key & 0x07
+        if wire_type != 2:
+            pos = _skip_field(buf, pos, wire_type)
+            continue
+        length, pos = _read_varint(buf, pos)
+        sub_end = pos + length
+        if depth == 0:
+            # Feed: ltpc = 1, ff = 2
+            if field == 1:
+                return _decode_ltpc(buf, pos, sub_end)
+            if field == 2:
+                return _find_ltpc(buf, pos, sub_end, 1)
+        elif depth == 1:
+            # FullFeed: marketFF = 1, indexFF = 2
+            if field in (1, 2):
+                return _find_ltpc(buf, pos, sub_end, 2)
+        elif field == 1:
+            # MarketFullFeed / IndexFullFeed: ltpc = 1
+            return _decode_ltpc(buf, pos, sub_end)
+        pos = sub_end
+    return None
+
+
+def decode_feed_response(frame):
+    """
+    Decode a binary market data feed frame
+
+    Args:
+        frame: Raw bytes of a protobuf FeedResponse message
+
+    Returns:
+        tuple: (feed_type, current_ts, ticks) where ticks is a list of
+               (instrument_key, ltp, ltt, ltq) tuples. Ticks without a last
+               traded time use the frame's current_ts instead.
+    """
+    buf = memoryview(frame)
+    end = len(buf)
+    pos = 0
+    feed_type = FEED_TYPE_INITIAL
+    current_ts = 0
+    entries = []
+
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        field = key >> 3
+        wire_type = key & 0x07
+        if field == 1 and wire_type == 0:
+            feed_type, pos = _read_varint(buf, pos)
+        elif field == 2 and wire_type == 2:
+            length, pos = _read_varint(buf, pos)
+            entry_end = pos + length
+            instrument_key = None
+            ltpc = None
+            # map entry: string key = 1, Feed value = 2
+            while pos < entry_end:
+                entry_key, pos = _read_varint(buf, pos)
+                entry_length, pos = _read_varint(buf, pos)
+                if entry_key == 0x0A:
+                    instrument_key = bytes(buf[pos:pos + entry_length]).decode('utf-8')
+                elif entry_key == 0x12:
+                    ltpc = _find_ltpc(buf, pos, pos + entry_length, 0)
+                pos += entry_length
+            if instrument_key is not None and ltpc is not None:
+                entries.append((instrument_key, ltpc))
+        elif field == 3 and wire_type == 0:
+            current_ts, pos = _read_varint(buf, pos)
+        else:
+            pos = _skip_field(buf, pos, wire_type)
+
+    ticks = [
+        (instrument_key, ltp, ltt or current_ts, ltq)
+        for instrument_key, (ltp, ltt, ltq) in entries
+    ]
+    return feed_type, current_ts, ticks
+
+
+# --- PROTOBUF WIRE ENCODING (for recorded frames and the replay server) ---
+def _encode_varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _encode_len_field(field, payload):
+    return _encode_varint((field << 3) | 2) + _encode_varint(len(payload)) + payload
+
+
+def encode_feed_response(ticks, current_ts=None, feed_type=FEED_TYPE_LIVE):
+    """
+    Encode ticks as a binary FeedResponse frame in ltpc mode
+
+    Args:
+        ticks: Iterable of (instrument_key, ltp, ltt, ltq) tuples
+        current_ts: Frame timestamp in epoch milliseconds (default: now)
+        feed_type: FeedResponse type value
+
+    Returns:
+        bytes: Encoded frame, decodable with decode_feed_response
+    """
+    if current_ts is None:
+        current_ts = int(time.time() * 1000)
+
+    out = bytearray(_encode_varint(0x08) + _encode_varint(feed_type))
+    for instrument_key, ltp, ltt, ltq in ticks:
+        ltpc = b'\x09' + _pack_double(ltp) + b'\x10' + _encode_varint(int(ltt)) + b'\x18' + _encode_varint(int(ltq))
+        feed = _encode_len_field(1, ltpc)
+        entry = _encode_len_field(1, instrument_key.encode('utf-8')) + _encode_len_field(2, feed)
+        out += _encode_len_field(2, entry)
+    out += b'\x18' + _encode_varint(int(current_ts))
+    return bytes(out)
+
+
+def save_frames(path, frames):
+    """Save recorded feed frames to a length-prefixed binary file"""
+    with open(path, 'wb') as f:
+        for frame in frames:
+            f.write(struct.pack('<I', len(frame)))
+            f.write(frame)
+
+
+def load_frames(path):
+    """Load feed frames written by save_frames"""
+    frames = []
+    with open(path, 'rb') as f:
+        data = f.read()
+    pos = 0
+    while pos < len(data):
+        (length,) = struct.unpack_from('<I', data, pos)
+        pos += 4
+        frames.append(data[pos:pos + length])
+        pos += length
+    return frames
+
+
+def build_subscription(instrument_keys, mode="ltpc", method="sub"):
+    """
+    Build a subscription request for the market data feed
+
+    The feed expects the JSON request to be sent as a binary message.
+    """
+    request = {
+        "guid": uuid.uuid4().hex,
+        "method": method,
+        "data": {
+            "mode": mode,
+            "instrumentKeys": list(instrument_keys)
+        }
+    }
+    return json.dumps(request).encode('utf-8')
+
+
+def authorize_feed_url(access_token):
+    """
+    Get an authorized WebSocket URL for the market data feed
+
+    The authorized URL carries its own credentials, so the WebSocket
+    handshake does not need an Authorization header.
+    """
+    data = UpstoxHTTPClient(access_token).get_json(FEED_AUTHORIZE_URL)
+    return data['data']['authorizedRedirectUri']
+
+
+# --- MARKET DATA FEED CLIENT ---
+class UpstoxMarketFeed:
+    def __init__(self, instrument_keys, access_token=None, url=None, mode="ltpc",
+                 reconnect_delay=1.0, max_reconnect_delay=30.0):
+        """
+        Streaming market data feed with automatic reconnect and resubscription
+
+        Args:
+            instrument_keys: Instrument keys to subscribe to
+            access_token: Upstox access token, used to authorize the feed URL
+            url: Fixed WebSocket URL (e.g. a local replay server); when set,
+                 no authorization request is made
+            mode: Feed mode ('ltpc' or 'full')
+            reconnect_delay: Initial delay before reconnecting, in seconds
+            max_reconnect_delay: Upper bound for the reconnect backoff
+        """
+        if access_token is None and url is None:
+            raise ValueError("Either access_token or url is required")
+
+        self.instrument_keys = set(instrument_keys)
+        self.access_token = access_token
+        self.url = url
+        self.mode = mode
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.websocket = None
+        self.running = False
+        self.frames_received = 0
+        self.ticks_received = 0
+        self.reconnects = 0
+
+    async def _resolve_url(self):
+        if self.url is not None:
+            return self.url
+        return await asyncio.get_running_loop().run_in_executor(
+            get_shared_executor(), authorize_feed_url, self.access_token
+        )
+
+    async def subscribe(self, instrument_keys):
+        """Add instruments to the subscription (kept across reconnects)"""
+        instrument_keys = [key for key in instrument_keys if key not in self.instrument_keys]
+        self.instrument_keys.update(instrument_keys)
+        if self.websocket is not None and instrument_keys:
+            await self.websocket.send(build_subscription(instrument_keys, self.mode))
+
+    async def unsubscribe(self, instrument_keys):
+        """Remove instruments from the subscription"""
+        instrument_keys = [key for key in instrument_keys if key in self.instrument_keys]
+        self.instrument_keys.difference_update(instrument_keys)
+        if self.websocket is not None and instrument_keys:
+            await self.websocket.send(build_subscription(instrument_keys, self.mode, method="unsub"))
+
+    def stop(self):
+        """Stop the feed after the current frame"""
+        self.running = False
+        if self.websocket is not None:
+            asyncio.ensure_future(self.websocket.close())
+
+    async def run(self, on_ticks):
+        """
+        Receive frames until stopped, reconnecting on errors
+
+        Args:
+            on_ticks: Callable receiving a list of (instrument_key, ltp, ltt, ltq)
+                      tuples per frame. May be a coroutine function.
+        """
+        is_coroutine = asyncio.iscoroutinefunction(on_ticks)
+        delay = self.reconnect_delay
+        self.running = True
+
+        while self.running:
+            try:
+                url = await self._resolve_url()
+                async with websockets.connect(url, max_size=None) as websocket:
+                    self.websocket = websocket
+                    if self.instrument_keys:
+                        await websocket.send(build_subscription(sorted(self.instrument_keys), self.mode))
+                    log.info("✅ Market feed connected", instruments=len(self.instrument_keys))
+                    delay = self.reconnect_delay
+
+                    async for frame in websocket:
+                        if isinstance(frame, str):
+                            continue
+                        _, _, ticks = decode_feed_response(frame)
+                        self.frames_received += 1
+                        if not ticks:
+                            continue
+                        self.ticks_received += len(ticks)
+                        if is_coroutine:
+                            await on_ticks(ticks)
+                        else:
+                            on_ticks(ticks)
+                        if not self.running:
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not self.running:
+                    break
+                log.error("❌ Market feed error: %s", e)
+            finally:
+                self.websocket = None
+
+            if self.running:
+                self.reconnects += 1
+                log.info("🔄 Reconnecting market feed in %.1fs...", delay, reconnects=self.reconnects)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+
+# --- LOCAL REPLAY SERVER ---
+class ReplayFeedServer:
+    def __init__(self, frames, rate=1000.0, host="127.0.0.1", port=0, loop_frames=False):
+        """
+        Local stand-in for the market data feed that replays recorded frames
+
+        Args:
+            frames: List of binary FeedResponse frames
+            rate: Frames per second to send (None or 0 for as fast as possible)
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            loop_frames: Restart from the first frame when the end is reached
+        """
+        self.frames = frames
+        self.rate = rate
+        self.host = host
+        self.port = port
+        self.loop_frames = loop_frames
+        self.server = None
+        self.subscriptions = []
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, websocket, *args):
+        # Wait for the client's subscription before streaming
+        request = await websocket.recv()
+        self.subscriptions.append(json.loads(request))
+
+        interval = 1.0 / self.rate if self.rate else 0.0
+        started = time.perf_counter()
+        sent = 0
+        while True:
+            for frame in self.frames:
+                await websocket.send(frame)
+                sent += 1
+                if interval:
+                    delay = started + sent * interval - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif sent % 100 == 0:
+                    await asyncio.sleep(0)
+            if not self.loop_frames:
+                break
+        await websocket.close()
+
+    async def start(self):
+        self.server = await websockets.serve(self._handler, self.host, self.port, max_size=None)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+
+def generate_frames(instrument_keys, n_frames, start_price=24500.0, start_ts=None,
+                    step_ms=100, seed=42):
+    """Generate synthetic ltpc frames (one tick per instrument per frame)"""
+    import random
+
+    rng = random.Random(seed)
+    if start_ts is None:
+        start_ts = int(time.time() * 1000)
+    prices = {key: start_price for key in instrument_keys}
+    frames = []
+    for i in range(n_frames):
+        ts = start_ts + i * step_ms
+        ticks = []
+        for key in instrument_keys:
+            prices[key] = round(prices[key] + rng.gauss(0, 2), 2)
+            ticks.append((key, prices[key], ts, rng.randint(1, 100)))
+        frames.append(encode_feed_response(ticks, ts))
+    return frames
+
+
+async def benchmark_replay(n_frames=20000, rate=None, instrument_keys=("NSE_INDEX|Nifty 50",)):
+    """Replay synthetic frames through the feed client into a candle generator"""
+    from main import RealTimeCandleGenerator
+
+    frames = generate_frames(list(instrument_keys), n_frames)
+    generators = {key: RealTimeCandleGenerator(5) for key in instrument_keys}
+    completed = 0
+
+    async with ReplayFeedServer(frames, rate=rate) as server:
+        feed = UpstoxMarketFeed(instrument_keys, url=server.url)
+        expected = n_frames * len(instrument_keys)
+
+        def on_ticks(ticks):
+            nonlocal completed
+            for instrument_key, ltp, ltt, _ in ticks:
+                completed += len(generators[instrument_key].add_tick(ltp, ltt))
+            if feed.ticks_received >= expected:
+                feed.stop()
+
+        started = time.perf_counter()
+        await feed.run(on_ticks)
+        elapsed = time.perf_counter() - started
+
+    print(f"📡 Replayed {feed.ticks_received} ticks in {elapsed:.2f}s "
+          f"({feed.ticks_received / elapsed:,.0f} ticks/s, {completed} candles completed)")
+    return feed.ticks_received / elapsed
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark_replay())
@@ -0,0 +1,321 @@
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9108'))  # 0 disables the exporter
+# Seconds; covers sub-millisecond pipeline steps up to slow API calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.99)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+# --- METRIC TYPES ---
+class _Value:
+    __slots__ = ('value', 'function', 'lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """Read the value from function() at export time (e.g. a queue length)"""
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class _Histogram:
+    __slots__ = ('bounds', 'counts', 'sum', 'count', 'lock')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket (like histogram_quantile)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if i == len(self.bounds):
+                    return self.bounds[-1]  # beyond the last bound; report the bound
+                upper = self.bounds[i]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            lower = self.bounds[i] if i < len(self.bounds) else lower
+        return self.bounds[-1]
+
+
+class Metric:
+    def __init__(self, name, help_text, kind, label_names=(), buckets=LATENCY_BUCKETS):
+        """
+        One metric family (counter, gauge or histogram), optionally labelled
+
+        Use the family directly when it has no labels (REQUESTS.inc()), or
+        pick a child with labels(): REQUESTS.labels('quotes', 200).inc().
+        """
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.label_names:
+            self._default = self.labels()
+
+    def labels(self, *values, **named):
+        """Child for the given label values (positional, or by name)"""
+        if named:
+            values = tuple(named[name] for name in self.label_names)
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = _Histogram(self.buckets) if self.kind == 'histogram' else _Value()
+                    self._children[values] = child
+        return child
+
+    # Unlabelled shortcuts
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def get(self):
+        return self._default.get()
+
+    def children(self):
+        return list(self._children.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self.children():
+            if self.kind != 'histogram':
+                lines.append(f"{self.name}{_labels_text(self.label_names, values)} {_number(child.get())}")
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += bucket_count
+                le = _labels_text(self.label_names, values, (('le', _number(bound)),))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _labels_text(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_number(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        """Named metric families, exported together in Prometheus text format"""
+        self.metrics = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def _get(self, name, help_text, kind, label_names, buckets=LATENCY_BUCKETS):
+        metric = self.metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.get(name)
+                if metric is None:
+                    metric = Metric(name, help_text, kind, label_names, buckets)
+                    self.metrics[name] = metric
+        if metric.kind != kind or metric.label_names != tuple(label_names):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind} {metric.label_names}")
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._get(name, help_text, 'counter', labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._get(name, help_text, 'gauge', labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get(name, help_text, 'histogram', labels, buckets)
+
+    # --- EXPORT ---
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP process_start_time_seconds Start time of the process since the Unix epoch",
+            "# TYPE process_start_time_seconds gauge",
+            f"process_start_time_seconds {self.started:.3f}"
+        ]
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self, now=None):
+        """
+        Compact JSON-friendly view: counter/gauge values, and count, rate and p50/p99 (ms) per histogram
+
+        Returns:
+            dict: {'uptime_seconds': ..., 'metrics': {name: {labels: values}}}
+        """
+        now = time.time() if now is None else now
+        uptime = max(now - self.started, 1e-9)
+        metrics = {}
+        for name, metric in list(self.metrics.items()):
+            series = {}
+            for values, child in metric.children():
+                key = ",".join(f"{label}={value}" for label, value in zip(metric.label_names, values)) or "_"
+                if metric.kind == 'histogram':
+                    entry = {'count': child.count, 'per_minute': round(child.count / uptime * 60, 3)}
+                    if child.count:
+                        entry['mean_ms'] = round(child.sum / child.count * 1000, 3)
+                        for q in QUANTILES:
+                            entry[f"p{int(q * 100)}_ms"] = round(child.quantile(q) * 1000, 3)
+                    series[key] = entry
+                else:
+                    series[key] = child.get()
+            metrics[name] = series
+        return {'uptime_seconds': round(uptime, 1), 'metrics': metrics}
+
+
+REGISTRY = Registry()
+
+
+# --- EXPORTER ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/metrics':
+            body, content_type = self.registry.render(), 'text/plain; version=0.0.4; charset=utf-8'
+        elif path == '/status':
+            body, content_type = json.dumps(self.registry.summary()), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port=None, host="0.0.0.0", registry=None):
+    """
+    Serve /metrics (Prometheus text) and /status (JSON summary) from a daemon thread
+
+    Args:
+        port: TCP port (default: $METRICS_PORT or 9108; 0 disables the server)
+        host: Interface to bind
+        registry: Registry to export (default: REGISTRY)
+
+    Returns:
+        ThreadingHTTPServer, or None when disabled
+    """
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return None
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry or REGISTRY})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+# --- PROJECT METRICS ---
+# Shared by the modules that record them; defined here so /metrics lists them all from the start
+UPSTOX_REQUEST_SECONDS = REGISTRY.histogram(
+    'upstox_request_seconds', 'Upstox API request time', ('endpoint',))
+UPSTOX_REQUESTS = REGISTRY.counter(
+    'upstox_requests_total', 'Upstox API responses by status code', ('endpoint', 'status'))
+UPSTOX_ERRORS = REGISTRY.counter(
+    'upstox_request_errors_total', 'Upstox API requests that failed without a response', ('endpoint',))
+QUOTE_TO_CANDLE_SECONDS = REGISTRY.histogram(
+    'quote_to_candle_seconds', 'Time from a quote/tick timestamp to the candle builder applying it')
+CANDLE_CLOSE_TO_ALERT_SECONDS = REGISTRY.histogram(
+    'candle_close_to_alert_seconds', 'Time from a candle boundary to its alert being queued')
+CANDLES = REGISTRY.counter('candles_total', 'Completed candles')
+TICKS = REGISTRY.counter('ticks_total', 'Quotes/ticks ingested')
+LAST_TICK = REGISTRY.gauge('last_tick_timestamp_seconds', 'Unix time the last quote/tick was ingested')
+ALERTS = REGISTRY.counter('alerts_total', 'Alerts queued for delivery', ('rule',))
+TELEGRAM_SEND_SECONDS = REGISTRY.histogram('telegram_send_seconds', 'Telegram sendMessage request time')
+TELEGRAM_DELIVERY_SECONDS = REGISTRY.histogram(
+    'telegram_delivery_seconds', 'Time from queuing a Telegram message to its delivery')
+TELEGRAM_MESSAGES = REGISTRY.counter('telegram_messages_total', 'Telegram deliveries by outcome', ('result',))
+TELEGRAM_RETRIES = REGISTRY.counter('telegram_retries_total', 'Telegram sends retried after an error')
+TELEGRAM_RATE_LIMITED = REGISTRY.counter('telegram_rate_limited_total', 'Telegram 429 responses')
+TOKEN_REFRESHES = REGISTRY.counter('token_refresh_total', 'Access token refresh attempts by outcome', ('result',))
+TOKEN_INVALIDATIONS = REGISTRY.counter('token_invalidations_total', 'Access tokens rejected by the API (401)')
+MONITOR_ERRORS = REGISTRY.counter('monitor_errors_total', 'Failed monitor poll iterations', ('monitor',))
+PIPELINE_STAGE_SECONDS = REGISTRY.histogram(
+    'pipeline_stage_seconds', 'Pipeline stage handler time per item', ('stage',))
+PIPELINE_STAGE_ERRORS = REGISTRY.counter('pipeline_stage_errors_total', 'Items a pipeline stage failed on', ('stage',))
+PIPELINE_QUEUE_DEPTH = REGISTRY.gauge('pipeline_queue_depth', 'Items waiting in front of a pipeline stage', ('stage',))
+PIPELINE_DROPPED = REGISTRY.gauge('pipeline_dropped_items', 'Items a pipeline queue dropped', ('stage',))
+PIPELINE_COALESCED = REGISTRY.gauge('pipeline_coalesced_items', 'Items a pipeline queue merged into another', ('stage',))
+
+
+def upstox_endpoint(url):
+    """Low-cardinality endpoint label for an Upstox URL or path (instrument keys and dates removed)"""
+    path = url.split('://', 1)[-1]
+    path = path[path.find('/'):] if '://' in url else path
+    parts = [part for part in path.split('?')[0].split('/') if part][1:3]  # drop the version
+    if parts and parts[0] == 'historical-candle':
+        return 'historical-candle/intraday' if len(parts) > 1 and parts[1] == 'intraday' else 'historical-candle'
+    return '/'.join(parts) or 'unknown'
+
+
+if __name__ == "__main__":
+    print(REGISTRY.render(), end='')
@@ -0,0 +1,294 @@
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from logger import get_logger
+from metrics import (ALERTS, CANDLE_CLOSE_TO_ALERT_SECONDS, CANDLES, LAST_TICK, MONITOR_ERRORS,
+                     QUOTE_TO_CANDLE_SECONDS, TICKS, start_metrics_server)
+from resampler import IST_OFFSET_SECONDS, bucket_minutes
+from trading_calendar import IST
+from upstox_http import UpstoxHTTPClient
+
+log = get_logger("multi_monitor")
+
+LTP_PATH = "/v2/market-quote/ltp"
+MAX_KEYS_PER_REQUEST = 500  # Upstox limit for market quote requests
+
+
+# --- BATCHED QUOTES ---
+async def fetch_ltp_batch(instrument_keys, http):
+    """
+    Fetch last traded prices for many instruments in as few requests as possible
+
+    Requests for more than MAX_KEYS_PER_REQUEST keys are split into chunks
+    that are fetched concurrently.
+
+    Args:
+        instrument_keys: List of instrument keys (e.g. "NSE_INDEX|Nifty 50")
+        http: UpstoxHTTPClient
+
+    Returns:
+        dict: instrument_key -> last traded price
+    """
+    batches = [
+        (LTP_PATH, {"instrument_key": ",".join(instrument_keys[start:start + MAX_KEYS_PER_REQUEST])})
+        for start in range(0, len(instrument_keys), MAX_KEYS_PER_REQUEST)
+    ]
+    results = await http.gather_json(batches, return_exceptions=False)
+
+    prices = {}
+    for data in results:
+        # Response keys use "EXCHANGE:SYMBOL"; instrument_token holds the requested key
+        for quote in data.get('data', {}).values():
+            instrument_key = quote.get('instrument_token')
+            price = quote.get('last_price', quote.get('ltp'))
+            if instrument_key and price:
+                prices[instrument_key] = float(price)
+    return prices
+
+
+# --- VECTORIZED CANDLE / EMA STATE ---
+class InstrumentStateTable:
+    def __init__(self, instrument_keys, interval_minutes=5, ema_period=5):
+        """
+        Candle and EMA state for many instruments, one array slot per instrument
+
+        Every update advances all instruments at once, so the per-cycle cost
+        is a handful of NumPy operations regardless of the number of symbols.
+
+        Args:
+            instrument_keys: Instrument keys, in slot order
+            interval_minutes: Candle interval in minutes
+            ema_period: EMA period applied to completed candle closes
+        """
+        self.instrument_keys = list(instrument_keys)
+        self.index = {key: i for i, key in enumerate(self.instrument_keys)}
+        self.interval_minutes = interval_minutes
+        self.interval_ms = interval_minutes * 60 * 1000
+        self.ema_period = ema_period
+        self.multiplier = 2 / (ema_period + 1)
+
+        n = len(self.instrument_keys)
+        self.bucket = np.full(n, -1, dtype=np.int64)
+        self.open = np.full(n, np.nan)
+        self.high = np.full(n, np.nan)
+        self.low = np.full(n, np.nan)
+        self.close = np.full(n, np.nan)
+        self.tick_count = np.zeros(n, dtype=np.int64)
+
+        self.ema = np.full(n, np.nan)
+        self.ema_count = np.zeros(n, dtype=np.int64)
+        self.ema_sum = np.zeros(n)
+
+    def __len__(self):
+        return len(self.instrument_keys)
+
+    def prices_from_quotes(self, quotes):
+        """Convert a {instrument_key: price} dict to a slot-aligned array (NaN = no quote)"""
+        prices = np.full(len(self.instrument_keys), np.nan)
+        index = self.index
+        for key, price in quotes.items():
+            i = index.get(key)
+            if i is not None:
+                prices[i] = price
+        return prices
+
+    def update(self, prices, timestamps):
+        """
+        Apply one tick per instrument
+
+        Args:
+            prices: Array of prices, one per slot (NaN for instruments without a tick)
+            timestamps: Tick time in epoch milliseconds, scalar or one per slot
+
+        Returns:
+            dict or None: Completed candles as arrays (see _complete), or None
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        # Candle start in IST minutes since the epoch, aligned to the 09:15 session open
+        bucket = np.broadcast_to(bucket_minutes(np.asarray(timestamps, dtype=np.int64) // 1000,
+                                                self.interval_minutes), prices.shape)
+
+        valid = ~np.isnan(prices)
+        rolled = valid & (bucket > self.bucket)
+        completed_idx = np.flatnonzero(rolled & (self.bucket >= 0))
+        completed = self._complete(completed_idx) if completed_idx.size else None
+
+        # Start new candles where the interval rolled over
+        if rolled.any():
+            self.bucket[rolled] = bucket[rolled]
+            self.open[rolled] = prices[rolled]
+            self.high[rolled] = prices[rolled]
+            self.low[rolled] = prices[rolled]
+            self.close[rolled] = prices[rolled]
+            self.tick_count[rolled] = 1
+
+        # Update running candles (late ticks for an already-closed interval are ignored)
+        same = valid & ~rolled & (bucket == self.bucket)
+        np.maximum(self.high, prices, out=self.high, where=same)
+        np.minimum(self.low, prices, out=self.low, where=same)
+        np.copyto(self.close, prices, where=same)
+        self.tick_count += same
+
+        return completed
+
+    def _complete(self, idx):
+        """Close the candles at slots idx and advance their EMA"""
+        close = self.close[idx]
+        seeding = self.ema_count[idx] < self.ema_period
+
+        # Seed with the SMA of the first ema_period closes, like EMACalculator
+        if seeding.any():
+            seed_idx = idx[seeding]
+            self.ema_sum[seed_idx] += close[seeding]
+            self.ema_count[seed_idx] += 1
+            ready = seed_idx[self.ema_count[seed_idx] == self.ema_period]
+            self.ema[ready] = self.ema_sum[ready] / self.ema_period
+
+        live = ~seeding
+        if live.any():
+            live_idx = idx[live]
+            self.ema[live_idx] = close[live] * self.multiplier + self.ema[live_idx] * (1 - self.multiplier)
+
+        start_ms = (self.bucket[idx] * 60 - IST_OFFSET_SECONDS) * 1000
+        return {
+            'index': idx,
+            'start_ms': start_ms,
+            'ts': start_ms // 1000,
+            'open': self.open[idx],
+            'high': self.high[idx],
+            'low': self.low[idx],
+            'close': close,
+            'tick_count': self.tick_count[idx],
+            'ema': self.ema[idx]
+        }
+
+    def candle(self, i):
+        """Current (in-progress) candle for slot i as a dict"""
+        if self.bucket[i] < 0:
+            return None
+        start_time = datetime.fromtimestamp(int(self.bucket[i]) * 60 - IST_OFFSET_SECONDS, IST)
+        return {
+            'instrument': self.instrument_keys[i],
+            'start_time': start_time,
+            'open': float(self.open[i]),
+            'high': float(self.high[i]),
+            'low': float(self.low[i]),
+            'close': float(self.close[i]),
+            'tick_count': int(self.tick_count[i]),
+            'ema': float(self.ema[i]) if self.ema_count[i] >= self.ema_period else None
+        }
+
+
+def evaluate_rules(rule_stream, completed, ema_period):
+    """
+    Evaluate the alert rules on a completed candle batch
+
+    The table's EMA is passed in as ema(ema_period), so only indicators the
+    table does not already track are computed by the rule stream.
+
+    Returns:
+        dict: rule name -> boolean mask over the batch rows
+    """
+    return rule_stream.update(completed, index=completed['index'],
+                              indicators={rule_stream.ruleset.key(f'ema({ema_period})'): completed['ema']})
+
+
+def format_rule_alert(instrument_key, rule, expression, completed, j, interval_minutes, ema_period):
+    """Format the alert for rule firing on row j of a completed candle batch"""
+    end_time = datetime.fromtimestamp(completed['start_ms'][j] / 1000 + interval_minutes * 60, IST)
+    return (
+        f"🚀 {instrument_key} {rule.upper()} ALERT!\n\n"
+        f"🕐 Time: {end_time.strftime('%d-%m-%Y %H:%M:%S')}\n"
+        f"💰 OHLC: {completed['open'][j]:.2f} | {completed['high'][j]:.2f} | {completed['low'][j]:.2f} | {completed['close'][j]:.2f}\n"
+        f"📈 {ema_period}-EMA: ₹{completed['ema'][j]:.2f}\n\n"
+        f"✅ {expression}"
+    )
+
+
+# --- MULTI-INSTRUMENT MONITOR ---
+async def multi_instrument_monitor(instrument_keys, interval_minutes=5, ema_period=5, scheduler=None):
+    """Poll batched quotes for many instruments and alert when a configured rule fires"""
+    from auth import get_access_token
+    from rules import RuleSet, load_rules
+    from scheduler import PollScheduler
+    from telegram_bot import TelegramBot
+    from telegram_queue import TelegramDeliveryQueue
+    from token_manager import get_token_manager
+
+    access_token = get_access_token()
+    if not access_token:
+        log.error("❌ No access token available. Please run auth.py first.")
+        return
+
+    alerts = TelegramDeliveryQueue(TelegramBot(), parse_mode=None)
+    alerts.start()
+    table = InstrumentStateTable(instrument_keys, interval_minutes, ema_period)
+    rules = RuleSet(load_rules())
+    rule_stream = rules.stream(len(table))
+    http = UpstoxHTTPClient(access_token)
+    # Tokens are refreshed ahead of expiry off the polling loop and swapped in here
+    manager = get_token_manager()
+    manager.add_listener(http.set_access_token)
+    manager.start()
+    scheduler = scheduler or PollScheduler(interval_minutes)
+    log.info("📡 Monitoring %d instruments (%d-min candles, %d-EMA)", len(table), interval_minutes, ema_period)
+
+    while True:
+        try:
+            quotes = await fetch_ltp_batch(table.instrument_keys, http)
+            quoted_at = time.time()
+            TICKS.inc(len(quotes))
+            LAST_TICK.set(quoted_at)
+            completed = table.update(table.prices_from_quotes(quotes), int(quoted_at * 1000))
+            QUOTE_TO_CANDLE_SECONDS.observe(time.time() - quoted_at)
+
+            if completed is not None:
+                CANDLES.inc(len(completed['index']))
+                fired = evaluate_rules(rule_stream, completed, ema_period)
+                log.info("🎯 %d candles completed", len(completed['index']),
+                         **{rule: int(mask.sum()) for rule, mask in fired.items()})
+                for rule, mask in fired.items():
+                    for j in np.flatnonzero(mask):
+                        instrument_key = table.instrument_keys[completed['index'][j]]
+                        message = format_rule_alert(instrument_key, rule, rules.rules[rule], completed, j,
+                                                    interval_minutes, ema_period)
+                        alerts.enqueue(message)
+                        ALERTS.labels(rule).inc()
+                        close = completed['start_ms'][j] / 1000 + interval_minutes * 60
+                        CANDLE_CLOSE_TO_ALERT_SECONDS.observe(max(time.time() - close, 0.0))
+
+            scheduler.succeeded()
+            await scheduler.wait()
+
+        except Exception as e:
+            MONITOR_ERRORS.labels('multi').inc()
+            log.error("❌ Error: %s", e, sample=60)
+            await scheduler.wait_after_error()
+
+
+def benchmark_update(n_instruments=500, n_cycles=2000):
+    """Time one update step across n_instruments"""
+    rng = np.random.default_rng(42)
+    table = InstrumentStateTable([f"NSE_EQ|SYM{i}" for i in range(n_instruments)])
+    prices = 1000 + rng.standard_normal(n_instruments).cumsum()
+    start_ms = int(time.time() * 1000)
+
+    started = time.perf_counter()
+    for cycle in range(n_cycles):
+        prices = prices + rng.standard_normal(n_instruments)
+        table.update(prices, start_ms + cycle * 5000)
+    elapsed = time.perf_counter() - started
+
+    print(f"⏱️  {n_instruments} instruments: {elapsed / n_cycles * 1e6:.1f} µs per update cycle")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        start_metrics_server()
+        asyncio.run(multi_instrument_monitor(sys.argv[1:]))
+    else:
+        benchmark_update()
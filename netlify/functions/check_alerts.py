@@ -1,18 +1,55 @@
+import time
+
+_MODULE_STARTED = time.perf_counter()
+
 import json
 import os
 import sys
-import urllib.parse
-from datetime import datetime, timedelta
+import tempfile
+from datetime import datetime, timedelta, timezone
 
 # Add the parent directory to the path to import our modules
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT)
+
+# Heavy modules (requests, the shared HTTP client) are imported on first use.
+# pandas/numpy are not used here at all: one session of 1-minute candles is a
+# few hundred rows, which plain lists handle faster than a DataFrame can be built.
+
+IST = timezone(timedelta(hours=5, minutes=30))
+IST_OFFSET_SECONDS = 19800
+SESSION_START_SECONDS = (9 * 60 + 15) * 60  # 09:15 IST
+
+CANDLE_MINUTES = 5
+HISTORY_DAYS = 3  # closed sessions of history (weekends and holidays skipped)
+EMA_PERIOD = 5
+
+# Only /tmp is writable; the state survives for as long as the container does
+STATE_PATH = os.environ.get('ALERT_STATE_PATH', os.path.join(tempfile.gettempdir(), 'alert_state.sqlite3'))
+
+# Rules from rules.py / config.json "rules" (or the ALERT_RULES env var);
+# the alert message here is the bullish one, so only that rule is checked
+RULE_NAMES = ('bullish',)
+
+# Resolved to an instrument key through the local instrument master index
+# (instruments.py), so no API call is spent finding it. The bundled master
+# is used unless INSTRUMENT_MASTER points at another file or URL.
+INSTRUMENT_NAME = "Nifty 50"
+INSTRUMENT_SEGMENT = "NSE_INDEX"
+INSTRUMENT_MASTER = os.environ.get('INSTRUMENT_MASTER', os.path.join(ROOT, 'instrument_master.json'))
+INDEX_DIR = os.path.join(tempfile.gettempdir(), 'instrument_index')
+
+# --- WARM STATE ---
+# Module globals survive between invocations while the container stays warm
+_WARM = {'invocations': 0, 'client': None, 'store': None, 'rules': None, 'instrument': None,
+         'loaded_at': time.time()}
+_MODULE_IMPORT_MS = (time.perf_counter() - _MODULE_STARTED) * 1000
+
+
+def _shared_session():
+    from upstox_http import get_shared_session
+    return get_shared_session()
 
-try:
-    import requests
-    import pandas as pd
-    import numpy as np
-except ImportError as e:
-    print(f"Import error: {e}")
 
 def send_telegram_message(message, bot_token, chat_id):
     """Send message to Telegram"""
@@ -22,9 +59,9 @@ def send_telegram_message(message, bot_token, chat_id):
         'text': message,
         'parse_mode': 'HTML'
     }
-    
+
     try:
-        response = requests.post(url, json=payload)
+        response = _shared_session().post(url, json=payload, timeout=10)
         return response.status_code == 200
     except Exception as e:
         print(f"Error sending telegram message: {e}")
@@ -33,7 +70,7 @@ def send_telegram_message(message, bot_token, chat_id):
 def format_bullish_alert(candle_data):
     """Format bullish signal alert message"""
     time_str = candle_data['datetime'].strftime('%Y-%m-%d %H:%M:%S') if isinstance(candle_data['datetime'], datetime) else str(candle_data['datetime'])
-    
+
     message = f"""
 🟢 <b>BULLISH ALERT - Nifty 50</b>
 
@@ -46,151 +83,309 @@ def format_bullish_alert(candle_data):
 
 <i>Automated alert from Netlify deployment</i>
     """.strip()
-    
+
     return message
 
+# --- PLAIN-LIST CANDLE MATH ---
+def parse_candles(candles):
+    """
+    Convert API candle rows to sorted [ts, open, high, low, close, volume] lists
+
+    Args:
+        candles: Rows of [ISO timestamp, open, high, low, close, volume, (oi)]
+
+    Returns:
+        list: Rows with 'ts' in epoch seconds, oldest first
+    """
+    rows = [
+        [int(datetime.fromisoformat(c[0]).timestamp()), float(c[1]), float(c[2]),
+         float(c[3]), float(c[4]), int(c[5] or 0)]
+        for c in candles
+    ]
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+def resample(rows, minutes=CANDLE_MINUTES):
+    """
+    Aggregate sorted 1-minute rows into bars aligned to the 09:15 IST session open
+
+    Same bars as resampler.resample_columns, without NumPy.
+    """
+    size = minutes * 60
+    bars = []
+    last_start = None
+    for ts, open_, high, low, close, volume in rows:
+        local = ts + IST_OFFSET_SECONDS
+        second_of_day = local % 86400
+        start = local - second_of_day + SESSION_START_SECONDS + ((second_of_day - SESSION_START_SECONDS) // size) * size
+        if start != last_start:
+            bars.append([start - IST_OFFSET_SECONDS, open_, high, low, close, volume])
+            last_start = start
+            continue
+        bar = bars[-1]
+        if high > bar[2]:
+            bar[2] = high
+        if low < bar[3]:
+            bar[3] = low
+        bar[4] = close
+        bar[5] += volume
+    return bars
+
+def ema_fold(closes, period, ema=None):
+    """
+    EMA over closes, seeded with the first close (pandas ewm(adjust=False))
+
+    Args:
+        closes: Prices, oldest first
+        period: EMA period
+        ema: EMA carried from earlier closes, if any
+
+    Returns:
+        float: EMA after the last close (None if there were no prices)
+    """
+    alpha = 2 / (period + 1)
+    for close in closes:
+        ema = close if ema is None else ema + alpha * (close - ema)
+    return ema
+
 class UpstoxNetlifyClient:
-    def __init__(self):
-        self.base_url = "https://api.upstox.com/v2"
-        self.access_token = os.environ.get('UPSTOX_ACCESS_TOKEN')
-        
-        if not self.access_token:
-            raise Exception("UPSTOX_ACCESS_TOKEN environment variable not set")
-        
-        self.headers = {
-            'accept': 'application/json',
-            'Authorization': f'Bearer {self.access_token}'
-        }
-    
-    def get_historical_data(self, instrument_key, interval="1minute", days_back=3):
-        """Get historical candle data"""
-        to_date = datetime.now()
-        from_date = to_date - timedelta(days=days_back)
-        
-        encoded_instrument = urllib.parse.quote(instrument_key, safe='')
-        url = f"{self.base_url}/historical-candle/{encoded_instrument}/{interval}/{to_date.strftime('%Y-%m-%d')}/{from_date.strftime('%Y-%m-%d')}"
-        
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
-        
-        data = response.json()
-        if data['status'] != 'success':
-            raise Exception(f"API Error: {data.get('message', 'Unknown error')}")
-        
-        candles = data['data']['candles']
-        if not candles:
-            raise Exception("No candle data received")
-            
-        df = pd.DataFrame(candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'oi'])
-        df['datetime'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('datetime').reset_index(drop=True)
-        
-        return df
-    
-    def resample_to_5min(self, df):
-        """Convert 1-minute data to 5-minute candles"""
-        df_copy = df.copy()
-        df_copy.set_index('datetime', inplace=True)
-        
-        resampled = df_copy.resample('5T').agg({
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum'
-        }).dropna()
-        
-        resampled.reset_index(inplace=True)
-        resampled['timestamp'] = resampled['datetime']
-        
-        return resampled
-    
-    def calculate_ema(self, prices, period=5):
-        """Calculate EMA"""
-        prices = pd.Series(prices)
-        return prices.ewm(span=period, adjust=False).mean()
-    
-    def get_nifty50_with_ema(self, ema_period=5):
+    def __init__(self, access_token):
+        """
+        Upstox client kept alive across warm invocations
+
+        Closed-day history is fetched once per container per day; warm
+        invocations only refresh today's intraday candles, and skip even that
+        until a new 1-minute candle can have closed.
+
+        Args:
+            access_token: Upstox access token
+        """
+        from upstox_http import UpstoxHTTPClient
+
+        self.http = UpstoxHTTPClient(access_token)
+        self.instrument = None
+        self.history_day = None
+        self.history_bars = []
+        self.today_rows = []
+        self.requests_made = 0
+
+    def set_access_token(self, access_token):
+        if access_token != self.http.access_token:
+            self.http.set_access_token(access_token)
+
+    def _fetch(self, paths):
+        self.requests_made += len(paths)
+        results = self.http.get_json_many(paths)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return [parse_candles(result['data']['candles']) for result in results]
+
+    def _load(self, instrument, now):
+        """Fetch history (if stale) and today's candles for one instrument key"""
+        today = now.date()
+        calendar = _get_calendar()
+        sessions = calendar.sessions(today)
+        # Intraday candles exist only once today's session has opened
+        intraday = bool(sessions) and now >= sessions[0][0]
+        need_history = self.history_day != today or instrument != self.instrument
+
+        paths = [self.http.intraday_candles_path(instrument, "1minute")] if intraday else []
+        if need_history:
+            # The last HISTORY_DAYS sessions before today, in one request
+            days = [calendar.previous_trading_day(today)]
+            while len(days) < HISTORY_DAYS:
+                days.append(calendar.previous_trading_day(days[-1]))
+            paths.append(self.http.historical_candles_path(
+                instrument, "1minute", days[0].isoformat(), days[-1].isoformat()
+            ))
+
+        fetched = self._fetch(paths) if paths else []
+        today_rows = [row for row in fetched[0] if datetime.fromtimestamp(row[0], IST).date() == today] if intraday else []
+        if need_history:
+            history_bars = resample(fetched[-1])
+            if not history_bars and not today_rows:
+                raise Exception(f"No candle data received for {instrument}")
+            self.history_bars = history_bars
+            self.history_day = today
+        self.today_rows = today_rows
+        self.instrument = instrument
+
+    def refresh(self, now):
+        """Bring candles up to date, resolving the instrument key on first use"""
+        today = now.date()
+        if self.instrument is not None and self.history_day == today:
+            # Nothing new until the candle after the last one we have has closed,
+            # and nothing at all once the candles reach the session close
+            if self.today_rows:
+                last = self.today_rows[-1][0]
+                sessions = _get_calendar().sessions(today)
+                if now.timestamp() < last + 120 or (sessions and last + 60 >= sessions[-1][1].timestamp()):
+                    return
+        self._load(self.instrument or _get_instrument(), now)
+
+    def get_bars(self, now=None):
+        """All 5-minute bars (history + today, the forming bar last) as [ts, o, h, l, c, v] lists"""
+        self.refresh(now or datetime.now(IST))
+        return self.history_bars + resample(self.today_rows)
+
+    def data_until(self):
+        """End (epoch seconds) of the newest 1-minute candle received; bars ending later are incomplete"""
+        if self.today_rows:
+            return self.today_rows[-1][0] + 60
+        if self.history_bars:
+            return self.history_bars[-1][0] + CANDLE_MINUTES * 60
+        return 0
+
+    def get_nifty50_with_ema(self, ema_period=5, now=None):
         """Get Nifty 50 data with EMA"""
-        possible_instruments = [
-            "NSE_INDEX|Nifty 50",
-            "NSE_INDEX|NIFTY 50",
-            "NSE_INDEX|Nifty50",
-            "NSE_INDEX|NIFTY50"
-        ]
-        
-        for instrument in possible_instruments:
-            try:
-                df_1min = self.get_historical_data(instrument, interval="1minute", days_back=3)
-                df = self.resample_to_5min(df_1min)
-                
-                df['ema'] = self.calculate_ema(df['close'], ema_period)
-                latest = df.iloc[-1]
-                
-                return {
-                    'timestamp': latest['timestamp'],
-                    'datetime': latest['datetime'],
-                    'open': float(latest['open']),
-                    'high': float(latest['high']),
-                    'low': float(latest['low']),
-                    'close': float(latest['close']),
-                    'volume': int(latest['volume']) if pd.notna(latest['volume']) else 0,
-                    'ema': float(latest['ema']),
-                    'ema_period': ema_period,
-                    'instrument': instrument
-                }
-            except Exception:
-                continue
-        
-        raise Exception("Failed to get data from any Nifty 50 instrument")
-    
+        bars = self.get_bars(now)
+        if not bars:
+            raise Exception("No candle data received")
+        latest = bars[-1]
+
+        return {
+            'timestamp': latest[0],
+            'datetime': datetime.fromtimestamp(latest[0], IST),
+            'open': latest[1],
+            'high': latest[2],
+            'low': latest[3],
+            'close': latest[4],
+            'volume': latest[5],
+            'ema': ema_fold([bar[4] for bar in bars], ema_period),
+            'ema_period': ema_period,
+            'instrument': self.instrument
+        }
+
     def is_bullish_signal(self, candle_data):
-        """Check if bullish signal"""
-        return candle_data['low'] > candle_data['ema']
+        """Check if bullish signal (the configured 'bullish' rule)"""
+        return _get_rules()['bullish'](candle_data, candle_data['ema'])
+
+def _get_client():
+    """The container's client, created on the first (cold) invocation"""
+    access_token = os.environ.get('UPSTOX_ACCESS_TOKEN')
+    if not access_token:
+        raise Exception("UPSTOX_ACCESS_TOKEN environment variable not set")
+
+    client = _WARM['client']
+    if client is None:
+        client = _WARM['client'] = UpstoxNetlifyClient(access_token)
+    else:
+        client.set_access_token(access_token)
+    return client
+
+def _get_store():
+    """The container's alert state store (last candle, carried EMA, alerts sent)"""
+    if _WARM['store'] is None:
+        from alert_state import AlertStateStore
+        _WARM['store'] = AlertStateStore(STATE_PATH)
+    return _WARM['store']
+
+def _get_instrument():
+    """The monitored instrument key, resolved once per container from the instrument master"""
+    if _WARM['instrument'] is None:
+        from instruments import resolve_instrument
+        _WARM['instrument'] = resolve_instrument(INSTRUMENT_NAME, INSTRUMENT_SEGMENT,
+                                                 source=INSTRUMENT_MASTER, cache_dir=INDEX_DIR)
+    return _WARM['instrument']
+
+def _get_calendar():
+    """NSE trading calendar (trading_calendar.py), loaded once per container"""
+    from trading_calendar import get_calendar
+    return get_calendar()
+
+def _get_rules():
+    """The alert rules as predicate(candle, ema), compiled once per container"""
+    if _WARM['rules'] is None:
+        from rules import RuleSet, load_rules
+        rules = RuleSet(load_rules(os.path.join(ROOT, 'config.json')))
+        _WARM['rules'] = rules.predicates(EMA_PERIOD, names=RULE_NAMES)
+    return _WARM['rules']
 
 def handler(event, context):
     """Netlify function handler"""
+    started = time.perf_counter()
+    cold_start = _WARM['invocations'] == 0
+    _WARM['invocations'] += 1
+    timings = {
+        'cold_start': cold_start,
+        'invocation': _WARM['invocations'],
+        'container_age_s': round(time.time() - _WARM['loaded_at'], 1),
+        'module_import_ms': round(_MODULE_IMPORT_MS, 1) if cold_start else 0.0
+    }
+
     try:
         # Get environment variables
         bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
         chat_id = os.environ.get('TELEGRAM_CHAT_ID')
-        
+
         if not bot_token or not chat_id:
             return {
                 'statusCode': 400,
                 'body': json.dumps({'error': 'Missing Telegram credentials'})
             }
-        
-        # Initialize client
-        upstox_client = UpstoxNetlifyClient()
-        
+
+        # Reuse the warm client (pooled session, cached history)
+        upstox_client = _get_client()
+        requests_before = upstox_client.requests_made
+        timings['init_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
         # Get current market data
-        candle_data = upstox_client.get_nifty50_with_ema(ema_period=5)
-        
-        # Check for bullish signal
-        is_bullish = upstox_client.is_bullish_signal(candle_data)
-        
+        fetch_started = time.perf_counter()
+        now = datetime.now(IST)
+        bars = upstox_client.get_bars(now)
+        timings['data_ms'] = round((time.perf_counter() - fetch_started) * 1000, 1)
+        timings['api_requests'] = upstox_client.requests_made - requests_before
+
+        # Only candles completed since the last run are evaluated; each signal is sent once
+        evaluate_started = time.perf_counter()
+        store = _get_store()
+        rules = _get_rules()
+        result = store.evaluate(upstox_client.instrument, bars, rules, ema_period=EMA_PERIOD,
+                                interval_minutes=CANDLE_MINUTES,
+                                now=min(now.timestamp(), upstox_client.data_until()))
+        timings['evaluate_ms'] = round((time.perf_counter() - evaluate_started) * 1000, 1)
+
+        latest = result['latest']
+        is_bullish = latest is not None and latest['ema'] is not None and rules['bullish'](latest, latest['ema'])
+
         response_data = {
             'timestamp': datetime.now().isoformat(),
-            'price': candle_data['close'],
-            'ema': candle_data['ema'],
+            'price': latest['close'] if latest else None,
+            'ema': latest['ema'] if latest else None,
             'signal': 'BULLISH' if is_bullish else 'NEUTRAL',
-            'alert_sent': False
+            'new_candles': result['new_bars'],
+            'alert_sent': False,
+            'alerts_sent': 0
         }
-        
-        # Send alert if bullish signal detected
-        if is_bullish:
-            message = format_bullish_alert(candle_data)
-            alert_sent = send_telegram_message(message, bot_token, chat_id)
-            
-            if alert_sent:
-                response_data['alert_sent'] = True
-                response_data['message'] = 'Bullish alert sent successfully'
-            else:
-                response_data['message'] = 'Failed to send alert'
+
+        # Send alerts for new signals (and retry any whose delivery failed last run)
+        for signal in result['signals']:
+            candle_data = dict(signal, datetime=datetime.fromtimestamp(signal['ts'], IST), ema_period=EMA_PERIOD)
+            if send_telegram_message(format_bullish_alert(candle_data), bot_token, chat_id):
+                store.mark_delivered(signal)
+                response_data['alerts_sent'] += 1
+
+        response_data['alert_sent'] = response_data['alerts_sent'] > 0
+        if response_data['alert_sent']:
+            response_data['message'] = 'Bullish alert sent successfully'
+        elif result['signals']:
+            response_data['message'] = 'Failed to send alert'
+        elif is_bullish:
+            # With edge-only alerts a condition that already held when the
+            # state was first built is never sent; only claim an alert went
+            # out if one was delivered this session
+            last_alert = store.last_delivered(upstox_client.instrument, CANDLE_MINUTES, 'bullish')
+            alerted = last_alert is not None and datetime.fromtimestamp(last_alert, IST).date() == now.date()
+            response_data['last_alert'] = last_alert
+            response_data['message'] = ('Bullish signal already alerted' if alerted
+                                        else 'Bullish condition holding, no new edge')
         else:
             response_data['message'] = 'No alert conditions met'
-        
+
+        timings['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        response_data['timings'] = timings
+
         return {
             'statusCode': 200,
             'headers': {
@@ -199,10 +394,10 @@ def handler(event, context):
             },
             'body': json.dumps(response_data)
         }
-        
+
     except Exception as e:
         error_message = f"Error in alert check: {str(e)}"
-        
+
         # Send error notification
         try:
             bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
@@ -212,11 +407,12 @@ def handler(event, context):
                 send_telegram_message(error_alert, bot_token, chat_id)
         except:
             pass
-        
+
+        timings['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
         return {
             'statusCode': 500,
             'headers': {
                 'Content-Type': 'application/json'
             },
-            'body': json.dumps({'error': error_message})
+            'body': json.dumps({'error': error_message, 'timings': timings})
         }
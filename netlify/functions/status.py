@@ -1,14 +1,103 @@
 import json
+import os
+import sys
+import time
+import urllib.request
 from datetime import datetime
 
+# Add the parent directory to the path to import our modules
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT)
+
+# /status of the long-running monitor's metrics exporter (metrics.py), e.g. http://host:9108/status
+MONITOR_STATUS_URL = os.environ.get('MONITOR_STATUS_URL')
+FETCH_TIMEOUT = 3  # seconds
+STALE_SECONDS = 120  # no quote for this long while the market is open means the monitor is stuck
+
+LATENCIES = {
+    'upstox_request': 'upstox_request_seconds',
+    'quote_to_candle': 'quote_to_candle_seconds',
+    'candle_close_to_alert': 'candle_close_to_alert_seconds',
+    'telegram_send': 'telegram_send_seconds',
+    'telegram_delivery': 'telegram_delivery_seconds'
+}
+COUNTS = {
+    'ticks': 'ticks_total',
+    'candles': 'candles_total',
+    'alerts': 'alerts_total',
+    'upstox_responses': 'upstox_requests_total',
+    'upstox_errors': 'upstox_request_errors_total',
+    'monitor_errors': 'monitor_errors_total',
+    'telegram_messages': 'telegram_messages_total',
+    'telegram_retries': 'telegram_retries_total',
+    'telegram_rate_limited': 'telegram_rate_limited_total',
+    'token_refreshes': 'token_refresh_total',
+    'token_invalidations': 'token_invalidations_total'
+}
+
+
+def fetch_monitor_status(url, timeout=FETCH_TIMEOUT):
+    """The monitor's metrics summary (Registry.summary()), raising if it is unreachable"""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def summarize(summary, now=None, market_open=None):
+    """
+    Condense a Registry.summary() into the status response
+
+    Args:
+        summary: {'uptime_seconds': ..., 'metrics': {...}} from the monitor
+        now: Current Unix time (default: now)
+        market_open: Whether a session is in progress (decides 'stale')
+
+    Returns:
+        dict: status ('running' or 'stale'), latency p50/p99 and rates, counters
+    """
+    now = time.time() if now is None else now
+    metrics = summary.get('metrics', {})
+    uptime = summary.get('uptime_seconds') or 0
+
+    last_tick = metrics.get('last_tick_timestamp_seconds', {}).get('_') or 0
+    tick_age = round(now - last_tick, 1) if last_tick else None
+    stale = bool(market_open) and (tick_age is None or tick_age > STALE_SECONDS)
+
+    latency = {}
+    for name, metric in LATENCIES.items():
+        series = metrics.get(metric, {})
+        if series:
+            latency[name] = series['_'] if list(series) == ['_'] else series
+    counts = {}
+    for name, metric in COUNTS.items():
+        series = metrics.get(metric, {})
+        if series:
+            counts[name] = series['_'] if list(series) == ['_'] else series
+
+    ticks = counts.get('ticks', 0)
+    return {
+        'status': 'stale' if stale else 'running',
+        'uptime_seconds': uptime,
+        'last_tick_age_seconds': tick_age,
+        'ticks_per_minute': round(ticks / uptime * 60, 2) if uptime else 0.0,
+        'latency_ms': latency,
+        'counts': counts
+    }
+
+
+def _market_open():
+    try:
+        from trading_calendar import get_calendar
+        return get_calendar().is_open()
+    except Exception:
+        return None
+
+
 def handler(event, context):
-    """Status endpoint to check if the system is running"""
-    
+    """Status endpoint: is the monitor running, and how fast (p50/p99 latency, throughput)"""
+
     try:
         status_data = {
-            'status': 'running',
             'timestamp': datetime.now().isoformat(),
-            'message': 'Nifty 50 EMA Alert System is active on Netlify',
             'version': '1.0.0',
             'platform': 'Netlify Functions',
             'endpoints': {
@@ -17,16 +106,35 @@ def handler(event, context):
                 'status': '/.netlify/functions/status'
             }
         }
-        
+        status_code = 200
+
+        market_open = _market_open()
+        status_data['market_open'] = market_open
+        if not MONITOR_STATUS_URL:
+            status_data['status'] = 'unknown'
+            status_data['message'] = 'MONITOR_STATUS_URL is not set; the monitor cannot be checked'
+        else:
+            try:
+                monitor = summarize(fetch_monitor_status(MONITOR_STATUS_URL), market_open=market_open)
+                status_data.update(monitor)
+                status_data['message'] = ('Monitor is receiving quotes' if monitor['status'] == 'running'
+                                          else 'Monitor has not received a quote recently')
+                if monitor['status'] != 'running':
+                    status_code = 503
+            except Exception as e:
+                status_data['status'] = 'down'
+                status_data['message'] = f'Monitor metrics unreachable: {e}'
+                status_code = 503
+
         return {
-            'statusCode': 200,
+            'statusCode': status_code,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
             'body': json.dumps(status_data)
         }
-        
+
     except Exception as e:
         return {
             'statusCode': 500,
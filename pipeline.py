@@ -0,0 +1,277 @@
+import asyncio
+import time
+from collections import deque
+
+from logger import get_logger
+from metrics import (PIPELINE_COALESCED, PIPELINE_DROPPED, PIPELINE_QUEUE_DEPTH, PIPELINE_STAGE_ERRORS,
+                     PIPELINE_STAGE_SECONDS)
+
+log = get_logger("pipeline")
+
+POLICIES = ('block', 'drop_oldest', 'drop_newest', 'coalesce')
+LATENCY_SAMPLES = 1000
+
+
+def latency_stats(samples):
+    """p50/p95/max in milliseconds of a collection of durations in seconds"""
+    if not samples:
+        return {'count': 0}
+    samples = sorted(samples)
+    pick = lambda q: samples[min(int(q * len(samples)), len(samples) - 1)] * 1000
+    return {
+        'count': len(samples),
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'max_ms': samples[-1] * 1000
+    }
+
+
+# --- QUEUES ---
+class StageQueue:
+    def __init__(self, maxsize=256, policy='block', merge=None):
+        """
+        Bounded FIFO between two pipeline stages
+
+        policy decides what happens when the consumer lags:
+          'block'        put() waits for room (backpressure on the producer)
+          'drop_oldest'  a full queue discards its oldest item
+          'drop_newest'  a full queue discards the new item
+          'coalesce'     merge(newest_queued, item) folds the item into the
+                         newest item still waiting; when merge returns None
+                         the item is queued normally and a full queue blocks
+
+        Args:
+            maxsize: Items the queue holds
+            policy: One of POLICIES
+            merge: Function (queued, item) -> merged item or None ('coalesce')
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy '{policy}'; expected one of {POLICIES}")
+        if policy == 'coalesce' and merge is None:
+            raise ValueError("The 'coalesce' policy needs a merge function")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.merge = merge
+
+        self._items = deque()  # [item, monotonic enqueue time]
+        self._not_empty = None  # asyncio.Events, created on the running loop
+        self._not_full = None
+
+        self.put_count = 0
+        self.taken = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.blocked = 0  # puts that had to wait for room
+        self.max_depth = 0
+        self.waits = deque(maxlen=LATENCY_SAMPLES)  # enqueue -> dequeue, seconds
+
+    def _events(self):
+        if self._not_empty is None:
+            self._not_empty = asyncio.Event()
+            self._not_full = asyncio.Event()
+        return self._not_empty, self._not_full
+
+    def __len__(self):
+        return len(self._items)
+
+    async def put(self, item):
+        """
+        Queue an item according to the policy
+
+        Returns:
+            bool: False if the item was dropped
+        """
+        not_empty, not_full = self._events()
+        if self.policy == 'coalesce' and self._items:
+            merged = self.merge(self._items[-1][0], item)
+            if merged is not None:
+                self._items[-1][0] = merged
+                self.coalesced += 1
+                return True
+
+        if len(self._items) >= self.maxsize:
+            if self.policy == 'drop_oldest':
+                self._items.popleft()
+                self.dropped += 1
+            elif self.policy == 'drop_newest':
+                self.dropped += 1
+                return False
+            else:
+                self.blocked += 1
+                while len(self._items) >= self.maxsize:
+                    not_full.clear()
+                    await not_full.wait()
+
+        self._items.append([item, time.monotonic()])
+        self.put_count += 1
+        if len(self._items) > self.max_depth:
+            self.max_depth = len(self._items)
+        not_empty.set()
+        return True
+
+    async def get(self):
+        """Wait for and remove the oldest item"""
+        not_empty, not_full = self._events()
+        while not self._items:
+            not_empty.clear()
+            await not_empty.wait()
+        item, queued_at = self._items.popleft()
+        self.taken += 1
+        self.waits.append(time.monotonic() - queued_at)
+        not_full.set()
+        return item
+
+    def stats(self):
+        return {
+            'depth': len(self._items),
+            'max_depth': self.max_depth,
+            'put': self.put_count,
+            'taken': self.taken,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'blocked': self.blocked,
+            'wait': latency_stats(self.waits)
+        }
+
+
+# --- STAGES ---
+class Stage:
+    def __init__(self, name, handler, inbox, outbox=None):
+        """
+        One pipeline step: takes items from inbox, passes results to outbox
+
+        Args:
+            name: Stage name used in stats and error messages
+            handler: Function (item) -> iterable of results or None; may be a
+                     coroutine function. An exception skips the item.
+            inbox: StageQueue the stage consumes
+            outbox: StageQueue the results go to (None for the last stage)
+        """
+        self.name = name
+        self.handler = handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.processed = 0
+        self.errors = 0
+        self.busy = False
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # handler time per item, seconds
+
+        # Exported metrics; queue counters are read when /metrics is scraped
+        self._seconds = PIPELINE_STAGE_SECONDS.labels(name)
+        self._errors = PIPELINE_STAGE_ERRORS.labels(name)
+        PIPELINE_QUEUE_DEPTH.labels(name).set_function(inbox.__len__)
+        PIPELINE_DROPPED.labels(name).set_function(lambda: inbox.dropped)
+        PIPELINE_COALESCED.labels(name).set_function(lambda: inbox.coalesced)
+
+    async def run(self):
+        while True:
+            item = await self.inbox.get()
+            self.busy = True
+            started = time.perf_counter()
+            try:
+                results = self.handler(item)
+                if asyncio.iscoroutine(results):
+                    results = await results
+            except Exception as e:
+                self.errors += 1
+                self._errors.inc()
+                log.exception("❌ %s stage error: %s", self.name, e)
+                results = None
+            else:
+                self.processed += 1
+            elapsed = time.perf_counter() - started
+            self.latencies.append(elapsed)
+            self._seconds.observe(elapsed)
+            if results and self.outbox is not None:
+                for result in results:
+                    await self.outbox.put(result)
+            self.busy = False
+
+    @property
+    def idle(self):
+        return not self.busy and not len(self.inbox)
+
+    def stats(self):
+        return dict(self.inbox.stats(), processed=self.processed, errors=self.errors,
+                    latency=latency_stats(self.latencies))
+
+
+class Pipeline:
+    def __init__(self, stages):
+        """
+        Stages connected by bounded queues, each running as its own task
+
+        A slow stage only fills the queue in front of it; earlier stages keep
+        running until that queue's policy pushes back (or drops/coalesces).
+
+        Args:
+            stages: Stage objects in order; each one's outbox is the next one's inbox
+        """
+        self.stages = list(stages)
+        self.inlet = self.stages[0].inbox
+        self._tasks = []
+
+    # --- LIFECYCLE ---
+    def start(self):
+        """Start one task per stage on the running event loop"""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(stage.run()) for stage in self.stages]
+
+    async def stop(self, drain=True, timeout=10):
+        """Stop the stages, first waiting up to timeout seconds for queued items"""
+        deadline = time.monotonic() + timeout
+        while drain and not self.idle and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def put(self, item):
+        """Feed an item to the first stage"""
+        return await self.inlet.put(item)
+
+    # --- STATS ---
+    @property
+    def idle(self):
+        return all(stage.idle for stage in self.stages)
+
+    @property
+    def settled(self):
+        """True when everything taken from the inlet has gone through every stage (the inlet may hold items)"""
+        return not self.stages[0].busy and all(stage.idle for stage in self.stages[1:])
+
+    async def settle(self, timeout=5):
+        """
+        Wait until the pipeline is settled, e.g. to snapshot the state of all stages consistently
+
+        Returns:
+            bool: False if it did not settle within timeout seconds
+        """
+        deadline = time.monotonic() + timeout
+        while not self.settled:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.005)
+        return True
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def report(self):
+        """Log queue depth, drops and latency per stage"""
+        for name, stats in self.stats().items():
+            latency = stats['latency']
+            handled = f"p95 {latency['p95_ms']:.2f} ms" if latency['count'] else "-"
+            log.info("📊 %s: depth %d/%d max | %d done | %d dropped | %d coalesced | %d blocked | %s",
+                     name, stats['depth'], stats['max_depth'], stats['processed'], stats['dropped'],
+                     stats['coalesced'], stats['blocked'], handled)
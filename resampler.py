@@ -0,0 +1,233 @@
+import numpy as np
+
+IST_OFFSET_SECONDS = 19800
+SESSION_START_MINUTE = 9 * 60 + 15  # 09:15 IST
+DEFAULT_TIMEFRAMES = (3, 5, 15, 30, 60)
+
+BAR_FIELDS = ('ts', 'open', 'high', 'low', 'close', 'volume')
+FRAME_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'oi')
+
+
+def bucket_minutes(ts, minutes, utc_offset=IST_OFFSET_SECONDS, session_start=SESSION_START_MINUTE):
+    """
+    Start of the `minutes` bar containing each epoch-second timestamp, as minutes since the epoch
+
+    Bars are aligned to the session open (09:15), so 30- and 60-minute bars
+    run 09:15-09:45 / 09:15-10:15 rather than starting on the hour. Works on
+    scalars and arrays.
+    """
+    local = ts + utc_offset
+    minute_of_day = (local % 86400) // 60
+    return (local // 86400) * 1440 + session_start + ((minute_of_day - session_start) // minutes) * minutes
+
+
+# --- BATCH MODE ---
+def resample_columns(columns, minutes, utc_offset=IST_OFFSET_SECONDS, session_start=SESSION_START_MINUTE):
+    """
+    Resample sorted candle columns to `minutes` bars with NumPy only
+
+    Produces the same bars as pandas resample(f'{minutes}T', offset=...)
+    .agg(first/max/min/last/sum).dropna() aligned to the session open, without
+    building a DataFrame. The input arrays are only read.
+
+    Args:
+        columns: Dict with 'ts' (epoch seconds, ascending), 'open', 'high',
+                 'low', 'close' and optionally 'volume' / 'oi' arrays
+        minutes: Bar length in minutes
+        utc_offset: Seconds added to 'ts' to get exchange wall-clock time
+                    (0 if 'ts' already holds wall-clock seconds)
+        session_start: Session open in minutes after midnight
+
+    Returns:
+        dict: Same keys as the input, one row per non-empty bar
+    """
+    ts = columns['ts']
+    if not len(ts):
+        return {name: values[:0] for name, values in columns.items()}
+
+    bucket = bucket_minutes(ts, minutes, utc_offset, session_start)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+
+    out = {
+        'ts': bucket[starts] * 60 - utc_offset,
+        'open': columns['open'][starts],
+        'high': np.maximum.reduceat(columns['high'], starts),
+        'low': np.minimum.reduceat(columns['low'], starts),
+        'close': columns['close'][ends]
+    }
+    if 'volume' in columns:
+        out['volume'] = np.add.reduceat(columns['volume'], starts)
+    if 'oi' in columns:
+        out['oi'] = columns['oi'][ends]
+    return out
+
+
+def resample_multi(columns, timeframes=DEFAULT_TIMEFRAMES, utc_offset=IST_OFFSET_SECONDS,
+                   session_start=SESSION_START_MINUTE):
+    """
+    Resample 1-minute columns to several timeframes in one call
+
+    Each timeframe is built from the largest already-built timeframe that
+    divides it (15m from 5m, 30m from 15m, ...), so later timeframes
+    aggregate far fewer rows.
+
+    Returns:
+        dict: minutes -> columns
+    """
+    built = {}
+    for minutes in sorted(timeframes):
+        sources = [m for m in built if minutes % m == 0]
+        source = built[max(sources)] if sources else columns
+        built[minutes] = resample_columns(source, minutes, utc_offset, session_start)
+    return {minutes: built[minutes] for minutes in timeframes}
+
+
+def resample_dataframe(df, minutes, time_column='datetime', fields=FRAME_FIELDS):
+    """
+    Resample a 1-minute candle DataFrame without mutating or re-indexing it
+
+    Args:
+        df: DataFrame with a datetime column and open/high/low/close[/volume/oi]
+        minutes: Bar length in minutes
+        time_column: Name of the datetime column
+        fields: Candle columns to carry over (those missing from df are skipped)
+
+    Returns:
+        DataFrame: datetime, open, high, low, close[, volume, oi] per bar,
+                   in the input's timezone
+    """
+    import pandas as pd
+
+    times = df[time_column]
+    tz = times.dt.tz
+    # Work in exchange wall-clock seconds; tz-aware inputs keep their zone on output
+    wall = times.dt.tz_localize(None) if tz is not None else times
+    ts = wall.to_numpy(dtype='datetime64[s]').astype(np.int64)
+    order = np.argsort(ts, kind='stable') if len(ts) > 1 and (np.diff(ts) < 0).any() else None
+
+    columns = {'ts': ts}
+    for name in fields:
+        if name in df.columns:
+            columns[name] = df[name].to_numpy()
+    if order is not None:
+        columns = {name: values[order] for name, values in columns.items()}
+
+    bars = resample_columns(columns, minutes, utc_offset=0)
+    result = pd.DataFrame({time_column: pd.to_datetime(bars.pop('ts'), unit='s')})
+    if tz is not None:
+        result[time_column] = result[time_column].dt.tz_localize(tz)
+    for name, values in bars.items():
+        result[name] = values
+    return result
+
+
+# --- STREAMING MODE ---
+class StreamingResampler:
+    __slots__ = ('timeframes', 'utc_offset', 'session_start', 'store', 'slot',
+                 '_bucket', '_open', '_high', '_low', '_close', '_volume')
+
+    def __init__(self, timeframes=DEFAULT_TIMEFRAMES, utc_offset=IST_OFFSET_SECONDS,
+                 session_start=SESSION_START_MINUTE, store=None, slot=0):
+        """
+        Build several timeframes at once from 1-minute candles or raw ticks
+
+        Args:
+            timeframes: Bar lengths in minutes
+            utc_offset: Exchange UTC offset in seconds
+            session_start: Session open in minutes after midnight
+            store: Optional candle_store.MultiTimeframeStore; completed bars
+                   are appended to store[minutes] at `slot`
+            slot: Instrument slot in the store
+        """
+        self.timeframes = tuple(timeframes)
+        self.utc_offset = utc_offset
+        self.session_start = session_start
+        self.store = store
+        self.slot = slot
+        n = len(self.timeframes)
+        self._bucket = [-1] * n
+        self._open = [0.0] * n
+        self._high = [0.0] * n
+        self._low = [0.0] * n
+        self._close = [0.0] * n
+        self._volume = [0.0] * n
+
+    def add_candle(self, ts, open_, high, low, close, volume=0):
+        """
+        Add one 1-minute candle (ts = start, epoch seconds)
+
+        Returns:
+            list: Completed bars as dicts with 'timeframe' and BAR_FIELDS
+        """
+        local = ts + self.utc_offset
+        day_minute = (local // 86400) * 1440
+        minute_of_day = (local % 86400) // 60 - self.session_start
+
+        completed = []
+        for i, minutes in enumerate(self.timeframes):
+            bucket = day_minute + self.session_start + (minute_of_day // minutes) * minutes
+            if bucket == self._bucket[i]:
+                if high > self._high[i]:
+                    self._high[i] = high
+                if low < self._low[i]:
+                    self._low[i] = low
+                self._close[i] = close
+                self._volume[i] += volume
+                continue
+            if bucket < self._bucket[i]:
+                # Late data for a bar that already closed
+                continue
+            if self._bucket[i] >= 0:
+                completed.append(self._emit(i))
+            self._bucket[i] = bucket
+            self._open[i] = open_
+            self._high[i] = high
+            self._low[i] = low
+            self._close[i] = close
+            self._volume[i] = volume
+        return completed
+
+    def add_tick(self, price, timestamp, volume=0):
+        """Add a raw tick (timestamp in epoch milliseconds)"""
+        return self.add_candle(timestamp // 1000, price, price, price, price, volume)
+
+    def add_columns(self, columns):
+        """Feed sorted 1-minute columns through the stream; returns all completed bars"""
+        completed = []
+        volume = columns['volume'] if 'volume' in columns else np.zeros(len(columns['ts']))
+        for row in zip(columns['ts'].tolist(), columns['open'].tolist(), columns['high'].tolist(),
+                       columns['low'].tolist(), columns['close'].tolist(), volume.tolist()):
+            completed.extend(self.add_candle(*row))
+        return completed
+
+    def flush(self):
+        """Close every open bar (e.g. at the end of the session)"""
+        completed = [self._emit(i) for i in range(len(self.timeframes)) if self._bucket[i] >= 0]
+        self._bucket = [-1] * len(self.timeframes)
+        return completed
+
+    def current(self, minutes):
+        """The running bar for a timeframe, or None"""
+        i = self.timeframes.index(minutes)
+        if self._bucket[i] < 0:
+            return None
+        return self._bar(i)
+
+    def _bar(self, i):
+        return {
+            'timeframe': self.timeframes[i],
+            'ts': self._bucket[i] * 60 - self.utc_offset,
+            'open': self._open[i],
+            'high': self._high[i],
+            'low': self._low[i],
+            'close': self._close[i],
+            'volume': self._volume[i]
+        }
+
+    def _emit(self, i):
+        bar = self._bar(i)
+        if self.store is not None:
+            self.store[bar['timeframe']].append(bar['ts'], bar['open'], bar['high'], bar['low'],
+                                                bar['close'], bar['volume'], 0, self.slot)
+        return bar
@@ -0,0 +1,602 @@
+import ast
+import json
+import operator
+import os
+
+from logger import get_logger
+
+log = get_logger("rules")
+
+# Rules are expressions over candle fields and indicators, e.g.
+#   low > ema(5) and close > ema(21)
+#   cross_above(close, ema(9))
+DEFAULT_RULES = {
+    # Candle entirely above the 5-EMA (its low is above it)
+    'bullish': 'low > ema(5)',
+    # Candle entirely below the 5-EMA (its high is below it)
+    'bearish': 'high < ema(5)',
+}
+FIELDS = ('ts', 'open', 'high', 'low', 'close', 'volume')  # ts: bar start, epoch seconds
+
+_BINARY = {
+    ast.Add: ('+', operator.add),
+    ast.Sub: ('-', operator.sub),
+    ast.Mult: ('*', operator.mul),
+    ast.Div: ('/', operator.truediv),
+}
+_COMPARE = {
+    ast.Gt: ('>', operator.gt),
+    ast.GtE: ('>=', operator.ge),
+    ast.Lt: ('<', operator.lt),
+    ast.LtE: ('<=', operator.le),
+    ast.Eq: ('==', operator.eq),
+    ast.NotEq: ('!=', operator.ne),
+}
+# Nodes that carry state from one candle to the next
+_STATEFUL = ('indicator', 'prev', 'cross_above', 'cross_below')
+
+
+# --- INDICATORS ---
+INDICATORS = {}
+
+
+def register_indicator(name, inputs, batch, stream, period=True):
+    """
+    Make an indicator callable from rules as name(period) or name(source, period)
+
+    Args:
+        name: Function name in rule expressions
+        inputs: Default input fields, e.g. ('close',); the inputs can also be
+                passed explicitly, as other series, before the period
+        batch: batch(arrays, period, options) -> array over the time axis
+        stream: stream(n, period, options) -> object whose
+                update(*values, index=None) returns the value at those slots
+        period: False for indicators called without a period, e.g. vwap()
+    """
+    INDICATORS[name] = {'inputs': tuple(inputs), 'batch': batch, 'stream': stream, 'period': period}
+
+
+def _along_time(func, arrays, *args, **kwargs):
+    """Apply a 1-D series function to every column of (time, instrument) arrays"""
+    import numpy as np
+
+    if arrays[0].ndim == 1:
+        return _known_rows(func, arrays, *args, **kwargs)
+    return np.column_stack([
+        _known_rows(func, [values[:, j] for values in arrays], *args, **kwargs)
+        for j in range(arrays[0].shape[1])
+    ])
+
+
+def _known_rows(func, arrays, *args, **kwargs):
+    """
+    func over the rows where every input is known; other rows are NaN
+
+    An indicator of an indicator (rsi(ema(3), 14)) thus starts once its
+    input has warmed up, as RuleStream does, instead of staying NaN.
+    """
+    import numpy as np
+
+    known = ~np.isnan(arrays[0])
+    for values in arrays[1:]:
+        known &= ~np.isnan(values)
+    if known.all():
+        return func(*arrays, *args, **kwargs)
+    rows = np.flatnonzero(known)
+    out = np.full(len(known), np.nan)
+    out[rows] = func(*(values[rows] for values in arrays), *args, **kwargs)
+    return out
+
+
+def _ema_batch(arrays, period, options):
+    from indicators import ema_array
+    return _along_time(ema_array, arrays, period, seed=options['ema_seed'])
+
+
+def _ema_stream(n, period, options):
+    from indicators import VectorEMA
+    return VectorEMA(n, period, seed=options['ema_seed'])
+
+
+class _Output:
+    """One output of a streaming indicator that returns several"""
+    __slots__ = ('indicator', 'position')
+
+    def __init__(self, indicator, position):
+        self.indicator = indicator
+        self.position = position
+
+    def update(self, *values, index=None):
+        return self.indicator.update(*values, index=index)[self.position]
+
+
+def _library_batch(function, output=None):
+    """Batch form backed by indicators.<function>, picking one output if it returns several"""
+    def batch(arrays, period, options):
+        import indicators
+
+        func = getattr(indicators, function)
+        periods = () if period is None else (period,)
+
+        def one(*columns):
+            result = func(*columns, *periods)
+            return result if output is None else result[output]
+        return _along_time(one, arrays)
+    return batch
+
+
+def _library_stream(cls, output=None):
+    """Streaming form backed by indicators.<cls>"""
+    def stream(n, period, options):
+        import indicators
+
+        indicator = getattr(indicators, cls)(n) if period is None else getattr(indicators, cls)(n, period)
+        return indicator if output is None else _Output(indicator, output)
+    return stream
+
+
+register_indicator('ema', ('close',), _ema_batch, _ema_stream)
+register_indicator('sma', ('close',), _library_batch('sma_array'), _library_stream('VectorSMA'))
+register_indicator('rsi', ('close',), _library_batch('rsi_array'), _library_stream('VectorRSI'))
+register_indicator('atr', ('high', 'low', 'close'), _library_batch('atr_array'), _library_stream('VectorATR'))
+register_indicator('vwap', ('ts', 'high', 'low', 'close', 'volume'), _library_batch('vwap_array'),
+                   _library_stream('VectorVWAP'), period=False)
+# Bollinger bands (2 standard deviations) and SuperTrend (3 ATRs), see indicators.py
+register_indicator('bb_mid', ('close',), _library_batch('bollinger_array', 0), _library_stream('VectorBollinger', 0))
+register_indicator('bb_upper', ('close',), _library_batch('bollinger_array', 1), _library_stream('VectorBollinger', 1))
+register_indicator('bb_lower', ('close',), _library_batch('bollinger_array', 2), _library_stream('VectorBollinger', 2))
+register_indicator('supertrend', ('high', 'low', 'close'), _library_batch('supertrend_array', 0),
+                   _library_stream('VectorSuperTrend', 0))
+register_indicator('supertrend_dir', ('high', 'low', 'close'), _library_batch('supertrend_array', 1),
+                   _library_stream('VectorSuperTrend', 1))
+
+
+# --- COMPILED RULES ---
+class _Node:
+    __slots__ = ('key', 'kind', 'children', 'param')
+
+    def __init__(self, key, kind, children, param):
+        self.key = key
+        self.kind = kind
+        self.children = children
+        self.param = param
+
+
+class RuleSet:
+    def __init__(self, rules, ema_seed='sma'):
+        """
+        Alert rules parsed once and compiled into one shared expression graph
+
+        Every sub-expression is interned under a canonical key (ema(5) and
+        ema(close, 5) are the same node), so an indicator or comparison used
+        by several rules is computed once per evaluation. Nodes are kept in
+        dependency order and evaluated with operators that work on floats
+        and NumPy arrays alike, so one candle, one candle per instrument, or
+        a whole history are all a single pass.
+
+        Supported syntax: ts/open/high/low/close/volume, numbers, + - * /,
+        comparisons (chains allowed), and/or/not, abs(x), prev(x),
+        cross_above(a, b), cross_below(a, b) and the INDICATORS (ema, sma,
+        rsi, atr, vwap, bb_mid/bb_upper/bb_lower, supertrend/supertrend_dir).
+
+        Args:
+            rules: {name: expression}
+            ema_seed: 'sma' (like EMACalculator) or 'first' (like pandas ewm)
+
+        Raises:
+            ValueError: If an expression cannot be parsed or uses unknown names
+        """
+        self.rules = dict(rules)
+        self.options = {'ema_seed': ema_seed}
+        self._nodes = []
+        self._by_key = {}
+        self._plans = {}
+        self.roots = {name: self._compile(name, expr) for name, expr in self.rules.items()}
+
+    def __len__(self):
+        return len(self.rules)
+
+    @property
+    def node_count(self):
+        """Distinct sub-expressions across all rules"""
+        return len(self._nodes)
+
+    def key(self, expr):
+        """Canonical key of an expression, e.g. key('ema(5)') == 'ema(close, 5)'"""
+        return self._compile(expr, expr, intern=False)
+
+    # --- PARSING ---
+    def _compile(self, name, expr, intern=True):
+        try:
+            tree = ast.parse(str(expr).strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Rule '{name}': cannot parse {expr!r}: {e.msg}")
+        return self._build(tree.body, name, intern)
+
+    def _add(self, key, kind, children, param, intern):
+        if intern and key not in self._by_key:
+            node = _Node(key, kind, tuple(children), param)
+            self._by_key[key] = node
+            self._nodes.append(node)
+        return key
+
+    def _build(self, node, rule, intern):
+        build = lambda child: self._build(child, rule, intern)
+
+        if isinstance(node, ast.Name):
+            if node.id not in FIELDS:
+                raise ValueError(f"Rule '{rule}': unknown name '{node.id}' (fields: {', '.join(FIELDS)})")
+            return self._add(node.id, 'field', (), node.id, intern)
+
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return self._add(repr(node.value), 'const', (), node.value, intern)
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            symbol, func = _BINARY[type(node.op)]
+            left, right = build(node.left), build(node.right)
+            return self._add(f"({left} {symbol} {right})", 'binop', (left, right), func, intern)
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            operand = build(node.operand)
+            return self._add(f"(-{operand})", 'neg', (operand,), None, intern)
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand = build(node.operand)
+            return self._add(f"(not {operand})", 'not', (operand,), None, intern)
+
+        if isinstance(node, ast.Compare):
+            # a < b < c is (a < b) and (b < c)
+            terms = [build(node.left)] + [build(comparator) for comparator in node.comparators]
+            keys = []
+            for op, left, right in zip(node.ops, terms, terms[1:]):
+                if type(op) not in _COMPARE:
+                    raise ValueError(f"Rule '{rule}': unsupported comparison {type(op).__name__}")
+                symbol, func = _COMPARE[type(op)]
+                keys.append(self._add(f"({left} {symbol} {right})", 'binop', (left, right), func, intern))
+            return self._fold('and', keys, intern)
+
+        if isinstance(node, ast.BoolOp):
+            kind = 'and' if isinstance(node.op, ast.And) else 'or'
+            return self._fold(kind, [build(value) for value in node.values], intern)
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            return self._build_call(node.func.id, node.args, rule, intern)
+
+        raise ValueError(f"Rule '{rule}': unsupported expression {ast.dump(node)[:60]}")
+
+    def _fold(self, kind, keys, intern):
+        key = keys[0]
+        for other in keys[1:]:
+            key = self._add(f"({key} {kind} {other})", kind, (key, other), None, intern)
+        return key
+
+    def _build_call(self, name, args, rule, intern):
+        if name == 'abs' and len(args) == 1:
+            operand = self._build(args[0], rule, intern)
+            return self._add(f"abs({operand})", 'abs', (operand,), None, intern)
+
+        if name == 'prev' and len(args) == 1:
+            operand = self._build(args[0], rule, intern)
+            return self._add(f"prev({operand})", 'prev', (operand,), None, intern)
+
+        if name in ('cross_above', 'cross_below') and len(args) == 2:
+            a, b = (self._build(arg, rule, intern) for arg in args)
+            return self._add(f"{name}({a}, {b})", name, (a, b), None, intern)
+
+        spec = INDICATORS.get(name)
+        if spec is None:
+            raise ValueError(f"Rule '{rule}': unknown function '{name}'")
+        if not spec['period']:
+            period, sources = None, args
+        elif not args or not isinstance(args[-1], ast.Constant) or not isinstance(args[-1].value, int) \
+                or isinstance(args[-1].value, bool) or args[-1].value < 1:
+            raise ValueError(f"Rule '{rule}': {name}() needs a positive integer period as its last argument")
+        else:
+            period, sources = args[-1].value, args[:-1]
+        if not sources:
+            inputs = [self._add(field, 'field', (), field, intern) for field in spec['inputs']]
+        elif len(sources) == len(spec['inputs']):
+            inputs = [self._build(source, rule, intern) for source in sources]
+        else:
+            raise ValueError(f"Rule '{rule}': {name}() takes {len(spec['inputs'])} input(s)"
+                             f"{' and a period' if spec['period'] else ''}")
+        arguments = inputs if period is None else inputs + [str(period)]
+        key = f"{name}({', '.join(arguments)})"
+        return self._add(key, 'indicator', inputs, (name, period), intern)
+
+    # --- EVALUATION ---
+    def plan(self, bound=()):
+        """
+        Nodes to compute, in dependency order, when the keys in bound are supplied
+
+        Sub-expressions only needed to compute a bound key are left out.
+        Plans are cached per set of bound keys.
+        """
+        bound = frozenset(bound)
+        plan = self._plans.get(bound)
+        if plan is None:
+            needed = set()
+            pending = list(self.roots.values())
+            while pending:
+                key = pending.pop()
+                if key not in needed:
+                    needed.add(key)
+                    if key not in bound:
+                        pending.extend(self._by_key[key].children)
+            plan = self._plans[bound] = [node for node in self._nodes if node.key in needed]
+        return plan
+
+    @staticmethod
+    def _apply(node, args, columns):
+        """Value of a stateless node from its children's values"""
+        kind = node.kind
+        if kind == 'field':
+            if node.param not in columns:
+                raise ValueError(f"Rules need a '{node.param}' column")
+            return columns[node.param]
+        if kind == 'const':
+            return node.param
+        if kind == 'binop':
+            return node.param(args[0], args[1])
+        if kind == 'and':
+            return args[0] & args[1]
+        if kind == 'or':
+            return args[0] | args[1]
+        if kind == 'not':
+            return args[0] ^ True
+        if kind == 'neg':
+            return -args[0]
+        return abs(args[0])
+
+    def evaluate(self, columns, indicators=None):
+        """
+        Evaluate every rule over a history, time along axis 0
+
+        Args:
+            columns: Field arrays, 1-D (time) or 2-D (time, instrument)
+            indicators: Precomputed series by key (see key()), e.g.
+                        {'ema(close, 5)': ema}; these nodes are not recomputed
+
+        Returns:
+            dict: rule name -> boolean array (True where the rule holds)
+        """
+        import numpy as np
+
+        bound = indicators or {}
+        values = {}
+        for node in self.plan(bound):
+            if node.key in bound:
+                values[node.key] = bound[node.key]
+                continue
+            args = [values[child] for child in node.children]
+            if node.kind == 'indicator':
+                name, period = node.param
+                arrays = [np.asarray(arg, dtype=np.float64) for arg in args]
+                values[node.key] = INDICATORS[name]['batch'](arrays, period, self.options)
+            elif node.kind == 'prev':
+                values[node.key] = _shift(args[0])
+            elif node.kind in ('cross_above', 'cross_below'):
+                values[node.key] = _cross(node.kind, args[0], args[1], _shift(args[0]), _shift(args[1]))
+            else:
+                values[node.key] = self._apply(node, args, columns)
+        return {name: values[key] for name, key in self.roots.items()}
+
+    def stream(self, n=1):
+        """Incremental evaluator for n instruments (see RuleStream)"""
+        return RuleStream(self, n)
+
+    # --- SINGLE-EMA PREDICATES ---
+    def _stateful(self, key, bound):
+        """Stateful nodes key depends on, stopping at bound keys"""
+        if key in bound:
+            return set()
+        node = self._by_key[key]
+        if node.kind in _STATEFUL:
+            return {key}
+        found = set()
+        for child in node.children:
+            found |= self._stateful(child, bound)
+        return found
+
+    def _value(self, key, columns, values):
+        if key not in values:
+            node = self._by_key[key]
+            args = [self._value(child, columns, values) for child in node.children]
+            values[key] = self._apply(node, args, columns)
+        return values[key]
+
+    def predicates(self, ema_period, names=None):
+        """
+        Rules as predicate(candle, ema) functions for AlertStateStore.evaluate
+
+        The store carries a single EMA of closes, so only rules whose
+        indicators are ema(ema_period) qualify. Pure Python; no NumPy needed.
+
+        Args:
+            ema_period: Period of the EMA the caller passes in
+            names: Rules to include (default: every rule that qualifies;
+                   others are skipped with a warning)
+
+        Returns:
+            dict: {name: predicate(candle dict, ema) -> bool}
+
+        Raises:
+            ValueError: If a rule listed in names needs other state
+        """
+        ema_key = self.key(f'ema({ema_period})')
+        predicates = {}
+        for name in (names if names is not None else self.roots):
+            needs = self._stateful(self.roots[name], {ema_key})
+            if needs:
+                message = f"Rule '{name}' needs {', '.join(sorted(needs))}, only {ema_key} is available"
+                if names is not None:
+                    raise ValueError(message)
+                log.warning("⚠️  %s; skipped", message)
+                continue
+            predicates[name] = self._predicate(self.roots[name], ema_key)
+        return predicates
+
+    def _predicate(self, root, ema_key):
+        return lambda candle, ema: bool(self._value(root, candle, {ema_key: ema}))
+
+
+class RuleStream:
+    def __init__(self, ruleset, n=1):
+        """
+        Evaluate a RuleSet one candle close at a time for n instruments
+
+        Indicator, prev() and cross_*() nodes keep one state slot per
+        instrument; everything else is recomputed from the new candles.
+
+        Args:
+            ruleset: RuleSet
+            n: Number of instrument slots
+        """
+        import numpy as np
+
+        self.ruleset = ruleset
+        self.n = n
+        self.values = {}
+        self._state = {}
+        for node in ruleset._nodes:
+            if node.kind == 'indicator':
+                name, period = node.param
+                self._state[node.key] = INDICATORS[name]['stream'](n, period, ruleset.options)
+            elif node.kind == 'prev':
+                self._state[node.key] = np.full(n, np.nan)
+            elif node.kind in ('cross_above', 'cross_below'):
+                self._state[node.key] = (np.full(n, np.nan), np.full(n, np.nan))
+
+    def update(self, columns, index=None, indicators=None):
+        """
+        Add one completed candle per instrument and evaluate every rule
+
+        Args:
+            columns: Field values aligned with index (arrays, or scalars for one instrument)
+            index: Slots these candles belong to (default: all n)
+            indicators: Precomputed values by key, e.g. {'ema(close, 5)': ema};
+                        pass the same keys on every call, since the state
+                        of a supplied indicator is not advanced here
+
+        Returns:
+            dict: rule name -> boolean array aligned with index
+        """
+        import numpy as np
+
+        ruleset = self.ruleset
+        bound = indicators or {}
+        slots = slice(None) if index is None else index
+        values = {}
+        for node in ruleset.plan(bound):
+            if node.key in bound:
+                values[node.key] = bound[node.key]
+                continue
+            args = [values[child] for child in node.children]
+            kind = node.kind
+            if kind == 'indicator':
+                values[node.key] = self._indicator(self._state[node.key], args, index)
+            elif kind == 'prev':
+                state = self._state[node.key]
+                values[node.key] = state[slots].copy()
+                state[slots] = args[0]
+            elif kind in ('cross_above', 'cross_below'):
+                last_a, last_b = self._state[node.key]
+                values[node.key] = _cross(kind, np.asarray(args[0]), np.asarray(args[1]),
+                                          last_a[slots], last_b[slots])
+                last_a[slots] = args[0]
+                last_b[slots] = args[1]
+            else:
+                values[node.key] = ruleset._apply(node, args, columns)
+        self.values = values
+        return {name: np.atleast_1d(values[key]) for name, key in ruleset.roots.items()}
+
+    def _indicator(self, state, args, index):
+        """Advance an indicator for the slots whose inputs are known (see _known_rows)"""
+        import numpy as np
+
+        arrays = [np.asarray(arg, dtype=np.float64) for arg in args]
+        known = ~np.isnan(arrays[0])
+        for values in arrays[1:]:
+            known = known & ~np.isnan(values)
+        if known.all():
+            return state.update(*args, index=index)
+
+        slots = np.arange(self.n) if index is None else np.asarray(index)
+        shape = np.broadcast(slots, *arrays).shape
+        known = np.broadcast_to(known, shape)
+        out = np.full(shape, np.nan)
+        if known.any():
+            out[known] = state.update(*(np.broadcast_to(values, shape)[known] for values in arrays),
+                                      index=np.broadcast_to(slots, shape)[known])
+        return out
+
+    def warm_up(self, columns):
+        """Feed a history (time along axis 0) through update() to build indicator state"""
+        fields = [name for name in FIELDS if name in columns]
+        for t in range(len(columns[fields[0]])):
+            self.update({name: columns[name][t] for name in fields})
+
+    def value(self, expr):
+        """Value of any sub-expression (e.g. 'ema(5)') from the last update(), or None"""
+        return self.values.get(self.ruleset.key(expr))
+
+    def snapshot(self):
+        """Picklable indicator/prev/cross state and last values (see restore)"""
+        return {
+            'rules': dict(self.ruleset.rules),
+            'options': dict(self.ruleset.options),
+            'n': self.n,
+            'state': self._state,
+            'values': self.values
+        }
+
+    def restore(self, snapshot):
+        """
+        Continue from a snapshot() taken by a stream of the same rules
+
+        Raises:
+            ValueError: If the rules, options or slot count have changed
+        """
+        if snapshot['rules'] != self.ruleset.rules or snapshot['options'] != self.ruleset.options:
+            raise ValueError("Snapshot was taken with different rules")
+        if snapshot['n'] != self.n:
+            raise ValueError(f"Snapshot has {snapshot['n']} slots, the stream has {self.n}")
+        self._state = snapshot['state']
+        self.values = snapshot['values']
+
+
+def _shift(values):
+    """values delayed by one step along axis 0 (NaN first)"""
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    out[:1] = np.nan
+    out[1:] = values[:-1]
+    return out
+
+
+def _cross(kind, a, b, last_a, last_b):
+    if kind == 'cross_above':
+        return (a > b) & (last_a <= last_b)
+    return (a < b) & (last_a >= last_b)
+
+
+# --- CONFIG ---
+def load_rules(config_path="config.json"):
+    """
+    Alert rules from the ALERT_RULES environment variable (a JSON object),
+    the "rules" section of config_path, or DEFAULT_RULES
+
+    Returns:
+        dict: {name: expression}
+    """
+    override = os.getenv('ALERT_RULES')
+    if override:
+        return json.loads(override)
+    try:
+        with open(config_path, 'r') as f:
+            rules = json.load(f).get('rules')
+    except (OSError, ValueError):
+        rules = None
+    return dict(rules or DEFAULT_RULES)
@@ -0,0 +1,438 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from logger import get_logger
+from metrics import (ALERTS, CANDLE_CLOSE_TO_ALERT_SECONDS, LAST_TICK, MONITOR_ERRORS, QUOTE_TO_CANDLE_SECONDS, TICKS,
+                     start_metrics_server)
+from multi_monitor import InstrumentStateTable, evaluate_rules, fetch_ltp_batch, format_rule_alert
+from rules import RuleSet, load_rules
+from upstox_http import UpstoxHTTPClient
+
+log = get_logger("scanner")
+
+DEDUP_WINDOW = 24 * 60 * 60  # seconds a delivered signal is remembered by the coordinator
+JOIN_TIMEOUT = 5  # seconds a worker gets to exit before it is terminated
+RECORD_FIELDS = ('slot', 'rule', 'ts', 'open', 'high', 'low', 'close', 'ema')
+
+# Heavier than the default rules so the benchmark has per-candle work to spread
+BENCHMARK_RULES = {
+    'bullish': "low > ema(5)",
+    'bearish': "high < ema(5)",
+    'momentum': "rsi(14) > 60 and close > bb_upper(20)",
+    'trend': "supertrend_dir(10) > 0 and cross_above(close, ema(21))"
+}
+
+
+# --- SHARDS ---
+def shard_universe(instrument_keys, n_shards):
+    """
+    Split a universe into n_shards contiguous shards of near-equal size
+
+    Duplicate keys are dropped (first occurrence wins) so each instrument is
+    owned by exactly one shard.
+
+    Returns:
+        list: One list of instrument keys per non-empty shard
+    """
+    keys = list(dict.fromkeys(instrument_keys))
+    n_shards = max(1, min(n_shards, len(keys)))
+    bounds = np.linspace(0, len(keys), n_shards + 1).round().astype(int)
+    return [keys[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+class ScanShard:
+    def __init__(self, instrument_keys, rules, interval_minutes=5, ema_period=5):
+        """
+        Candle, EMA and rule/indicator state for one shard of the universe
+
+        This is what each scanner worker process owns; a scanner with
+        workers=0 runs the shards in the calling process instead.
+
+        Args:
+            instrument_keys: Keys owned by this shard, in slot order
+            rules: {name: expression}
+            interval_minutes: Candle interval in minutes
+            ema_period: EMA period tracked by the candle table
+        """
+        self.table = InstrumentStateTable(instrument_keys, interval_minutes, ema_period)
+        self.ruleset = RuleSet(rules)
+        self.rule_stream = self.ruleset.stream(len(self.table))
+        self.ema_period = ema_period
+
+    def update(self, prices, timestamp_ms):
+        """
+        Apply one tick per instrument and evaluate the rules on completed candles
+
+        Returns:
+            dict or None: Compact signal records as parallel arrays keyed by
+                          RECORD_FIELDS ('slot' is the shard slot, 'rule' the
+                          index into the rule order), or None if nothing fired
+        """
+        completed = self.table.update(prices, timestamp_ms)
+        if completed is None:
+            return None
+
+        fired = evaluate_rules(self.rule_stream, completed, self.ema_period)
+        rows = [np.flatnonzero(mask) for mask in fired.values()]
+        count = sum(len(r) for r in rows)
+        if not count:
+            return None
+
+        rows_all = np.concatenate(rows)
+        records = {
+            'slot': completed['index'][rows_all].astype(np.int32),
+            'rule': np.repeat(np.arange(len(rows), dtype=np.int16), [len(r) for r in rows])
+        }
+        for field in RECORD_FIELDS[2:]:
+            records[field] = completed[field][rows_all]
+        return records
+
+
+def _scan_worker(conn, instrument_keys, rules, interval_minutes, ema_period):
+    """Worker process loop: (prices, timestamp_ms) in, ('ok', records) or ('error', message) out"""
+    shard = ScanShard(instrument_keys, rules, interval_minutes, ema_period)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        try:
+            conn.send(('ok', shard.update(*message)))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+# --- COORDINATOR ---
+class ShardedScanner:
+    def __init__(self, instrument_keys, workers=None, rules=None, interval_minutes=5, ema_period=5,
+                 dedup_window=DEDUP_WINDOW):
+        """
+        Scan a large universe by splitting it across worker processes
+
+        Each worker owns the candle, EMA and rule state of its shard. Every
+        scan() sends each worker its slice of the price vector first and then
+        collects the replies, so the shards are evaluated in parallel. Workers
+        only send back compact signal records; the coordinator maps them to
+        instrument keys and drops anything already signalled.
+
+        Args:
+            instrument_keys: Universe (duplicates are dropped)
+            workers: Worker processes (default: one per CPU); 0 evaluates the
+                     shards in this process
+            rules: {name: expression} (default: load_rules())
+            interval_minutes: Candle interval in minutes
+            ema_period: EMA period tracked per instrument
+            dedup_window: Seconds a signal is remembered for deduplication
+        """
+        self.rules = dict(rules or load_rules())
+        RuleSet(self.rules)  # fail fast on a bad rule, before any worker starts
+        self.rule_names = list(self.rules)
+        self.interval_minutes = interval_minutes
+        self.ema_period = ema_period
+        self.dedup_window = dedup_window
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+
+        self.shards = shard_universe(instrument_keys, max(self.workers, 1))
+        self.instrument_keys = [key for shard in self.shards for key in shard]
+        self.index = {key: i for i, key in enumerate(self.instrument_keys)}
+        self.bounds = np.cumsum([0] + [len(shard) for shard in self.shards])
+
+        self._local = None
+        self._processes = []
+        self._conns = []
+        self._seen = {}  # (instrument_key, rule, candle ts) -> candle ts
+
+        self.scans = 0
+        self.signals = 0
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self.instrument_keys)
+
+    # --- LIFECYCLE ---
+    def start(self):
+        """Start the worker processes (or build the in-process shards for workers=0)"""
+        if self._local is not None or self._processes:
+            return
+        args = (self.rules, self.interval_minutes, self.ema_period)
+        if self.workers == 0:
+            self._local = [ScanShard(shard, *args) for shard in self.shards]
+            return
+
+        # spawn: workers must not inherit the parent's threads (token refresh, HTTP pool)
+        context = multiprocessing.get_context('spawn')
+        for i, shard in enumerate(self.shards):
+            parent, child = context.Pipe()
+            process = context.Process(target=_scan_worker, args=(child, shard) + args,
+                                      name=f"scanner-{i}", daemon=True)
+            process.start()
+            child.close()
+            self._processes.append(process)
+            self._conns.append(parent)
+
+    def stop(self):
+        """Ask the workers to exit, terminating any that do not"""
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(JOIN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._processes = []
+        self._conns = []
+        self._local = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- SCANNING ---
+    def prices_from_quotes(self, quotes):
+        """Convert a {instrument_key: price} dict to a universe-aligned array (NaN = no quote)"""
+        prices = np.full(len(self.instrument_keys), np.nan)
+        index = self.index
+        for key, price in quotes.items():
+            i = index.get(key)
+            if i is not None:
+                prices[i] = price
+        return prices
+
+    def scan(self, prices, timestamp_ms):
+        """
+        Apply one tick per instrument across all shards
+
+        Args:
+            prices: Universe-aligned price array (see prices_from_quotes)
+            timestamp_ms: Tick time in epoch milliseconds
+
+        Returns:
+            list: New signals as dicts (instrument, rule, ts, open, high, low,
+                  close, ema), ordered by shard; empty between candle closes
+        """
+        if self._local is None and not self._processes:
+            raise Exception("ShardedScanner is not running; call start() first")
+        prices = np.asarray(prices, dtype=np.float64)
+        slices = [prices[a:b] for a, b in zip(self.bounds[:-1], self.bounds[1:])]
+
+        if self._local is not None:
+            replies = [shard.update(part, timestamp_ms) for shard, part in zip(self._local, slices)]
+        else:
+            # Send to every worker before waiting on any, so the shards run concurrently
+            sent, errors = [], []
+            for i, (conn, part) in enumerate(zip(self._conns, slices)):
+                try:
+                    conn.send((part, timestamp_ms))
+                    sent.append(i)
+                except (BrokenPipeError, OSError):
+                    errors.append(Exception(f"Scanner worker {i} exited (exit code {self._processes[i].exitcode})"))
+            # Every reply is read before raising, so none is left in a pipe to be
+            # taken for the next tick's
+            replies = [None] * len(self._conns)
+            for i in sent:
+                try:
+                    replies[i] = self._receive(i)
+                except Exception as e:
+                    errors.append(e)
+            if errors:
+                raise errors[0]
+
+        self.scans += 1
+        return self._collect(replies)
+
+    def _receive(self, i):
+        try:
+            status, payload = self._conns[i].recv()
+        except (EOFError, OSError):
+            raise Exception(f"Scanner worker {i} exited (exit code {self._processes[i].exitcode})")
+        if status == 'error':
+            raise Exception(f"Scanner worker {i} failed: {payload}")
+        return payload
+
+    def _collect(self, replies):
+        signals = []
+        newest = None
+        for offset, records in zip(self.bounds, replies):
+            if records is None:
+                continue
+            columns = {field: records[field].tolist() for field in RECORD_FIELDS}
+            for row in zip(*(columns[field] for field in RECORD_FIELDS)):
+                slot, rule, ts = row[:3]
+                key = (self.instrument_keys[offset + slot], self.rule_names[rule], ts)
+                newest = ts if newest is None else max(newest, ts)
+                if key in self._seen:
+                    self.duplicates += 1
+                    continue
+                self._seen[key] = ts
+                signals.append(dict(zip(RECORD_FIELDS[3:], row[3:]),
+                                    instrument=key[0], rule=key[1], ts=ts))
+
+        if newest is not None:
+            self._forget(newest - self.dedup_window)
+        self.signals += len(signals)
+        return signals
+
+    def _forget(self, before):
+        stale = [key for key, ts in self._seen.items() if ts < before]
+        for key in stale:
+            del self._seen[key]
+
+    def stats(self):
+        return {
+            'instruments': len(self.instrument_keys),
+            'shards': len(self.shards),
+            'workers': len(self._processes),
+            'scans': self.scans,
+            'signals': self.signals,
+            'duplicates': self.duplicates
+        }
+
+
+def format_signal(signal, expression, interval_minutes, ema_period):
+    """Format a scanner signal with the same layout as the multi-instrument monitor"""
+    batch = {field: [signal[field]] for field in ('open', 'high', 'low', 'close', 'ema')}
+    batch['start_ms'] = [signal['ts'] * 1000]
+    return format_rule_alert(signal['instrument'], signal['rule'], expression, batch, 0,
+                             interval_minutes, ema_period)
+
+
+# --- SCANNER MONITOR ---
+async def scanner_monitor(instrument_keys, workers=None, interval_minutes=5, ema_period=5, scheduler=None):
+    """Poll batched quotes for the whole universe and alert on every new rule signal"""
+    from auth import get_access_token
+    from scheduler import PollScheduler
+    from telegram_bot import TelegramBot
+    from telegram_queue import TelegramDeliveryQueue
+    from token_manager import get_token_manager
+
+    access_token = get_access_token()
+    if not access_token:
+        log.error("❌ No access token available. Please run auth.py first.")
+        return
+
+    alerts = TelegramDeliveryQueue(TelegramBot(), parse_mode=None)
+    alerts.start()
+    http = UpstoxHTTPClient(access_token)
+    manager = get_token_manager()
+    manager.add_listener(http.set_access_token)
+    manager.start()
+    scheduler = scheduler or PollScheduler(interval_minutes)
+
+    with ShardedScanner(instrument_keys, workers, interval_minutes=interval_minutes,
+                        ema_period=ema_period) as scanner:
+        log.info("📡 Scanning %d instruments on %d shard(s) (%d-min candles, %d-EMA)",
+                 len(scanner), len(scanner.shards), interval_minutes, ema_period)
+        while True:
+            try:
+                quotes = await fetch_ltp_batch(scanner.instrument_keys, http)
+                quoted_at = time.time()
+                TICKS.inc(len(quotes))
+                LAST_TICK.set(quoted_at)
+                started = time.perf_counter()
+                signals = scanner.scan(scanner.prices_from_quotes(quotes), int(quoted_at * 1000))
+                QUOTE_TO_CANDLE_SECONDS.observe(time.time() - quoted_at)
+                if signals:
+                    elapsed = (time.perf_counter() - started) * 1000
+                    log.info("🎯 %d signal(s) in %.1f ms", len(signals), elapsed)
+                    for signal in signals:
+                        alerts.enqueue(format_signal(signal, scanner.rules[signal['rule']],
+                                                     interval_minutes, ema_period))
+                        ALERTS.labels(signal['rule']).inc()
+                        close = signal['ts'] + interval_minutes * 60
+                        CANDLE_CLOSE_TO_ALERT_SECONDS.observe(max(time.time() - close, 0.0))
+
+                scheduler.succeeded()
+                await scheduler.wait()
+
+            except Exception as e:
+                MONITOR_ERRORS.labels('scanner').inc()
+                log.error("❌ Error: %s", e, sample=60)
+                await scheduler.wait_after_error()
+
+
+# --- BENCHMARK ---
+def benchmark_scan(universe_sizes=(50, 200, 1000, 5000), worker_counts=(0, 1, 2, 4), closes=20,
+                   ticks_per_candle=3, warm_up=30, rules=None):
+    """
+    Time scan() per candle close against universe size and worker count
+
+    Every candle gets ticks_per_candle intra-candle ticks (not timed) and
+    is then closed by the first tick of the next candle (timed). The first
+    warm_up candles fill the indicator windows and are not timed either.
+
+    Returns:
+        list: (universe size, workers, milliseconds per candle close)
+    """
+    rules = rules or BENCHMARK_RULES
+    interval_ms = 5 * 60 * 1000
+    results = []
+    print(f"⏱️  Scan time per candle close ({os.cpu_count()} CPU(s), {len(rules)} rules)")
+    print(f"{'instruments':>12} {'workers':>8} {'ms/close':>10} {'vs 1 worker':>12}")
+
+    for size in universe_sizes:
+        keys = [f"NSE_EQ|SYM{i}" for i in range(size)]
+        single = None
+        for workers in worker_counts:
+            rng = np.random.default_rng(42)
+            prices = 1000 + rng.standard_normal(size).cumsum()
+            start_ms = 1_700_000_000_000 // interval_ms * interval_ms
+            timings = []
+            with ShardedScanner(keys, workers, rules=rules) as scanner:
+                for candle in range(warm_up + closes):
+                    for tick in range(ticks_per_candle):
+                        prices = prices + rng.standard_normal(size)
+                        scanner.scan(prices, start_ms + candle * interval_ms + tick * 1000)
+                    prices = prices + rng.standard_normal(size)
+                    started = time.perf_counter()
+                    scanner.scan(prices, start_ms + (candle + 1) * interval_ms)
+                    if candle >= warm_up:
+                        timings.append(time.perf_counter() - started)
+
+            ms = float(np.median(timings)) * 1000
+            if workers == 1:
+                single = ms
+            speedup = f"{single / ms:.2f}x" if single and workers > 1 else ""
+            results.append((size, workers, ms))
+            label = "inline" if workers == 0 else str(workers)
+            print(f"{size:>12} {label:>8} {ms:>10.2f} {speedup:>12}")
+    return results
+
+
+def load_universe(path):
+    """Instrument keys from a text file, one per line ('#' starts a comment)"""
+    with open(path) as f:
+        lines = (line.split('#', 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded multi-process rule scanner")
+    parser.add_argument('keys', nargs='*', help="Instrument keys to scan")
+    parser.add_argument('--universe', help="File with one instrument key per line")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--benchmark', action='store_true', help="Time scans per candle close and exit")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_scan(worker_counts=(0, 1, 2, 4) if args.workers is None else (args.workers,))
+    else:
+        universe = args.keys + (load_universe(args.universe) if args.universe else [])
+        if not universe:
+            parser.error("give instrument keys or --universe FILE")
+        start_metrics_server()
+        asyncio.run(scanner_monitor(universe, args.workers))
@@ -0,0 +1,208 @@
+import asyncio
+from datetime import datetime, time, timedelta
+
+from trading_calendar import IST, get_calendar
+
+MID_BAR_INTERVAL = 15.0  # seconds between polls while a candle is far from closing
+NEAR_BOUNDARY_INTERVAL = 1.0  # seconds between polls just before a candle closes
+NEAR_BOUNDARY_WINDOW = 15.0  # how long before a boundary the fast polling starts
+BOUNDARY_DELAY = 0.2  # poll this long after a boundary, once the exchange has moved on
+MAX_SLEEP = 300.0  # longest single sleep; the schedule is re-checked after it
+ERROR_BACKOFF = 1.0
+MAX_ERROR_BACKOFF = 30.0
+REQUEST_SECONDS = 0.15  # quote request time assumed by the simulation
+
+
+class PollScheduler:
+    def __init__(self, interval_minutes=5, calendar=None, mid_bar_interval=MID_BAR_INTERVAL,
+                 near_boundary_interval=NEAR_BOUNDARY_INTERVAL, near_boundary_window=NEAR_BOUNDARY_WINDOW,
+                 boundary_delay=BOUNDARY_DELAY, max_sleep=MAX_SLEEP):
+        """
+        Quote polling schedule aligned to candle boundaries and market sessions
+
+        A poll is placed boundary_delay after every candle boundary (so the
+        finished candle is closed right away) and after every session open.
+        Between boundaries it polls every mid_bar_interval, switching to
+        near_boundary_interval for the last near_boundary_window seconds of a
+        candle so the closing price is current. Closed hours, weekends and
+        holidays are slept through until the next open.
+
+        Args:
+            interval_minutes: Candle interval in minutes
+            calendar: TradingCalendar (default: trading_calendar.get_calendar())
+            mid_bar_interval: Seconds between polls mid-candle
+            near_boundary_interval: Seconds between polls near a boundary
+            near_boundary_window: Seconds before a boundary that count as near
+            boundary_delay: Seconds after a boundary/open to poll
+            max_sleep: Longest single sleep before the schedule is re-checked
+        """
+        self.interval_minutes = interval_minutes
+        self.calendar = calendar or get_calendar()
+        self.mid_bar_interval = mid_bar_interval
+        self.near_boundary_interval = near_boundary_interval
+        self.near_boundary_window = near_boundary_window
+        self.boundary_delay = boundary_delay
+        self.max_sleep = max_sleep
+
+        self.errors = 0  # consecutive failed polls
+        self.polls = 0
+
+    # --- SCHEDULE ---
+    def next_poll(self, now=None):
+        """
+        When to poll next, and why
+
+        Returns:
+            tuple: (IST datetime, reason) with reason 'boundary', 'open',
+                   'near_boundary' or 'mid_bar'
+        """
+        now = datetime.now(IST) if now is None else now.astimezone(IST)
+        when, reason, boundary = self._next_event(now)
+
+        if self.calendar.is_open(now):
+            remaining = (boundary - now).total_seconds()
+            if remaining <= self.near_boundary_window:
+                candidate, candidate_reason = now + timedelta(seconds=self.near_boundary_interval), 'near_boundary'
+            else:
+                # Never overshoot the start of the fast window
+                step = min(self.mid_bar_interval, remaining - self.near_boundary_window)
+                candidate, candidate_reason = now + timedelta(seconds=step), 'mid_bar'
+            if candidate < when:
+                when, reason = candidate, candidate_reason
+        return when, reason
+
+    def _next_event(self, now):
+        """(poll time, 'boundary' or 'open', next candle boundary) for the next boundary/open poll"""
+        delay = timedelta(seconds=self.boundary_delay)
+        # Measured from now - delay so a poll due just after a boundary is not skipped
+        boundary = self.calendar.next_candle_boundary(now - delay, self.interval_minutes)
+        opening = self.calendar.next_open(now - delay)
+        if boundary <= opening:
+            return boundary + delay, 'boundary', boundary
+        return opening + delay, 'open', boundary
+
+    def next_boundary(self, now=None):
+        """When the next candle boundary (or session open) poll is due, skipping mid-bar polls"""
+        now = datetime.now(IST) if now is None else now.astimezone(IST)
+        when, reason, _ = self._next_event(now)
+        return when, reason
+
+    def delay(self, now=None):
+        """Seconds until the next poll"""
+        now = datetime.now(IST) if now is None else now
+        when, _ = self.next_poll(now)
+        return max(0.0, (when - now).total_seconds())
+
+    # --- ASYNC ---
+    async def wait(self):
+        """
+        Sleep until the next poll is due (through closed hours if need be)
+
+        Long sleeps are split into max_sleep chunks so a suspended machine
+        or a clock change cannot make the loop oversleep a session.
+
+        Returns:
+            str: Reason for the poll (see next_poll)
+        """
+        reason = await self._sleep_until(self.next_poll)
+        self.polls += 1
+        return reason
+
+    async def wait_for_boundary(self):
+        """Sleep until just after the next candle boundary or session open; returns 'boundary' or 'open'"""
+        return await self._sleep_until(self.next_boundary)
+
+    async def _sleep_until(self, schedule):
+        while True:
+            now = datetime.now(IST)
+            when, reason = schedule(now)
+            seconds = (when - now).total_seconds()
+            if seconds <= self.max_sleep:
+                await asyncio.sleep(max(0.0, seconds))
+                return reason
+            await asyncio.sleep(self.max_sleep)
+
+    def succeeded(self):
+        self.errors = 0
+
+    async def wait_after_error(self):
+        """Back off exponentially after a failed poll, but never past the next scheduled poll"""
+        self.errors += 1
+        backoff = min(ERROR_BACKOFF * 2 ** (self.errors - 1), MAX_ERROR_BACKOFF)
+        await asyncio.sleep(min(backoff, max(self.delay(), self.near_boundary_interval)))
+        self.polls += 1
+
+
+# --- SIMULATION ---
+def simulate_day(next_poll, day, interval_minutes=5, calendar=None, request_seconds=None):
+    """
+    Polls made over one day and boundary-to-close latency for a polling policy
+
+    The loop asks for its next poll once a request has completed. A candle
+    is closed by the first poll after its boundary, so its latency is the
+    wait for that poll plus the request time.
+
+    Args:
+        next_poll: Function (now) -> next poll datetime
+        day: Date to simulate (00:00 to 24:00 IST)
+        interval_minutes: Candle interval
+        calendar: TradingCalendar (default: get_calendar())
+        request_seconds: Assumed quote request time
+
+    Returns:
+        dict: 'polls' (count), 'latencies' (seconds, one per candle boundary)
+    """
+    calendar = calendar or get_calendar()
+    request_seconds = REQUEST_SECONDS if request_seconds is None else request_seconds
+    start = datetime.combine(day, time(), IST)
+    end = start + timedelta(days=1)
+    polls = []
+    request = timedelta(seconds=request_seconds)
+    now = start
+    while True:
+        now = next_poll(now + request)
+        if now >= end:
+            break
+        polls.append(now)
+
+    boundaries = []
+    for open_, close in calendar.sessions(day):
+        boundary = calendar.next_candle_boundary(open_, interval_minutes)
+        while boundary <= close:
+            boundaries.append(boundary)
+            boundary = calendar.next_candle_boundary(boundary, interval_minutes)
+
+    latencies = []
+    i = 0
+    for boundary in boundaries:
+        while i < len(polls) and polls[i] < boundary:
+            i += 1
+        if i < len(polls):
+            latencies.append((polls[i] - boundary).total_seconds() + request_seconds)
+    return {'polls': len(polls), 'latencies': latencies}
+
+
+def compare_schedules(day=None, fixed_interval=5.0, interval_minutes=5):
+    """Print requests per day and boundary-to-close latency: fixed sleep vs PollScheduler"""
+    calendar = get_calendar()
+    day = day or calendar.last_session()
+    scheduler = PollScheduler(interval_minutes, calendar)
+    policies = {
+        f'fixed {fixed_interval:g}s': lambda now: now + timedelta(seconds=fixed_interval),
+        'scheduler': lambda now: scheduler.next_poll(now)[0]
+    }
+    print(f"⏱️  Polling on {day} ({interval_minutes}-min candles)")
+    print(f"{'policy':>12} {'polls/day':>10} {'mean ms':>9} {'p95 ms':>8} {'max ms':>8}")
+    for name, policy in policies.items():
+        result = simulate_day(policy, day, interval_minutes, calendar)
+        latencies = sorted(result['latencies'])
+        if not latencies:
+            print(f"{name:>12} {result['polls']:>10} {'-':>9} {'-':>8} {'-':>8}")
+            continue
+        mean = sum(latencies) / len(latencies) * 1000
+        p95 = latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)] * 1000
+        print(f"{name:>12} {result['polls']:>10} {mean:>9.0f} {p95:>8.0f} {latencies[-1] * 1000:>8.0f}")
+
+
+if __name__ == "__main__":
+    compare_schedules()
@@ -1,57 +1,99 @@
 import json
 import requests
 from datetime import datetime
+from upstox_http import get_shared_session
+from logger import get_logger
+
+log = get_logger("telegram_bot")
+
+_default_bot = None
 
 class TelegramBot:
-    def __init__(self, config_path="config.json"):
-        """Initialize Telegram bot with config"""
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
-        self.bot_token = config['telegram']['bot_token']
-        self.chat_id = config['telegram']['chat_id']
+    def __init__(self, config_path="config.json", bot_token=None, chat_id=None, session=None):
+        """
+        Initialize Telegram bot with config
+
+        Args:
+            config_path: Config file with telegram.bot_token / telegram.chat_id
+                         (optional telegram.chat_ids for several chats)
+            bot_token: Use this token instead of reading the config file
+            chat_id: Default chat (overrides the config file)
+            session: requests.Session to send with (default: shared keep-alive pool)
+        """
+        chat_ids = None
+        if bot_token is None:
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+            bot_token = config['telegram']['bot_token']
+            chat_id = chat_id or config['telegram']['chat_id']
+            chat_ids = config['telegram'].get('chat_ids')
+
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.chat_ids = list(chat_ids or [chat_id])
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
-    
+        self.session = session or get_shared_session()
+
+    def post_message(self, chat_id, message, parse_mode='HTML', timeout=10):
+        """
+        Make one sendMessage call without printing or retrying
+
+        Raises requests exceptions on network errors.
+
+        Returns:
+            tuple: (ok, HTTP status, retry_after seconds or None, error description or None)
+        """
+        payload = {
+            'chat_id': chat_id,
+            'text': message
+        }
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+
+        response = self.session.post(f"{self.base_url}/sendMessage", json=payload, timeout=timeout)
+        try:
+            result = response.json()
+        except ValueError:
+            result = {}
+
+        if response.status_code == 200 and result.get('ok'):
+            return True, response.status_code, None, None
+        retry_after = result.get('parameters', {}).get('retry_after')
+        return False, response.status_code, retry_after, result.get('description', f"HTTP {response.status_code}")
+
     def send_message(self, message, parse_mode='HTML'):
         """
         Send message to Telegram chat
-        
+
         Args:
             message: Message text to send
             parse_mode: Message format ('HTML', 'Markdown', or None)
-        
+
         Returns:
             bool: True if message sent successfully
         """
-        url = f"{self.base_url}/sendMessage"
-        
-        payload = {
-            'chat_id': self.chat_id,
-            'text': message,
-            'parse_mode': parse_mode
-        }
-        
         try:
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            if result.get('ok'):
-                return True
-            else:
-                print(f"❌ Telegram API error: {result.get('description', 'Unknown error')}")
-                return False
-                
+            ok, _, _, error = self.post_message(self.chat_id, message, parse_mode)
         except requests.exceptions.RequestException as e:
-            print(f"❌ Failed to send Telegram message: {str(e)}")
+            log.error("❌ Failed to send Telegram message: %s", e)
             return False
-    
+
+        if not ok:
+            log.error("❌ Telegram API error: %s", error)
+        return ok
+
     def test_connection(self):
         """Test Telegram bot connection"""
         test_message = "🧪 Nifty 50 EMA Alert Bot - Connection Test"
         return self.send_message(test_message)
 
+def get_default_bot():
+    """TelegramBot built from config.json once per process"""
+    global _default_bot
+    if _default_bot is None:
+        _default_bot = TelegramBot()
+    return _default_bot
+
 def send_telegram_alert(message):
     """
     Helper function to send Telegram alert
@@ -63,10 +105,9 @@ def send_telegram_alert(message):
         bool: True if alert sent successfully
     """
     try:
-        bot = TelegramBot()
-        return bot.send_message(message)
+        return get_default_bot().send_message(message)
     except Exception as e:
-        print(f"❌ Failed to send alert: {str(e)}")
+        log.error("❌ Failed to send alert: %s", e)
         return False
 
 def format_bullish_alert(candle_data):
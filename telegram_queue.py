@@ -0,0 +1,240 @@
+import asyncio
+import time
+from collections import deque
+
+from logger import get_logger
+from metrics import (TELEGRAM_DELIVERY_SECONDS, TELEGRAM_MESSAGES, TELEGRAM_RATE_LIMITED, TELEGRAM_RETRIES,
+                     TELEGRAM_SEND_SECONDS)
+from pipeline import latency_stats
+from upstox_http import get_shared_executor
+
+log = get_logger("telegram_queue")
+
+GLOBAL_RATE = 30.0  # messages per second across all chats (Telegram bot limit)
+PER_CHAT_INTERVAL = 1.0  # seconds between messages to the same chat
+MAX_ATTEMPTS = 5  # network/5xx failures before a message is dropped
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+LATENCY_SAMPLES = 1000
+
+
+class _Delivery:
+    __slots__ = ('chat_id', 'text', 'parse_mode', 'enqueued_at', 'not_before', 'attempts', 'future')
+
+    def __init__(self, chat_id, text, parse_mode, enqueued_at, future=None):
+        self.chat_id = chat_id
+        self.text = text
+        self.parse_mode = parse_mode
+        self.enqueued_at = enqueued_at
+        self.not_before = 0.0
+        self.attempts = 0
+        self.future = future
+
+
+class TelegramDeliveryQueue:
+    def __init__(self, bot, chat_ids=None, parse_mode='HTML', global_rate=GLOBAL_RATE,
+                 per_chat_interval=PER_CHAT_INTERVAL, max_attempts=MAX_ATTEMPTS, executor=None):
+        """
+        Background Telegram delivery with rate limiting and retries
+
+        enqueue() returns immediately, so the signal path never waits on
+        Telegram. A dispatcher task sends each chat's messages in order, at
+        most one per per_chat_interval, and global_rate messages per second
+        overall. A 429 pauses sending for the retry_after Telegram returns.
+        Network errors and 5xx responses are retried with exponential backoff.
+
+        Args:
+            bot: TelegramBot (its pooled post_message does the HTTP call)
+            chat_ids: Chats every message fans out to (default: bot.chat_ids)
+            parse_mode: Default parse mode ('HTML', 'Markdown' or None)
+            global_rate: Messages per second across all chats
+            per_chat_interval: Minimum seconds between messages to one chat
+            max_attempts: Attempts before a message is dropped (429s don't count)
+            executor: Executor the blocking HTTP calls run on (default: shared pool)
+        """
+        self.bot = bot
+        self.chat_ids = list(chat_ids or getattr(bot, 'chat_ids', [bot.chat_id]))
+        self.parse_mode = parse_mode
+        self.global_interval = 1.0 / global_rate
+        self.per_chat_interval = per_chat_interval
+        self.max_attempts = max_attempts
+        self.executor = executor or get_shared_executor()
+
+        self._pending = {}  # chat_id -> deque of _Delivery (FIFO per chat)
+        self._busy = set()  # chats with a send in flight
+        self._next_chat = {}  # chat_id -> monotonic time the chat may be sent to again
+        self._next_global = 0.0
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+        self._sends = set()
+
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # enqueue -> delivery, seconds
+
+    # --- LIFECYCLE ---
+    def start(self):
+        """Start the dispatcher on the running event loop"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._dispatch())
+
+    async def stop(self, drain=True, timeout=10):
+        """Stop the dispatcher, first waiting up to timeout seconds for queued messages"""
+        if self._task is None:
+            return
+        deadline = time.monotonic() + timeout
+        while drain and (self.pending or self._sends) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # --- SENDING ---
+    def enqueue(self, text, chat_ids=None, parse_mode=None):
+        """
+        Queue a message for delivery and return immediately (fire-and-forget)
+
+        Args:
+            text: Message text
+            chat_ids: Chats to fan out to (default: the queue's chat_ids)
+            parse_mode: Parse mode for this message (default: the queue's)
+
+        Returns:
+            int: Number of deliveries queued
+        """
+        return len(self._enqueue(text, chat_ids, parse_mode, wait=False))
+
+    def enqueue_threadsafe(self, text, chat_ids=None, parse_mode=None):
+        """enqueue() from a thread other than the event loop's"""
+        self._loop.call_soon_threadsafe(self._enqueue, text, chat_ids, parse_mode, False)
+
+    async def send(self, text, chat_ids=None, parse_mode=None):
+        """Queue a message and wait for the outcome; True if every chat received it"""
+        futures = self._enqueue(text, chat_ids, parse_mode, wait=True)
+        return all(await asyncio.gather(*futures))
+
+    def _enqueue(self, text, chat_ids, parse_mode, wait):
+        if self._task is None:
+            raise Exception("TelegramDeliveryQueue is not running; call start() first")
+        parse_mode = parse_mode or self.parse_mode
+
+        now = time.monotonic()
+        futures = []
+        for chat_id in chat_ids or self.chat_ids:
+            future = self._loop.create_future() if wait else None
+            self._pending.setdefault(chat_id, deque()).append(_Delivery(chat_id, text, parse_mode, now, future))
+            futures.append(future)
+        self.enqueued += len(futures)
+        self._wakeup.set()
+        return futures
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            wait = None
+            for chat_id, queue in self._pending.items():
+                if not queue or chat_id in self._busy:
+                    continue
+                ready_at = max(self._next_chat.get(chat_id, 0.0), self._next_global, queue[0].not_before)
+                if ready_at > now:
+                    wait = ready_at - now if wait is None else min(wait, ready_at - now)
+                    continue
+
+                delivery = queue.popleft()
+                self._busy.add(chat_id)
+                self._next_chat[chat_id] = now + self.per_chat_interval
+                self._next_global = now + self.global_interval
+                task = self._loop.create_task(self._send(delivery))
+                self._sends.add(task)
+                task.add_done_callback(self._sends.discard)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send(self, delivery):
+        started = time.monotonic()
+        try:
+            ok, status, retry_after, error = await self._loop.run_in_executor(
+                self.executor, self.bot.post_message, delivery.chat_id, delivery.text, delivery.parse_mode
+            )
+        except Exception as e:
+            ok, status, retry_after, error = False, None, None, str(e)
+
+        now = time.monotonic()
+        TELEGRAM_SEND_SECONDS.observe(now - started)
+        chat_id = delivery.chat_id
+        if ok:
+            self.delivered += 1
+            self.latencies.append(now - delivery.enqueued_at)
+            TELEGRAM_MESSAGES.labels('delivered').inc()
+            TELEGRAM_DELIVERY_SECONDS.observe(now - delivery.enqueued_at)
+            self._resolve(delivery, True)
+        elif status == 429:
+            # Flood control: Telegram says how long to back off; apply it to the whole bot
+            self.rate_limited += 1
+            TELEGRAM_RATE_LIMITED.inc()
+            pause = retry_after if retry_after is not None else self.per_chat_interval
+            self._next_global = max(self._next_global, now + pause)
+            self._next_chat[chat_id] = max(self._next_chat.get(chat_id, 0.0), now + pause)
+            self._pending[chat_id].appendleft(delivery)
+        else:
+            delivery.attempts += 1
+            retryable = status is None or status >= 500
+            if retryable and delivery.attempts < self.max_attempts:
+                self.retries += 1
+                TELEGRAM_RETRIES.inc()
+                delivery.not_before = now + min(BACKOFF_BASE * 2 ** (delivery.attempts - 1), BACKOFF_MAX)
+                self._pending[chat_id].appendleft(delivery)
+            else:
+                self.failed += 1
+                TELEGRAM_MESSAGES.labels('failed').inc()
+                log.error("❌ Telegram delivery failed: %s", error, chat_id=chat_id, attempts=delivery.attempts)
+                self._resolve(delivery, False)
+
+        self._busy.discard(chat_id)
+        self._wakeup.set()
+
+    @staticmethod
+    def _resolve(delivery, result):
+        if delivery.future is not None and not delivery.future.done():
+            delivery.future.set_result(result)
+
+    # --- STATS ---
+    @property
+    def pending(self):
+        return sum(len(queue) for queue in self._pending.values()) + len(self._busy)
+
+    def latency_stats(self):
+        """Enqueue-to-delivery latency over the last LATENCY_SAMPLES deliveries (milliseconds)"""
+        return latency_stats(self.latencies)
+
+    def stats(self):
+        return {
+            'enqueued': self.enqueued,
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'retries': self.retries,
+            'rate_limited': self.rate_limited,
+            'pending': self.pending,
+            'latency': self.latency_stats()
+        }
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import main
+from trading_calendar import IST
+
+
+class FakeResponse:
+    def __init__(self, candles):
+        self.status_code = 200
+        self.text = ''
+        self.candles = candles
+
+    def json(self):
+        return {'status': 'success', 'data': {'candles': self.candles}}
+
+
+def minute_candles(day, start, count):
+    """Upstox-style 1-minute rows for day from start (HH:MM), newest first like the API"""
+    first = datetime.combine(day, datetime.strptime(start, '%H:%M').time(), IST)
+    rows = [[(first + timedelta(minutes=i)).isoformat(), 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 10 + i, 0]
+            for i in range(count)]
+    return rows[::-1]
+
+
+@pytest.fixture
+def endpoints(monkeypatch):
+    """Serve the historical endpoint for the closed session and the intraday one for today"""
+    yesterday, today = datetime(2024, 6, 10).date(), datetime(2024, 6, 11).date()
+    historical = main.upstox_http.historical_candles_path(main.INSTRUMENT_KEY, '1minute', str(yesterday),
+                                                          str(yesterday))
+    intraday = main.upstox_http.intraday_candles_path(main.INSTRUMENT_KEY, '1minute')
+    served = {historical: minute_candles(yesterday, '15:20', 10), intraday: minute_candles(today, '09:15', 45)}
+    requested = []
+
+    def request(method, path, **kwargs):
+        requested.append(path)
+        return FakeResponse(served.get(path, []))
+
+    monkeypatch.setattr(main.upstox_http, 'request', request)
+    return requested, historical, intraday
+
+
+def test_backfill_spans_closed_sessions_and_today(endpoints):
+    requested, historical, intraday = endpoints
+    since = datetime(2024, 6, 10, 15, 25, 30, tzinfo=IST)
+    bars = main.fetch_minute_bars(int(since.timestamp() * 1000), now=datetime(2024, 6, 11, 10, 0, tzinfo=IST))
+
+    assert requested == [historical, intraday]
+    starts = [datetime.fromtimestamp(bar[0] / 1000, IST) for bar in bars]
+    # The minute holding the last tick (15:25) is not folded in again
+    assert starts[0] == datetime(2024, 6, 10, 15, 26, tzinfo=IST)
+    assert starts[4] == datetime(2024, 6, 11, 9, 15, tzinfo=IST)
+    assert starts[-1] == datetime(2024, 6, 11, 9, 59, tzinfo=IST)
+    assert len(bars) == 4 + 45 and starts == sorted(starts)
+
+
+def test_backfill_within_today_uses_only_the_intraday_endpoint(endpoints):
+    requested, historical, intraday = endpoints
+    since = datetime(2024, 6, 11, 9, 40, 5, tzinfo=IST)
+    bars = main.fetch_minute_bars(int(since.timestamp() * 1000), now=datetime(2024, 6, 11, 10, 0, tzinfo=IST))
+
+    assert requested == [intraday]
+    assert [datetime.fromtimestamp(bar[0] / 1000, IST).minute for bar in bars] == list(range(41, 60))
@@ -0,0 +1,219 @@
+import math
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from indicators import (IndicatorSuite, VectorRSI, bollinger_array, check_streaming, rsi_array, sma_array,
+                        supertrend_array, vwap_array)
+from trading_calendar import IST
+
+BARS_PER_DAY = 75  # 5-minute bars, 09:15-15:30 IST
+
+
+def make_bars(days=3, seed=11, volume=True):
+    """Random-walk 5-minute bars over consecutive IST days; the last day has no volume (an index)"""
+    rng = np.random.default_rng(seed)
+    starts = [int(datetime(2024, 1, 1 + day, 9, 15, tzinfo=IST).timestamp()) for day in range(days)]
+    ts = np.array([start + 300 * i for start in starts for i in range(BARS_PER_DAY)], dtype=np.int64)
+    n = len(ts)
+    close = 21000 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    open_ = np.r_[21000.0, close[:-1]]
+    wick = np.abs(rng.normal(0, 0.0005, (2, n))) * close
+    vol = rng.integers(1000, 5000, n).astype(np.float64) if volume else np.zeros(n)
+    vol[-BARS_PER_DAY:] = 0.0
+    return {
+        'ts': ts,
+        'open': open_,
+        'high': np.maximum(open_, close) + wick[0],
+        'low': np.minimum(open_, close) - wick[1],
+        'close': close,
+        'volume': vol
+    }
+
+
+def stream(columns, suite=None):
+    """IndicatorSuite.update() fed one bar at a time, collected into arrays"""
+    suite = suite or IndicatorSuite(ema_periods=())
+    rows = []
+    for t in range(len(columns['ts'])):
+        rows.append(suite.update({name: columns[name][t] for name in ('ts', 'high', 'low', 'close', 'volume')}))
+    return {name: np.array([row[name][0] for row in rows]) for name in rows[0]}
+
+
+def nan_equal(a, b, rtol=1e-9):
+    return np.allclose(a, b, rtol=rtol, atol=0.0, equal_nan=True)
+
+
+# --- PURE PYTHON REFERENCES ---
+def sma_ref(x, period):
+    return [math.nan if i < period - 1 else sum(x[i - period + 1:i + 1]) / period for i in range(len(x))]
+
+
+def bollinger_ref(x, period, width):
+    middle, upper, lower = [], [], []
+    for i in range(len(x)):
+        if i < period - 1:
+            middle.append(math.nan), upper.append(math.nan), lower.append(math.nan)
+            continue
+        window = x[i - period + 1:i + 1]
+        mean = sum(window) / period
+        deviation = math.sqrt(sum((v - mean) ** 2 for v in window) / period)
+        middle.append(mean), upper.append(mean + width * deviation), lower.append(mean - width * deviation)
+    return middle, upper, lower
+
+
+def wilder_ref(x, period):
+    """Mean of the first period values, then Wilder smoothing"""
+    out = [math.nan] * len(x)
+    for i in range(period - 1, len(x)):
+        out[i] = sum(x[:period]) / period if i == period - 1 else (out[i - 1] * (period - 1) + x[i]) / period
+    return out
+
+
+def rsi_ref(close, period):
+    changes = [b - a for a, b in zip(close, close[1:])]
+    gains = wilder_ref([max(c, 0.0) for c in changes], period)
+    losses = wilder_ref([max(-c, 0.0) for c in changes], period)
+    out = [math.nan]
+    for gain, loss in zip(gains, losses):
+        if loss != loss:
+            out.append(math.nan)
+        elif loss == 0:
+            out.append(50.0 if gain == 0 else 100.0)
+        else:
+            out.append(100 - 100 / (1 + gain / loss))
+    return out
+
+
+def atr_ref(high, low, close, period):
+    ranges = [high[0] - low[0]] + [max(h - l, abs(h - c), abs(l - c)) for h, l, c in zip(high[1:], low[1:], close)]
+    return wilder_ref(ranges, period)
+
+
+def vwap_ref(ts, high, low, close, volume):
+    out, day, pv, vol = [], None, 0.0, 0.0
+    for t, h, l, c, v in zip(ts, high, low, close, volume):
+        today = datetime.fromtimestamp(int(t), IST).date()
+        if today != day:
+            day, pv, vol = today, 0.0, 0.0
+        pv += (h + l + c) / 3 * v
+        vol += v
+        out.append(pv / vol if vol > 0 else math.nan)
+    return out
+
+
+# --- ONE INDICATOR AT A TIME ---
+@pytest.fixture(scope='module')
+def bars():
+    return make_bars()
+
+
+@pytest.fixture(scope='module')
+def streamed(bars):
+    return stream(bars)
+
+
+def test_sma(bars, streamed):
+    expected = sma_ref(bars['close'].tolist(), 20)
+    assert nan_equal(streamed['sma'], expected) and nan_equal(sma_array(bars['close'], 20), expected)
+
+
+def test_bollinger(bars, streamed):
+    middle, upper, lower = bollinger_ref(bars['close'].tolist(), 20, 2.0)
+    assert nan_equal(streamed['bb_mid'], middle)
+    assert nan_equal(streamed['bb_upper'], upper)
+    assert nan_equal(streamed['bb_lower'], lower)
+    assert all(nan_equal(got, want) for got, want in zip(bollinger_array(bars['close']), (middle, upper, lower)))
+
+
+def test_rsi(bars, streamed):
+    expected = rsi_ref(bars['close'].tolist(), 14)
+    assert nan_equal(streamed['rsi'], expected) and nan_equal(rsi_array(bars['close']), expected)
+
+
+def test_atr(bars, streamed):
+    expected = atr_ref(bars['high'].tolist(), bars['low'].tolist(), bars['close'].tolist(), 14)
+    assert nan_equal(streamed['atr'], expected)
+
+
+def test_vwap(bars, streamed):
+    expected = vwap_ref(*(bars[name].tolist() for name in ('ts', 'high', 'low', 'close', 'volume')))
+    assert nan_equal(streamed['vwap'], expected)
+    assert nan_equal(vwap_array(bars['ts'], bars['high'], bars['low'], bars['close'], bars['volume']), expected)
+
+
+def test_supertrend(bars, streamed):
+    line, direction = supertrend_array(bars['high'], bars['low'], bars['close'])
+    assert nan_equal(streamed['supertrend'], line) and np.array_equal(streamed['supertrend_dir'], direction)
+
+
+def test_supertrend_flips_with_the_trend():
+    up = np.linspace(100, 200, 40)
+    close = np.r_[up, up[::-1]]
+    line, direction = supertrend_array(close + 1, close - 1, close)
+    assert direction[20] == 1 and direction[-1] == -1
+    assert line[30] < close[30] and line[-1] > close[-1]
+
+
+# --- WARM-UP AND NaN HANDLING ---
+def test_warm_up_lengths(streamed):
+    first_valid = {name: int(np.flatnonzero(~np.isnan(values))[0]) for name, values in streamed.items()
+                   if name != 'supertrend_dir'}
+    assert first_valid == {'sma': 19, 'rsi': 14, 'atr': 13, 'vwap': 0, 'bb_mid': 19, 'bb_upper': 19,
+                           'bb_lower': 19, 'supertrend': 9}
+    assert not streamed['supertrend_dir'][:9].any() and streamed['supertrend_dir'][9] != 0
+
+
+def test_warm_up_matches_updates(bars, streamed):
+    suite = IndicatorSuite(ema_periods=())
+    head = {name: values[:-1] for name, values in bars.items()}
+    suite.warm_up(head)
+    last = suite.update_candle({'start': bars['ts'][-1], 'high': bars['high'][-1], 'low': bars['low'][-1],
+                                'close': bars['close'][-1], 'volume': bars['volume'][-1]})
+    for name, value in last.items():
+        want = streamed[name][-1]
+        assert (value is None) if np.isnan(want) else value == pytest.approx(want, rel=1e-12)
+
+
+def test_vwap_without_volume_is_nan(streamed):
+    assert np.isnan(streamed['vwap'][-BARS_PER_DAY:]).all()
+    assert not np.isnan(streamed['vwap'][:-BARS_PER_DAY]).any()
+
+
+def test_rsi_edge_values():
+    flat = VectorRSI(1, 3)
+    rising = VectorRSI(1, 3)
+    flat_values = [flat.update(100.0)[0] for _ in range(5)]
+    rising_values = [rising.update(100.0 + i)[0] for i in range(5)]
+    assert np.isnan(flat_values[:3]).all() and flat_values[3:] == [50.0, 50.0]
+    assert rising_values[3:] == [100.0, 100.0]
+
+
+def test_nan_bar_does_not_poison_other_slots(bars):
+    suite = IndicatorSuite(2, ema_periods=())
+    for t in range(40):
+        row = {name: np.array([bars[name][t], bars[name][t]]) for name in ('ts', 'high', 'low', 'close', 'volume')}
+        row['close'][1] = math.nan
+        values = suite.update(row)
+    assert not np.isnan(values['sma'][0]) and np.isnan(values['sma'][1])
+    assert values['rsi'][0] == pytest.approx(rsi_ref(bars['close'][:40].tolist(), 14)[-1], rel=1e-9)
+
+
+# --- SEVERAL INSTRUMENTS ---
+def test_interleaved_slots_match_batch(bars):
+    errors = check_streaming(bars, n_slots=3)
+    assert max(errors.values()) <= 1e-9, errors
+
+
+def test_slots_are_independent(bars):
+    suite = IndicatorSuite(2, ema_periods=(5,))
+    alone = stream(bars)
+    for t in range(len(bars['ts'])):
+        row = {name: bars[name][t] for name in ('ts', 'high', 'low', 'close', 'volume')}
+        got = suite.update(row, [0])
+        # Slot 1 sees other prices in between; slot 0 must not notice
+        suite.update(dict(row, close=row['close'] * 2, high=row['high'] * 2, low=row['low'] * 2), [1])
+        for name, values in alone.items():
+            want = values[t]
+            assert (np.isnan(got[name][0]) and np.isnan(want)) or got[name][0] == pytest.approx(want, rel=1e-9)
@@ -0,0 +1,346 @@
+import argparse
+import asyncio
+import glob
+import heapq
+import os
+import re
+import struct
+import time
+from datetime import datetime
+
+from logger import get_logger
+from trading_calendar import IST
+
+log = get_logger("tick_log")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TICK_LOG_DIR = os.environ.get('TICK_LOG_DIR', os.path.join(ROOT, ".tick_log"))
+RECORD_TICKS = os.environ.get('RECORD_TICKS', '1') != '0'  # the monitors record unless RECORD_TICKS=0
+
+# --- FILE FORMAT ---
+# One append-only file per instrument and IST day: <dir>/<YYYY-MM-DD>/<key>.ticks
+#
+#   header  b'TICK' | u8 version | u32 price scale | i64 base ts (ms) | u16 key length | key (utf-8)
+#   record  zigzag varint (ts - previous ts) | zigzag varint (price - previous price) | varint volume
+#
+# Prices are stored as integers (price * scale); the first record's deltas
+# are taken from the base timestamp and a price of 0. A typical tick is 3-5
+# bytes. A record cut short by a crash is dropped when the file is reopened.
+MAGIC = b'TICK'
+VERSION = 1
+PRICE_SCALE = 100  # NSE prices move in 0.05 steps
+_HEADER = struct.Struct('<4sBIqH')
+SUFFIX = ".ticks"
+
+
+def _zigzag(n):
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+def _unzigzag(n):
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+
+def _varint(value, out):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def log_path(directory, instrument_key, day):
+    """Path of the log for an instrument on a day (date or 'YYYY-MM-DD')"""
+    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', instrument_key)
+    return os.path.join(directory, str(day), name + SUFFIX)
+
+
+def read_header(data):
+    """(instrument_key, price_scale, base_ts, records offset) from the start of a log"""
+    magic, version, scale, base_ts, key_length = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a tick log (bad magic)")
+    if version != VERSION:
+        raise ValueError(f"Unsupported tick log version {version}")
+    start = _HEADER.size
+    return data[start:start + key_length].decode('utf-8'), scale, base_ts, start + key_length
+
+
+def _decode(data, pos, ts, price):
+    """Decode records from pos; returns ([(ts, price int, volume)], end of the last complete record)"""
+    records = []
+    end = len(data)
+    good = pos
+    try:
+        while pos < end:
+            fields = []
+            for _ in range(3):
+                result = shift = 0
+                while True:
+                    b = data[pos]
+                    pos += 1
+                    result |= (b & 0x7F) << shift
+                    if b < 0x80:
+                        break
+                    shift += 7
+                fields.append(result)
+            ts += _unzigzag(fields[0])
+            price += _unzigzag(fields[1])
+            records.append((ts, price, fields[2]))
+            good = pos
+    except IndexError:
+        pass  # truncated last record
+    return records, good
+
+
+def read_ticks(path):
+    """
+    Read a tick log
+
+    Returns:
+        tuple: (instrument_key, [(ts_ms, price, volume), ...])
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    instrument_key, scale, base_ts, pos = read_header(data)
+    records, _ = _decode(data, pos, base_ts, 0)
+    return instrument_key, [(ts, price / scale, volume) for ts, price, volume in records]
+
+
+def list_logs(directory=TICK_LOG_DIR, day=None, pattern="*"):
+    """Tick logs under directory, for one day or all days, sorted by day then name"""
+    return sorted(glob.glob(os.path.join(directory, str(day) if day else "*", pattern + SUFFIX)))
+
+
+# --- RECORDING ---
+class TickLogWriter:
+    def __init__(self, path, instrument_key, price_scale=PRICE_SCALE, base_ts=0):
+        """
+        Append-only writer for one instrument/day log
+
+        An existing log is continued: its last timestamp and price are
+        recovered (and a partial trailing record cut off) so the deltas
+        carry on from where the previous process stopped.
+
+        Args:
+            path: Log file
+            instrument_key: Instrument the ticks belong to (stored in the header)
+            price_scale: Price multiplier for new files
+            base_ts: Base timestamp for new files (epoch ms)
+        """
+        self.path = path
+        self.instrument_key = instrument_key
+        self.records = 0
+        self._buffer = bytearray()
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                data = f.read()
+            key, self.scale, self.ts, pos = read_header(data)
+            if key != instrument_key:
+                raise ValueError(f"{path} holds {key}, not {instrument_key}")
+            records, good = _decode(data, pos, self.ts, 0)
+            self.price = 0
+            if records:
+                self.ts, self.price, _ = records[-1]
+            self.records = len(records)
+            self._file = open(path, 'r+b')
+            self._file.truncate(good)
+            self._file.seek(good)
+        else:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self.scale = price_scale
+            self.ts = base_ts
+            self.price = 0
+            key = instrument_key.encode('utf-8')
+            self._file = open(path, 'wb')
+            self._file.write(_HEADER.pack(MAGIC, VERSION, price_scale, base_ts, len(key)) + key)
+
+    def append(self, ts, price, volume=0):
+        """Buffer one tick (timestamp in epoch ms); written on flush() or when the buffer fills"""
+        price = int(round(price * self.scale))
+        buffer = self._buffer
+        _varint(_zigzag(ts - self.ts), buffer)
+        _varint(_zigzag(price - self.price), buffer)
+        _varint(int(volume), buffer)
+        self.ts = ts
+        self.price = price
+        self.records += 1
+        if len(buffer) >= 8192:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class TickRecorder:
+    def __init__(self, directory=TICK_LOG_DIR, price_scale=PRICE_SCALE):
+        """
+        Record every tick into per-instrument, per-day append-only logs
+
+        Writes are buffered; call flush() periodically (the monitors do at
+        every candle boundary) and close() on exit.
+
+        Args:
+            directory: Root directory of the logs
+            price_scale: Price multiplier for new logs (100 keeps 2 decimals)
+        """
+        self.directory = directory
+        self.price_scale = price_scale
+        self._writers = {}  # instrument_key -> (IST day, TickLogWriter)
+
+    def record(self, instrument_key, price, ts, volume=0):
+        """Append one tick (timestamp in epoch milliseconds)"""
+        entry = self._writers.get(instrument_key)
+        day = datetime.fromtimestamp(ts / 1000, IST).date()
+        if entry is None or entry[0] != day:
+            if entry is not None:
+                entry[1].close()
+            writer = TickLogWriter(log_path(self.directory, instrument_key, day), instrument_key,
+                                   self.price_scale, ts)
+            self._writers[instrument_key] = entry = (day, writer)
+        entry[1].append(ts, price, volume)
+
+    def flush(self):
+        for _, writer in self._writers.values():
+            writer.flush()
+
+    def close(self):
+        for _, writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- REPLAY ---
+def merge_logs(paths):
+    """Ticks of several logs merged by timestamp, as (ts_ms, instrument_key, price, volume)"""
+    streams = []
+    for path in paths:
+        instrument_key, ticks = read_ticks(path)
+        streams.append([(ts, instrument_key, price, volume) for ts, price, volume in ticks])
+    return heapq.merge(*streams, key=lambda tick: tick[0])
+
+
+async def replay_ticks(ticks, on_tick, speed=None):
+    """
+    Feed recorded ticks to on_tick, paced by their timestamps
+
+    Args:
+        ticks: Iterable of (ts_ms, instrument_key, price, volume) in time order
+        on_tick: Coroutine function or function (instrument_key, price, ts, volume)
+        speed: 1.0 for real time, 1000.0 for 1000x, None for as fast as possible
+
+    Returns:
+        int: Ticks replayed
+    """
+    is_coroutine = asyncio.iscoroutinefunction(on_tick)
+    started = time.perf_counter()
+    first = None
+    count = 0
+    for ts, instrument_key, price, volume in ticks:
+        if speed:
+            if first is None:
+                first = ts
+            delay = started + (ts - first) / 1000 / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if is_coroutine:
+            await on_tick(instrument_key, price, ts, volume)
+        else:
+            on_tick(instrument_key, price, ts, volume)
+        count += 1
+        if not speed and count % 1000 == 0:
+            await asyncio.sleep(0)
+    return count
+
+
+class AlertSink:
+    """Stands in for TelegramDeliveryQueue during a replay: keeps the alerts instead of sending them"""
+
+    def __init__(self):
+        self.messages = []
+
+    def enqueue(self, text, chat_ids=None, parse_mode=None):
+        self.messages.append(text)
+        return 1
+
+
+async def replay_log(path, speed=None, interval_minutes=5):
+    """
+    Run one recorded instrument/day through the live monitor pipeline
+
+    Ticks go through main's pipeline (RealTimeCandleGenerator, EMAs,
+    indicators, alert rules), with the alerts collected instead of sent.
+
+    Args:
+        path: Tick log
+        speed: 1.0 real time, 1000.0 for 1000x, None as fast as possible
+        interval_minutes: Candle interval
+
+    Returns:
+        dict: path, instrument, ticks, candles, alerts (messages), seconds
+    """
+    from indicators import EMABank, IndicatorSuite
+    from main import ALERT_RULES, EMA_PERIODS, RealTimeCandleGenerator, build_nifty_pipeline, tick_item
+
+    instrument_key, ticks = read_ticks(path)
+    candle_generator = RealTimeCandleGenerator(interval_minutes, indicators=IndicatorSuite(ema_periods=()))
+    alerts = AlertSink()
+    pipeline = build_nifty_pipeline(candle_generator, EMABank(EMA_PERIODS), ALERT_RULES.stream(), alerts)
+
+    async def on_tick(_, price, ts, volume):
+        await pipeline.put(tick_item(price, ts, volume))
+
+    started = time.perf_counter()
+    pipeline.start()
+    count = await replay_ticks(((ts, instrument_key, price, volume) for ts, price, volume in ticks), on_tick, speed)
+    if ticks:
+        # Close the last candle as the boundary timer would have
+        await pipeline.put(('flush', ticks[-1][0] + candle_generator.interval_ms))
+    await pipeline.stop(timeout=3600)
+    return {
+        'path': path,
+        'instrument': instrument_key,
+        'ticks': count,
+        'candles': pipeline.stages[1].processed,
+        'alerts': alerts.messages,
+        'seconds': time.perf_counter() - started
+    }
+
+
+async def replay_logs(paths, speed=None, interval_minutes=5):
+    """Replay several logs at once (e.g. many days for a load test), each through its own pipeline"""
+    return await asyncio.gather(*(replay_log(path, speed, interval_minutes) for path in paths))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded tick logs through the monitor pipeline")
+    parser.add_argument('paths', nargs='*', help=f"Tick logs (default: every log under {TICK_LOG_DIR})")
+    parser.add_argument('--day', help="Only logs of this day (YYYY-MM-DD)")
+    parser.add_argument('--speed', type=float, default=None,
+                        help="1 for real time, 1000 for 1000x (default: as fast as possible)")
+    args = parser.parse_args()
+
+    paths = args.paths or list_logs(day=args.day)
+    if not paths:
+        parser.error(f"no tick logs found under {TICK_LOG_DIR}")
+    started = time.perf_counter()
+    results = asyncio.run(replay_logs(paths, args.speed))
+    elapsed = time.perf_counter() - started
+    total = sum(result['ticks'] for result in results)
+    for result in results:
+        print(f"📼 {result['path']}: {result['ticks']} ticks, {result['candles']} candles, "
+              f"{len(result['alerts'])} alerts in {result['seconds']:.2f}s")
+    print(f"⏱️  {len(results)} log(s), {total} ticks in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} ticks/s)")
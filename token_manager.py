@@ -0,0 +1,267 @@
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from logger import get_logger
+from metrics import TOKEN_INVALIDATIONS, TOKEN_REFRESHES
+
+log = get_logger("token_manager")
+
+REFRESH_MARGIN = 15 * 60  # refresh this long before the token expires
+MIN_VALIDITY = 60  # tokens closer than this to expiry are treated as expired
+RETRY_DELAY = 60  # wait between failed refresh attempts
+UNKNOWN_EXPIRY_RECHECK = 60 * 60  # how often to re-read the token file if exp is unknown
+
+_manager = None
+_lock = threading.Lock()
+
+
+def decode_jwt_exp(token):
+    """
+    Read the 'exp' claim of a JWT locally (the signature is not verified)
+
+    Returns:
+        int: Expiry as epoch seconds, or None if the token has no readable exp
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except Exception:
+        return None
+
+
+def _default_refresher():
+    from auth import UpstoxAuth
+    return UpstoxAuth().refresh_access_token()
+
+
+class TokenManager:
+    def __init__(self, token_file=None, refresher=None, refresh_margin=REFRESH_MARGIN):
+        """
+        In-memory + on-disk access token cache with local expiry checks
+
+        get_token() answers from memory while the token's exp claim is more
+        than refresh_margin away, so the data path never makes a network call
+        for auth. Inside the margin the current token is still returned and a
+        refresh runs in the background; only an expired token makes callers
+        wait. Concurrent callers share one in-flight refresh.
+
+        Args:
+            token_file: JSON file holding 'access_token' (default: auth.TOKEN_FILE);
+                        re-read when another process rewrites it
+            refresher: Callable returning a new access token
+                       (default: UpstoxAuth().refresh_access_token)
+            refresh_margin: Seconds before expiry to start refreshing
+        """
+        if token_file is None:
+            from auth import TOKEN_FILE
+            token_file = TOKEN_FILE
+        self.token_file = token_file
+        self.refresher = refresher or _default_refresher
+        self.refresh_margin = refresh_margin
+        self.refreshes = 0
+
+        self._token = None
+        self._expires_at = None
+        self._file_mtime = None
+        self._lock = threading.Lock()
+        self._inflight = None
+        self._failed_at = 0.0
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- STATE ---
+    @property
+    def expires_at(self):
+        return self._expires_at
+
+    def seconds_left(self, now=None):
+        """Seconds until the current token expires (None if unknown)"""
+        if self._expires_at is None:
+            return None
+        return self._expires_at - (now or time.time())
+
+    def _is_valid(self, margin, now):
+        if self._token is None:
+            return False
+        return self._expires_at is None or self._expires_at - now > margin
+
+    def _set_token(self, token):
+        changed = token != self._token
+        self._token = token
+        self._expires_at = decode_jwt_exp(token) if token else None
+        return changed
+
+    def _load_file(self):
+        """Pick up a token written by another process (e.g. a fresh auth.py login)"""
+        try:
+            mtime = os.path.getmtime(self.token_file)
+        except OSError:
+            return
+        if mtime == self._file_mtime:
+            return
+        try:
+            with open(self.token_file, 'r') as f:
+                token = json.load(f).get('access_token')
+        except (OSError, ValueError):
+            return
+        self._file_mtime = mtime
+        if token and self._set_token(token):
+            self._notify(token)
+
+    def add_listener(self, callback):
+        """Call callback(token) whenever the access token changes (e.g. http.set_access_token)"""
+        self._listeners.append(callback)
+
+    def _notify(self, token):
+        for callback in list(self._listeners):
+            try:
+                callback(token)
+            except Exception as e:
+                log.warning("⚠️ Token listener failed: %s", e)
+
+    def invalidate(self, token=None):
+        """Mark a token the API rejected (401) as expired so the next call refreshes it"""
+        TOKEN_INVALIDATIONS.inc()
+        with self._lock:
+            if token is None or token == self._token:
+                self._expires_at = 0
+
+    # --- ACCESS ---
+    def get_token(self, wait=True):
+        """
+        Current access token
+
+        Args:
+            wait: Block on a refresh if the token has already expired
+
+        Returns:
+            str: Access token, or None if none is valid and refreshing failed
+        """
+        now = time.time()
+        if self._is_valid(self.refresh_margin, now):
+            return self._token
+
+        with self._lock:
+            self._load_file()
+        if self._is_valid(self.refresh_margin, now):
+            return self._token
+
+        if self._is_valid(MIN_VALIDITY, now):
+            # Still usable: refresh ahead of expiry without making the caller wait
+            self.refresh()
+            return self._token
+
+        future = self.refresh()
+        if wait:
+            try:
+                future.result()
+            except Exception:
+                pass
+        return self._token if self._is_valid(0, time.time()) else None
+
+    async def get_token_async(self):
+        """Async variant of get_token; only an expired token awaits the refresh"""
+        if self._is_valid(self.refresh_margin, time.time()):
+            return self._token
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_token)
+
+    # --- REFRESH ---
+    def refresh(self):
+        """
+        Start a refresh unless one is already running
+
+        Returns:
+            concurrent.futures.Future: Resolves to the new token; every caller
+            during a refresh gets the same Future
+        """
+        with self._lock:
+            if self._inflight is not None:
+                return self._inflight
+            future = Future()
+            if time.time() - self._failed_at < RETRY_DELAY:
+                future.set_exception(Exception("Token refresh failed recently, not retrying yet"))
+                return future
+            self._inflight = future
+
+        threading.Thread(target=self._run_refresh, args=(future,), name="token-refresh", daemon=True).start()
+        return future
+
+    def _run_refresh(self, future):
+        try:
+            token = self.refresher()
+            if not token:
+                raise Exception("No access token returned")
+            with self._lock:
+                changed = self._set_token(token)
+                # The refresher rewrote the token file; don't re-read our own write
+                self._file_mtime = self._mtime()
+                self.refreshes += 1
+                self._inflight = None
+            if changed:
+                self._notify(token)
+            if not self._is_valid(MIN_VALIDITY, time.time()):
+                # e.g. no refresh token on file, so the old token came back
+                raise Exception("Refreshed access token is already expired. Run: python auth.py")
+            TOKEN_REFRESHES.labels('success').inc()
+            future.set_result(token)
+        except Exception as e:
+            TOKEN_REFRESHES.labels('failure').inc()
+            log.error("❌ Token refresh failed: %s", e)
+            with self._lock:
+                self._failed_at = time.time()
+                self._inflight = None
+            future.set_exception(e)
+
+    def _mtime(self):
+        try:
+            return os.path.getmtime(self.token_file)
+        except OSError:
+            return None
+
+    # --- BACKGROUND ---
+    def start(self):
+        """Refresh ahead of expiry on a daemon thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._background, name="token-manager", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _background(self):
+        while not self._stop.is_set():
+            with self._lock:
+                self._load_file()
+            left = self.seconds_left()
+            if self._token is not None and left is None:
+                delay = UNKNOWN_EXPIRY_RECHECK
+            elif self._token is not None and left > self.refresh_margin:
+                delay = min(left - self.refresh_margin, UNKNOWN_EXPIRY_RECHECK)
+            else:
+                try:
+                    self.refresh().result()
+                    delay = 0
+                except Exception:
+                    delay = RETRY_DELAY
+            self._stop.wait(delay)
+
+
+def get_token_manager():
+    """Process-wide TokenManager shared by every client"""
+    global _manager
+    if _manager is None:
+        with _lock:
+            if _manager is None:
+                _manager = TokenManager()
+    return _manager
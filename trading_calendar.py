@@ -0,0 +1,201 @@
+import json
+import os
+from datetime import date, datetime, time, timedelta, timezone
+
+from logger import get_logger
+
+log = get_logger("trading_calendar")
+
+IST = timezone(timedelta(hours=5, minutes=30))
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Holidays and special sessions as published by NSE; TRADING_CALENDAR may point at another file
+CALENDAR_PATH = os.path.join(ROOT, "nse_calendar.json")
+
+REGULAR_SESSION = (("09:15", "15:30"),)
+CANDLE_ANCHOR_SECONDS = (9 * 60 + 15) * 60  # candles are aligned to 09:15 IST, like resampler.py
+MAX_SEARCH_DAYS = 30  # no gap between sessions is longer than this
+
+
+def _day(value):
+    if isinstance(value, datetime):
+        return value.astimezone(IST).date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def _seconds(text):
+    hours, minutes = text.split(':')
+    return int(hours) * 3600 + int(minutes) * 60
+
+
+def _segments(session):
+    """(("09:15", "15:30"), ...) -> ((open, close) in seconds after midnight, ...), sorted"""
+    return tuple(sorted((_seconds(start), _seconds(end)) for start, end in session))
+
+
+class TradingCalendar:
+    def __init__(self, holidays=(), special_sessions=None, session=REGULAR_SESSION):
+        """
+        Exchange trading days and session times (IST)
+
+        A day trades the regular session unless it is a weekend or a holiday;
+        special sessions (muhurat trading, Saturday/Sunday budget sessions,
+        split DR-drill sessions) replace whatever the day would otherwise have.
+        Everything is answered from memory, without API calls.
+
+        Args:
+            holidays: Dates ('YYYY-MM-DD' or date), or {date: description}
+            special_sessions: {date: [[open, close], ...]} with 'HH:MM' times
+            session: Regular session segments, [[open, close], ...]
+        """
+        self.holidays = {_day(day) for day in holidays}
+        self.special_sessions = {_day(day): _segments(s) for day, s in (special_sessions or {}).items()}
+        self.regular = _segments(session)
+        self.years = {day.year for day in self.holidays}
+        self._warned = set()
+
+    # --- DAYS ---
+    def segments(self, day):
+        """Session segments of day as ((open, close) seconds after midnight, ...); empty if closed"""
+        day = _day(day)
+        special = self.special_sessions.get(day)
+        if special is not None:
+            return special
+        if day.weekday() >= 5:
+            return ()
+        if self.years and day.year not in self.years and day.year not in self._warned:
+            self._warned.add(day.year)
+            log.warning("⚠️ No exchange holidays listed for %d; treating every weekday as a trading day", day.year)
+        return () if day in self.holidays else self.regular
+
+    def is_trading_day(self, day):
+        return bool(self.segments(day))
+
+    def sessions(self, day):
+        """Session segments of day as (open, close) IST datetimes"""
+        day = _day(day)
+        midnight = datetime.combine(day, time(), IST)
+        return [(midnight + timedelta(seconds=start), midnight + timedelta(seconds=end))
+                for start, end in self.segments(day)]
+
+    def previous_trading_day(self, day):
+        """The last trading day before day"""
+        return self._step(_day(day), -1)
+
+    def next_trading_day(self, day):
+        """The first trading day after day"""
+        return self._step(_day(day), 1)
+
+    def _step(self, day, direction):
+        for _ in range(MAX_SEARCH_DAYS):
+            day += timedelta(days=direction)
+            if self.segments(day):
+                return day
+        raise Exception(f"No trading day within {MAX_SEARCH_DAYS} days of {day}")
+
+    def trading_days(self, start, end):
+        """Trading days from start to end, both inclusive"""
+        start, end = _day(start), _day(end)
+        return [start + timedelta(days=i) for i in range((end - start).days + 1)
+                if self.segments(start + timedelta(days=i))]
+
+    # --- SESSIONS ---
+    def _now(self, now):
+        return datetime.now(IST) if now is None else now.astimezone(IST)
+
+    def is_open(self, now=None):
+        """True while a session segment is in progress"""
+        now = self._now(now)
+        second = now.hour * 3600 + now.minute * 60 + now.second
+        return any(start <= second < end for start, end in self.segments(now.date()))
+
+    def last_session(self, now=None):
+        """Date of the most recent session that has opened by now (today once it has opened)"""
+        return self.recent_sessions(1, now)[0]
+
+    def recent_sessions(self, count, now=None):
+        """The count most recent sessions that have opened by now, newest first"""
+        now = self._now(now)
+        today = now.date()
+        second = now.hour * 3600 + now.minute * 60 + now.second
+        segments = self.segments(today)
+        day = today if segments and second >= segments[0][0] else self.previous_trading_day(today)
+        days = [day]
+        while len(days) < count:
+            days.append(self.previous_trading_day(days[-1]))
+        return days
+
+    def next_open(self, now=None):
+        """Start of the next session segment after now (IST datetime)"""
+        now = self._now(now)
+        day = now.date()
+        for _ in range(MAX_SEARCH_DAYS):
+            for start, _ in self.sessions(day):
+                if start > now:
+                    return start
+            day += timedelta(days=1)
+        raise Exception(f"No session within {MAX_SEARCH_DAYS} days of {now}")
+
+    def next_candle_boundary(self, now=None, interval_minutes=5):
+        """
+        End of the candle in progress, or of the next session's first candle
+
+        Boundaries are aligned to 09:15 IST (like resampler.py) and the last
+        candle of a segment ends at its close.
+
+        Args:
+            now: Current time (default: now)
+            interval_minutes: Candle length
+
+        Returns:
+            datetime: Next boundary strictly after now (IST)
+        """
+        now = self._now(now)
+        size = interval_minutes * 60
+        day = now.date()
+        second = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+        for _ in range(MAX_SEARCH_DAYS):
+            for start, end in self.segments(day):
+                if second >= end:
+                    continue
+                position = max(second, start)
+                boundary = CANDLE_ANCHOR_SECONDS + ((int(position) - CANDLE_ANCHOR_SECONDS) // size + 1) * size
+                return datetime.combine(day, time(), IST) + timedelta(seconds=min(boundary, end))
+            day += timedelta(days=1)
+            second = -1
+        raise Exception(f"No session within {MAX_SEARCH_DAYS} days of {now}")
+
+
+# --- LOADING ---
+def load_calendar(path=None):
+    """
+    Calendar from a JSON file with "holidays" ({date: name} or [dates]),
+    optional "special_sessions" ({date: [[open, close], ...]}) and "session"
+    """
+    path = path or os.environ.get('TRADING_CALENDAR') or CALENDAR_PATH
+    with open(path) as f:
+        data = json.load(f)
+    return TradingCalendar(data.get('holidays', ()), data.get('special_sessions'),
+                           data.get('session', REGULAR_SESSION))
+
+
+_calendar = None
+
+
+def get_calendar():
+    """Process-wide calendar loaded from CALENDAR_PATH (or $TRADING_CALENDAR)"""
+    global _calendar
+    if _calendar is None:
+        _calendar = load_calendar()
+    return _calendar
+
+
+if __name__ == "__main__":
+    calendar = get_calendar()
+    now = datetime.now(IST)
+    print(f"🕐 {now.strftime('%Y-%m-%d %H:%M:%S')} IST")
+    print(f"📈 Market open: {calendar.is_open(now)}")
+    print(f"📅 Last session: {calendar.last_session(now)}")
+    print(f"⏭️  Next open: {calendar.next_open(now).strftime('%Y-%m-%d %H:%M')}")
+    print(f"🕯️  Next 5-min boundary: {calendar.next_candle_boundary(now).strftime('%Y-%m-%d %H:%M')}")
@@ -1,16 +1,35 @@
+import os
 import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from auth import get_access_token
+from token_manager import get_token_manager
+from upstox_http import UpstoxHTTPClient
+from candle_cache import CandleCache
+from resampler import resample_columns, resample_dataframe
+from rules import RuleSet, load_rules
+from instruments import LOCAL_MASTER, resolve_instrument
+from logger import get_logger
+
+log = get_logger("upstox_client")
+
+NIFTY_50 = "Nifty 50"  # resolved to an instrument key through the instrument master
+# The bundled master covers the indices, so the Nifty lookup downloads nothing
+# unless INSTRUMENT_MASTER points at another file or URL
+INSTRUMENT_MASTER = os.environ.get('INSTRUMENT_MASTER', LOCAL_MASTER)
 
 class UpstoxClient:
+    _alert_rules = None  # RuleSet from config.json, compiled on first use
+
     def __init__(self):
         """Initialize Upstox client with authentication"""
         self.base_url = "https://api.upstox.com/v2"
         self.access_token = None
         self.headers = None
+        self.http = None
         self._authenticate()
+        get_token_manager().start()
     
     def _authenticate(self):
         """Get access token and set up headers"""
@@ -22,26 +41,22 @@ class UpstoxClient:
             'accept': 'application/json',
             'Authorization': f'Bearer {self.access_token}'
         }
+        
+        # All requests share one pooled keep-alive session
+        if self.http is None:
+            self.http = UpstoxHTTPClient(self.access_token)
+            self.cache = CandleCache(self.http)
+        else:
+            self.http.set_access_token(self.access_token)
     
     def _refresh_token_if_needed(self):
-        """Refresh token if current one is expired"""
-        try:
-            # Test current token with a simple API call
-            response = requests.get(
-                f"{self.base_url}/user/profile", 
-                headers=self.headers
-            )
-            
-            if response.status_code == 401:  # Unauthorized - token expired
-                print("🔄 Access token expired, refreshing...")
-                self._authenticate()
-            elif response.status_code != 200:
-                print(f"⚠️ API response: {response.status_code} - {response.text}")
-                self._authenticate()
-                
-        except Exception as e:
-            print(f"⚠️ Token validation failed: {str(e)}")
-            # Don't re-authenticate immediately, let the calling function handle the error
+        """Switch to a newer token if the token manager has one (checked locally, no API call)"""
+        access_token = get_token_manager().get_token()
+        if access_token and access_token != self.access_token:
+            log.info("🔄 Using refreshed access token")
+            self.access_token = access_token
+            self.headers['Authorization'] = f'Bearer {access_token}'
+            self.http.set_access_token(access_token)
     
     def get_historical_data(self, instrument_key, interval="1minute", days_back=10):
         """
@@ -58,20 +73,17 @@ class UpstoxClient:
         to_date = datetime.now()
         from_date = to_date - timedelta(days=days_back)
         
-        # Properly encode the instrument key for URL
-        import urllib.parse
-        encoded_instrument = urllib.parse.quote(instrument_key, safe='')
-        
-        url = f"{self.base_url}/historical-candle/{encoded_instrument}/{interval}/{to_date.strftime('%Y-%m-%d')}/{from_date.strftime('%Y-%m-%d')}"
+        url = self._historical_url(instrument_key, interval, to_date, from_date)
         
         try:
-            print(f"🔗 Fetching data from: {url}")
-            response = requests.get(url, headers=self.headers)
-            
-            # Print response for debugging
-            print(f"📊 Response status: {response.status_code}")
+            log.debug("🔗 Fetching data from: %s", url)
+            response = self.http.request("GET", url)
+            log.debug("📊 Response status: %s", response.status_code)
+            if response.status_code == 401:
+                # Rejected before its exp claim (revoked/re-login elsewhere); refresh next call
+                get_token_manager().invalidate(self.access_token)
             if response.status_code != 200:
-                print(f"❌ Response text: {response.text}")
+                log.error("❌ Response text: %s", response.text, status=response.status_code)
             
             response.raise_for_status()
             
@@ -80,23 +92,31 @@ class UpstoxClient:
             if data['status'] != 'success':
                 raise Exception(f"API Error: {data.get('message', 'Unknown error')}")
             
-            # Convert to DataFrame
-            candles = data['data']['candles']
-            if not candles:
-                raise Exception("No candle data received")
-                
-            df = pd.DataFrame(candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'oi'])
-            
-            # Convert timestamp to datetime
-            df['datetime'] = pd.to_datetime(df['timestamp'])
-            df = df.sort_values('datetime').reset_index(drop=True)
-            
-            print(f"✅ Retrieved {len(df)} candles")
+            df = self._candles_to_dataframe(data['data']['candles'])
+            log.debug("✅ Retrieved %d candles", len(df))
             return df
             
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to fetch historical data: {str(e)}")
     
+    def _historical_url(self, instrument_key, interval, to_date, from_date):
+        """Build the historical candle URL (the instrument key is URL-encoded)"""
+        return self.http.historical_candles_path(
+            instrument_key, interval, to_date.strftime('%Y-%m-%d'), from_date.strftime('%Y-%m-%d')
+        )
+    
+    def _candles_to_dataframe(self, candles):
+        """Convert raw API candles to a DataFrame sorted by time"""
+        if not candles:
+            raise Exception("No candle data received")
+            
+        df = pd.DataFrame(candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'oi'])
+        
+        # Convert timestamp to datetime
+        df['datetime'] = pd.to_datetime(df['timestamp'])
+        df = df.sort_values('datetime').reset_index(drop=True)
+        return df
+    
     def calculate_ema(self, prices, period=5):
         """
         Calculate Exponential Moving Average
@@ -118,26 +138,35 @@ class UpstoxClient:
         Returns:
             DataFrame: 5-minute candle data
         """
-        df_copy = df.copy()
-        df_copy.set_index('datetime', inplace=True)
-        
-        # Resample to 5-minute intervals
-        resampled = df_copy.resample('5T').agg({
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum'
-        }).dropna()
-        
-        # Reset index to get datetime as column
-        resampled.reset_index(inplace=True)
+        resampled = resample_dataframe(df, 5, fields=('open', 'high', 'low', 'close', 'volume'))
         
         # Add timestamp column
         resampled['timestamp'] = resampled['datetime']
         
         return resampled
     
+    def resolve_instrument(self, query, segment=None, source=None):
+        """
+        Instrument key for a trading symbol, name, ISIN or key (see instruments.py)
+        
+        Looked up in the local instrument master index, so no API call is made.
+        source is the master to index (default: the broker's full master,
+        downloaded once a day).
+        """
+        return resolve_instrument(query, segment, source=source)
+    
+    def get_5min_bars(self, instrument_key, days_back=3):
+        """
+        5-minute bars from the candle cache as plain rows (see alert_state.AlertStateStore.evaluate)
+        
+        Returns:
+            list: (ts, open, high, low, close) tuples, oldest first; ts is the
+                  bar start in epoch seconds and the last bar may still be forming
+        """
+        self._refresh_token_if_needed()
+        columns = resample_columns(self.cache.get_columns(instrument_key, "1minute", days_back), 5)
+        return list(zip(*(columns[name].tolist() for name in ('ts', 'open', 'high', 'low', 'close'))))
+    
     def get_nifty50_with_ema(self, ema_period=5):
         """
         Get Nifty 50 latest candle data with EMA
@@ -149,32 +178,16 @@ class UpstoxClient:
             dict: Latest candle data with EMA value
         """
         try:
-            # Try different Nifty 50 instrument keys
-            possible_instruments = [
-                "NSE_INDEX|Nifty 50",
-                "NSE_INDEX|NIFTY 50",
-                "NSE_INDEX|Nifty50",
-                "NSE_INDEX|NIFTY50"
-            ]
-            
-            df = None
-            used_instrument = None
-            
-            for instrument in possible_instruments:
-                try:
-                    print(f"🔍 Trying instrument: {instrument}")
-                    # Get 1-minute data and convert to 5-minute
-                    df_1min = self.get_historical_data(instrument, interval="1minute", days_back=3)
-                    df = self.resample_to_5min(df_1min)
-                    used_instrument = instrument
-                    print(f"✅ Successfully fetched data using: {instrument}")
-                    break
-                except Exception as e:
-                    print(f"❌ Failed with {instrument}: {str(e)}")
-                    continue
+            # The key comes from the local instrument master index, not from trial downloads.
+            # Closed days come from the local candle cache; only today's
+            # candles are requested, and only once a new candle can exist
+            instrument = self.resolve_instrument(NIFTY_50, segment="NSE_INDEX", source=INSTRUMENT_MASTER)
+            self._refresh_token_if_needed()
+            df_1min = self.cache.get_dataframe(instrument, interval="1minute", days_back=3)
+            df = self.resample_to_5min(df_1min)
             
             if df is None or df.empty:
-                raise Exception("No data received for any Nifty 50 instrument variant")
+                raise Exception(f"No data received for {instrument}")
             
             # Calculate EMA
             df['ema'] = self.calculate_ema(df['close'], ema_period)
@@ -192,7 +205,7 @@ class UpstoxClient:
                 'volume': int(latest['volume']) if pd.notna(latest['volume']) else 0,
                 'ema': float(latest['ema']),
                 'ema_period': ema_period,
-                'instrument': used_instrument
+                'instrument': instrument
             }
             
             return result
@@ -200,10 +213,27 @@ class UpstoxClient:
         except Exception as e:
             raise Exception(f"Failed to get Nifty 50 data with EMA: {str(e)}")
     
+    def check_rule(self, rule, candle_data):
+        """
+        Check one of the configured alert rules (see rules.py) on a candle
+
+        Args:
+            rule: Rule name from config.json "rules", e.g. 'bullish'
+            candle_data: Dict from get_nifty50_with_ema; the rule may only use
+                         the candle fields and ema(candle_data['ema_period'])
+
+        Returns:
+            bool: True if the rule holds
+        """
+        if UpstoxClient._alert_rules is None:
+            UpstoxClient._alert_rules = RuleSet(load_rules())
+        predicate = self._alert_rules.predicates(candle_data['ema_period'], names=(rule,))[rule]
+        return predicate(candle_data, candle_data['ema'])
+
     def is_bullish_signal(self, candle_data):
         """
         Check if current candle shows bullish signal
-        (Candle is fully above EMA - both low and high are above EMA)
+        (the 'bullish' rule, by default: candle fully above EMA)
         
         Args:
             candle_data: Dict containing candle data with EMA
@@ -211,12 +241,12 @@ class UpstoxClient:
         Returns:
             bool: True if bullish signal detected
         """
-        return candle_data['low'] > candle_data['ema']
+        return self.check_rule('bullish', candle_data)
     
     def is_bearish_signal(self, candle_data):
         """
         Check if current candle shows bearish signal
-        (Candle is fully below EMA - both high and low are below EMA)
+        (the 'bearish' rule, by default: candle fully below EMA)
         
         Args:
             candle_data: Dict containing candle data with EMA
@@ -224,7 +254,7 @@ class UpstoxClient:
         Returns:
             bool: True if bearish signal detected
         """
-        return candle_data['high'] < candle_data['ema']
+        return self.check_rule('bearish', candle_data)
     
     def get_signal_type(self, candle_data):
         """
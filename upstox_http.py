@@ -0,0 +1,199 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import UPSTOX_ERRORS, UPSTOX_REQUEST_SECONDS, UPSTOX_REQUESTS, upstox_endpoint
+
+API_HOST = "https://api.upstox.com"
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+POOL_SIZE = 32
+
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_shared_session():
+    """Process-wide requests.Session with a keep-alive connection pool"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get_shared_executor():
+    """Thread pool used to run pooled requests without blocking the event loop"""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="upstox-http")
+    return _executor
+
+
+class UpstoxHTTPClient:
+    def __init__(self, access_token, timeout=DEFAULT_TIMEOUT, session=None, executor=None):
+        """
+        Upstox API client sharing one pooled session between sync and async callers
+
+        Synchronous methods (request, get_json) reuse keep-alive connections
+        from the shared pool. The async methods run the same calls on a thread
+        pool so coroutines never block the event loop, and gather_json fans
+        out many requests concurrently.
+
+        Args:
+            access_token: Upstox access token
+            timeout: Default per-request timeout, seconds or (connect, read)
+            session: requests.Session to use (default: shared session)
+            executor: Executor for async calls (default: shared thread pool)
+        """
+        self.timeout = timeout
+        self.session = session or get_shared_session()
+        self.executor = executor or get_shared_executor()
+        self.set_access_token(access_token)
+
+    def set_access_token(self, access_token):
+        """Switch to a new access token for subsequent requests"""
+        self.access_token = access_token
+        self.headers = {
+            'accept': 'application/json',
+            'Authorization': f'Bearer {access_token}'
+        }
+
+    @staticmethod
+    def _url(path):
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{API_HOST}/{path.lstrip('/')}"
+
+    # --- SYNCHRONOUS ---
+    def request(self, method, path, params=None, timeout=None, **kwargs):
+        """
+        Send a request over the pooled session
+
+        Args:
+            method: HTTP method
+            path: Full URL or path relative to the API host (e.g. "/v2/user/profile")
+            params: Query parameters
+            timeout: Per-request timeout (default: client timeout)
+
+        Returns:
+            requests.Response
+        """
+        url = self._url(path)
+        endpoint = upstox_endpoint(url)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, url, params=params, headers=self.headers,
+                timeout=timeout or self.timeout, **kwargs
+            )
+        except Exception:
+            UPSTOX_ERRORS.labels(endpoint).inc()
+            raise
+        finally:
+            UPSTOX_REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - started)
+        UPSTOX_REQUESTS.labels(endpoint, response.status_code).inc()
+        return response
+
+    def get_json(self, path, params=None, timeout=None):
+        """GET a JSON endpoint and return its payload, raising on API errors"""
+        response = self.request("GET", path, params=params, timeout=timeout)
+        if response.status_code != 200:
+            raise Exception(f"API Error {response.status_code}: {response.text}")
+        data = response.json()
+        if data.get('status') != 'success':
+            raise Exception(f"API Error: {data.get('message', data.get('errors', 'Unknown error'))}")
+        return data
+
+    def get_json_many(self, paths):
+        """
+        Fetch several JSON endpoints concurrently from synchronous code
+
+        Args:
+            paths: List of paths, or (path, params) tuples
+
+        Returns:
+            list: Payloads in request order; failed requests are returned as
+                  the exception instead of raising
+        """
+        futures = [self.executor.submit(self._get_json_safe, *self._split(item)) for item in paths]
+        return [future.result() for future in futures]
+
+    def _get_json_safe(self, path, params):
+        try:
+            return self.get_json(path, params)
+        except Exception as e:
+            return e
+
+    @staticmethod
+    def _split(item):
+        if isinstance(item, tuple):
+            return item
+        return item, None
+
+    # --- ASYNCHRONOUS ---
+    async def aget(self, path, params=None, timeout=None):
+        """Async GET returning the requests.Response"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(self.request, "GET", path, params=params, timeout=timeout)
+        )
+
+    async def aget_json(self, path, params=None, timeout=None):
+        """Async variant of get_json"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(self.get_json, path, params=params, timeout=timeout)
+        )
+
+    async def gather_json(self, paths, return_exceptions=True):
+        """
+        Fetch several JSON endpoints concurrently
+
+        Args:
+            paths: List of paths, or (path, params) tuples
+            return_exceptions: Return failures in place instead of raising
+
+        Returns:
+            list: Payloads in request order
+        """
+        return await asyncio.gather(
+            *(self.aget_json(*self._split(item)) for item in paths),
+            return_exceptions=return_exceptions
+        )
+
+    # --- ENDPOINTS ---
+    def historical_candles_path(self, instrument_key, interval, to_date, from_date=None):
+        """Path for the v2 historical candle endpoint (dates as YYYY-MM-DD)"""
+        encoded = requests.utils.quote(instrument_key, safe='')
+        path = f"/v2/historical-candle/{encoded}/{interval}/{to_date}"
+        if from_date:
+            path += f"/{from_date}"
+        return path
+
+    def intraday_candles_path(self, instrument_key, interval):
+        """Path for the v2 intraday candle endpoint (current session only)"""
+        encoded = requests.utils.quote(instrument_key, safe='')
+        return f"/v2/historical-candle/intraday/{encoded}/{interval}"
+
+    async def get_quotes(self, instrument_keys, timeout=None):
+        """Full market quotes for one or more instruments"""
+        params = {"instrument_key": ",".join(instrument_keys)}
+        return await self.aget_json("/v2/market-quote/quotes", params=params, timeout=timeout)
+
+    async def get_ltp(self, instrument_keys, timeout=None):
+        """Last traded prices for one or more instruments"""
+        params = {"instrument_key": ",".join(instrument_keys)}
+        return await self.aget_json("/v2/market-quote/ltp", params=params, timeout=timeout)